@@ -0,0 +1,81 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+"""
+Startup-time guard for the command line entry points and worker imports.
+
+Each module is imported in a fresh interpreter, `--repeat` times; the median
+time over a bare interpreter is compared against `--budget`. Importing a
+module must not load any of HEAVY_MODULES either (see src/graph/lazy.py).
+Exits non-zero on a regression.
+
+    python benchmarks/startup.py [--budget SECONDS] [--repeat N]
+"""
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+MODULES = (
+    "src.convert.cli",
+    "src.convert.targets",
+    "src.convert.main",
+    "src.cfgmatch.cfgmatch",
+    "src.cfgmatch.tuning",
+    "src.convert.similarity",
+    "src.daemon.server",
+    "src.graph.topology",
+    "src.visual.diffview",
+)
+HEAVY_MODULES = ("networkx", "numpy", "scipy", "pydot")
+
+STARTUP_BUDGET = 0.25
+REPEAT = 5
+
+
+def run(code: str) -> tuple[float, str]:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, check=True
+    )
+    return time.perf_counter() - start, proc.stdout.decode().strip()
+
+
+def import_time(module: str, repeat: int = REPEAT) -> tuple[float, list[str]]:
+    """
+    Median import time of `module` over a bare interpreter, and the
+    heavy modules it loaded.
+    """
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    bare = statistics.median(run("pass")[0] for _ in range(repeat))
+
+    times, loaded = [], ""
+    for _ in range(repeat):
+        elapsed, loaded = run(code)
+        times.append(elapsed)
+    return statistics.median(times) - bare, [m for m in loaded.split(",") if m]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check import-time regressions.")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        elapsed, loaded = import_time(module, args.repeat)
+        ok = elapsed <= args.budget and not loaded
+        failed |= not ok
+        print(
+            f"{'ok  ' if ok else 'FAIL'} {module:<24} {elapsed * 1000:7.1f} ms"
+            + (f"  loads {', '.join(loaded)}" if loaded else "")
+        )
+
+    sys.exit(1 if failed else 0)
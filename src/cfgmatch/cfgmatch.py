@@ -1,19 +1,19 @@
-import json
+import argparse
 import os
-import subprocess
 import sys
-from typing import Callable
+from collections import Counter
 
-import networkx as nx
-from colorama import Back, Fore, Style
-from networkx.algorithms import isomorphism
+from colorama import Back, Style
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 import src.graph.topology as topology
-import src.visual.diffview as diffview
-from src.graph.vertex import Vertex
+from src.cfgmatch.evaluate import Metrics, PatchDiff
+from src.convert.pool import configure_pool, graph_pool
+from src.convert.results import RESULTS_DB, ResultStore, diff_record
+from src.convert.targets import Target, parse_target
+from src.graph.session import SESSION_MATCHERS
 
-# TARGET = "bn_sqrt"
+# TARGET = "bn_sqrt:openssl"
 # FNAME = "BN_mod_sqrt"
 
 TARGET = "libarchive"
@@ -32,143 +32,49 @@ def setup_env() -> dict[str, str]:
     return config
 
 
-def git_checkout_to_hash(bid: str):
-    basedir = os.environ.get("OPENSSL_GIT_DIRECTORY")
-    subprocess.run(["git", "checkout", bid], cwd=basedir)
-
-
-def check_file_commit_hash(fname: str):
-    basedir = os.environ.get("OPENSSL_GIT_DIRECTORY")
-    file = basedir + "/" + fname
-    proc = subprocess.run(
-        ["git", "log", '--format="%H"', file], cwd=basedir, capture_output=True
-    )
-
-    return proc.stdout.decode().replace('"', "").splitlines()
-
-
-def construct_graph(target: str, hash: str, fname: str):
-    return topology.build_cfg_from_dot(
-        # f"build_output/{target}/openssl-bcs-{hash}/{fname}.dot"
-        f"build_output/{target}/libarchive-bcs-{hash}/{fname}.dot"
-    )
-
-
-def fetch_symbols_from_file(fname: str) -> list[str]:
-    basedir = os.environ.get("OPENSSL_GIT_DIRECTORY")
-    file = basedir + "/" + fname
-
-    proc = subprocess.run(
-        ["ctags", "--languages=C", "--kinds-C=f", "--output-format=json", file],
-        cwd=basedir,
-        capture_output=True,
-    )
-
-    return [
-        json.loads(func_info).get("name")
-        for func_info in proc.stdout.decode().splitlines()
-    ]
-
-
-def match_llvm_ir_optype(n1, n2):
-    if n1["vertex"].llvm_ir_optype == n2["vertex"].llvm_ir_optype:
-        return True
-    else:
-        return False
-
-
-def match_forward_vertex(
-    diff: list[tuple[Vertex, Vertex]],
-) -> tuple[Callable[[str], str | None], Callable[[str], str | None]]:
-    fw_dict = {old.name: new for (old, new) in diff if old.name != ""}
-
-    def get_block_from_prev(blk: str) -> Vertex | None:
-        return next(filter(lambda x: x[0].name == blk, diff))[0]
-
-    def get_block_from_after(blk: str) -> Vertex | None:
-        return next(filter(lambda x: x[1].name == blk, diff))[1]
-
-    def match_forward(blk_prev: str) -> str | None:
-        if match := fw_dict.get(blk_prev):
-            return match.name
-        else:
-            return None
-
-    def conserve_forward(blk_prev: str) -> bool:
-        if match := fw_dict.get(blk_prev):
-            return all(
-                item in iter(get_block_from_after(match).llvm_ir_optype)
-                for item in get_block_from_prev(blk_prev).llvm_ir_optype
-            )
-        else:
-            return False
-
-    return match_forward, conserve_forward
-
-
-def match_backward_vertex(
-    diff: list[tuple[Vertex, Vertex]],
-) -> tuple[Callable[[str], str | None], Callable[[str], str | None]]:
-    bw_dict = {new.name: old.name for (old, new) in diff if new.name != ""}
-
-    def get_block_from_prev(blk: str) -> Vertex | None:
-        return next(filter(lambda x: x[0].name == blk, diff))[0]
-
-    def get_block_from_after(blk: str) -> Vertex | None:
-        return next(filter(lambda x: x[1].name == blk, diff))[1]
-
-    def match_backward(blk_after: str) -> str | None:
-        if match := bw_dict.get(blk_after):
-            return match
-        else:
-            return None
-
-    def conserve_backward(blk_after: str) -> bool:
-        if match := bw_dict.get(blk_after):
-            return all(
-                item in iter(get_block_from_after(blk_after).llvm_ir_optype)
-                for item in get_block_from_prev(match).llvm_ir_optype
+def construct_graph(target: Target, hash: str, fname: str):
+    # Pooled: shared, read-only graphs.
+    return graph_pool().get(target, hash, fname)
+
+
+def evaluate_function(
+    target: Target,
+    fname: str,
+    patched: str,
+    vulns: str,
+    history: list[str],
+    metrics: Metrics,
+    verbose: bool = True,
+    store: ResultStore | None = None,
+    solver: str = "exact",
+    screen: bool = False,
+):
+    # graph_isomorphism does not modify its inputs; each graph is parsed once
+    # per pool eviction.
+    patched_graph = construct_graph(target, patched, fname)
+    vulns_graph = construct_graph(target, vulns, fname)
+
+    # "session" matches each history version through a `MatchingSession`.
+    diff = PatchDiff.from_solver(vulns_graph, patched_graph, solver)
+    if store is not None:
+        store.add_diff(
+            diff_record(
+                target.name,
+                fname,
+                vulns,
+                patched,
+                vulns_graph,
+                patched_graph,
+                diff.result,
+                solver,
             )
-        else:
-            return False
-
-    return match_backward, conserve_backward
-
-
-def find_vertex_previous(name: str, diff: list[tuple[Vertex, Vertex]]) -> bool:
-    return any(map(lambda x: x[0].name == name, diff))
-
-
-def find_vertex_after(name: str, diff: list[tuple[Vertex, Vertex]]) -> bool:
-    return any(map(lambda x: x[1].name == name, diff))
-
-
-def find_vertex_in(name: str, single: list[Vertex]) -> bool:
-    return any(map(lambda x: x.name == name, single))
-
-
-if __name__ == "__main__":
-    setup_env()
-
-    with open(f"compare/{TARGET}/compares_target.json", "r") as f:
-        comp = json.load(f)
-
-    graphs = [ver["hash"] for ver in comp]
-
-    patched, vulns, history = graphs[0], graphs[1], graphs[2:]
-
-    diff_graph = nx.DiGraph()
-
-    patched_graph = construct_graph(TARGET, patched, FNAME)
-
-    same_vert, diff_vert, _, con_edge, del_edge, new_edge = topology.graph_isomorphism(
-        construct_graph(TARGET, vulns, FNAME), patched_graph
-    )
-
-    del_vert, new_vert = zip(*diff_vert)
+        )
+    if diff.unchanged():
+        return
 
-    del_vert = list(filter(lambda x: x.name != "", del_vert))
-    new_vert = list(filter(lambda x: x.name != "", new_vert))
+    # With `screen`, each history commit is screened with signature lookups
+    # first; full matching only runs when the deleted signatures are found.
+    # Screened-out commits are not judged (nor counted in TP/FP/FN/TN).
 
     # 1. Make as a set of CONNECTED COMPONENTS - as REMOVED and ADDED set
     # We define critical data and metadata as follows:
@@ -179,159 +85,113 @@ if __name__ == "__main__":
 
     # 2. Check original graph is exists.
 
-    # <-- Vn --- V0 ---- P -->
-    #    {n} ... {n} -> {  }     Deleted Node | Should be conserved in the previous graph |  If not detected -> Actually Vuln, but judged Benign. (False Negative)
-    #    { } ... { } -> {n'}       Added Node | Should not exist, but detecting may cause FP.
-    #   {e'} ... {e} -> {  }     Deleted Edge | Should be conserved in the previous graph |  If not detected -> Actually Vuln, but judged Benign. (False Negative)
-    #   {  } ... {e} -> {e }       Added Edge | Should not exist.                         |  If     detected -> Actually Benign, but judged Vuln. (False Positive)
-
     for h in history:
-        # Deleted components
         print(
             f"{Style.BRIGHT + Back.GREEN}+ {patched}{Style.RESET_ALL} vs "
             f"{Style.BRIGHT + Back.RED}- {vulns}{Style.RESET_ALL} -> "
-            f"{Style.BRIGHT + Back.YELLOW}? {h}{Style.RESET_ALL}"
+            f"{Style.BRIGHT + Back.YELLOW}? {h}{Style.RESET_ALL} [{fname}]"
         )
-        history_graph = construct_graph(TARGET, h, FNAME)
-        same_v, diff_v, _, con_e, del_e, new_e = topology.graph_isomorphism(
-            history_graph, construct_graph(TARGET, vulns, FNAME)
-        )
-
-        match_bw, conserve_bw = match_backward_vertex(diff_v + same_v)
-
-        (tp, tn, fp, fn) = 0, 0, 0, 0
-
-        # Deleted Vertex
-        # Node should be CONSERVED in the original graph
-        #     DETECTED: Actually Vuln, Judged Vuln   -> TP
-        # NOT DETECTED: Actually Vuln, Judged Benign -> FN
-        for v in del_vert:
-            if conserve_bw(v.name) and match_bw(v.name):
-                print(
-                    f"{Fore.GREEN + Style.BRIGHT}[DEL VERT]{Style.RESET_ALL} ✅ [{v.name}] => [{match_bw(v.name)}]"
-                )
-                tp += 1
-            elif not conserve_bw(v.name) and match_bw(v.name):
-                print(
-                    f"{Fore.RED + Style.BRIGHT}[DEL VERT]{Style.RESET_ALL} ❌ [{v.name}] =>  {match_bw(v.name)} "
-                    f"( {v.llvm_ir_optype} => {history_graph.nodes[match_bw(v.name)]['vertex'].llvm_ir_optype} )"
-                )
-                fn += 1
-
-            else:
-                print(
-                    f"{Fore.RED + Style.BRIGHT}[DEL VERT]{Style.RESET_ALL} ❌ [{v.name}] => ?"
+        history_graph = construct_graph(target, h, fname)
+
+        if screen and not diff.screen(history_graph):
+            print(f"{fname} @ {h} screened out: no deleted signature found\n")
+            metrics.screen_out(h)
+            if store is not None:
+                store.add_evaluation(
+                    target.name, fname, patched, vulns, h, Counter(), screened=True
                 )
-                fn += 1
-
-        # Delted Edge
-        # Edge should be exist between the nodes; which should be CONSERVED if node is in the conserved one, else MATCHED.
-        #     DETECTED: Actually Vuln, Judged Vuln   -> TP
-        # NOT DETECTED: Actually Vuln, Judged Benign -> FN
-
-        for src, dst in del_edge:
-            if find_vertex_in(src, del_vert) and find_vertex_in(src, del_vert):
-                src_bw, dst_bw = match_bw(src), match_bw(dst)
-                if (
-                    conserve_bw(src)
-                    and conserve_bw(dst)
-                    and history_graph.has_edge(src_bw, dst_bw)
-                ):
-                    print(
-                        f"{Fore.GREEN + Style.BRIGHT}[DEL EDGE]{Style.RESET_ALL} ✅ ([{src}] -> [{dst}]) => ([{src_bw}] -> [{dst_bw}])"
-                    )
-                    tp += 1
-                else:
-                    print(
-                        f"{Fore.RED + Style.BRIGHT}[DEL EDGE]{Style.RESET_ALL} ❌ ([{src}] -> [{dst}]) => ( {src_bw}  ??  {dst_bw} )"
-                    )
-                    fn += 1
+            continue
 
-            elif find_vertex_previous(src, same_vert) and find_vertex_in(dst, del_vert):
-                src_bw, dst_bw = match_bw(src), match_bw(dst)
-                if conserve_bw(dst) and history_graph.has_edge(src_bw, dst_bw):
-                    print(
-                        f"{Fore.GREEN + Style.BRIGHT}[DEL EDGE]{Style.RESET_ALL} ✅ ( {src}  -> [{dst}]) => ( {src_bw}  -> [{dst_bw}])"
-                    )
-                    tp += 1
-                else:
-                    print(
-                        f"{Fore.RED + Style.BRIGHT}[DEL EDGE]{Style.RESET_ALL} ❌ ( {src}  -> [{dst}]) => ( {src_bw}  ??  {dst_bw} )"
-                    )
-                    fn += 1
+        counts = diff.evaluate(history_graph, verbose)
+        print(Metrics.summary(f"{fname} @ {h}", counts))
+        metrics.add(h, counts)
+        if store is not None:
+            store.add_evaluation(target.name, fname, patched, vulns, h, counts)
 
-            elif find_vertex_in(src, del_vert) and find_vertex_previous(dst, same_vert):
-                src_bw, dst_bw = match_bw(src), match_bw(dst)
-                if conserve_bw(src) and history_graph.has_edge(src_bw, dst_bw):
-                    print(
-                        f"{Fore.GREEN + Style.BRIGHT}[DEL EDGE]{Style.RESET_ALL} ✅ ([{src}] ->  {dst} ) => ([{src_bw}] ->  {dst_bw} )"
-                    )
-                    tp += 1
-                else:
-                    print(
-                        f"{Fore.RED + Style.BRIGHT}[DEL EDGE]{Style.RESET_ALL} ❌ ([{src}] ->  {dst} ) => ( {src_bw}  ??  {dst_bw} )"
-                    )
-                    fn += 1
 
-            elif find_vertex_previous(src, same_vert) and find_vertex_previous(
-                dst, same_vert
-            ):
-                src_bw, dst_bw = match_bw(src), match_bw(dst)
-                if history_graph.has_edge(src_bw, dst_bw):
-                    print(
-                        f"{Fore.GREEN + Style.BRIGHT}[DEL EDGE]{Style.RESET_ALL} ✅ ( {src}  ->  {dst} ) => ( {src_bw}  ->  {dst_bw} )"
-                    )
-                    tp += 1
-                else:
-                    print(
-                        f"{Fore.RED + Style.BRIGHT}[DEL EDGE]{Style.RESET_ALL} ❌ ( {src}  ->  {dst} ) => ( {src_bw}  ??  {dst_bw} )"
-                    )
-                    fn += 1
-            else:
-                Exception("Neither source nor destination is in the del_edge list")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Evaluate how the vulnerable -> patched diff is detected in history commits."
+    )
+    parser.add_argument("target", nargs="?", default=TARGET, metavar="NAME[:PROJECT]")
+    parser.add_argument(
+        "functions",
+        nargs="*",
+        help="Functions to evaluate; every function built in both the patched "
+        "and the vulnerable commit by default",
+    )
+    parser.add_argument("-q", "--quiet", action="store_true")
+    parser.add_argument(
+        "--solver",
+        choices=(*topology.MATCHERS, *SESSION_MATCHERS),
+        default="exact",
+        help="Matcher of the patch diff and of each history version; "
+        "session keeps the reference graphs' features across history versions",
+    )
+    parser.add_argument(
+        "--pool-budget",
+        type=int,
+        default=None,
+        metavar="MB",
+        help="Budget of the parsed graph pool",
+    )
+    parser.add_argument(
+        "--screen",
+        action="store_true",
+        help="Skip matching history commits that contain none of the patch's "
+        "deleted signatures; they are reported apart, not counted",
+    )
+    parser.add_argument(
+        "--db",
+        nargs="?",
+        const=RESULTS_DB,
+        default=None,
+        metavar="PATH",
+        help=f"Also store the patch diff and evaluation counts in a SQLite "
+        f"results store (default path: {RESULTS_DB})",
+    )
+    args = parser.parse_args()
 
-        # Added components
-        history_graph = construct_graph(TARGET, h, FNAME)
-        same_v, diff_v, _, con_e, del_e, new_e = topology.graph_isomorphism(
-            history_graph, construct_graph(TARGET, patched, FNAME)
-        )
+    setup_env()
+    configure_pool(args.pool_budget and args.pool_budget << 20)
 
-        match_fw, conserve_fw = match_forward_vertex(diff_v + same_v)
+    target = parse_target(args.target)
+    comp = target.compares_target()
 
-        # NEW VERTEX.
-        # Pass. If there is a new simple vertex (`br` and `store`),
-        # it should be generate a easy false-positive.
-        #     DETECTED: Actually Benign, Judged Vuln   -> FP
-        # NOT DETECTED: Actually Benign, Judged Benign -> TN
+    graphs = [ver["hash"] for ver in comp]
 
-        # NEW EDGE.
-        for src, dst in new_edge:
-            if match_fw(src) and match_fw(dst):
-                if conserve_fw(src) and conserve_fw(dst):
-                    src_fw, dst_fw = match_fw(src), match_fw(dst)
-                    if history_graph.has_edge(src_fw, dst_fw):
-                        print(
-                            f"{Fore.RED + Style.BRIGHT}[NEW EDGE]{Style.RESET_ALL} ❌ ([{src}] -> [{dst}]) => ([{src_fw}] -> [{dst_fw}])"
-                        )
-                        fp += 1
-                    else:
-                        print(
-                            f"{Fore.GREEN + Style.BRIGHT}[NEW EDGE]{Style.RESET_ALL} ✅ ([{src}] -> [{dst}]) => ([{src_fw}] -- [{dst_fw}])"
-                        )
-                        tn += 1
-                else:
-                    print(
-                        f"{Fore.GREEN + Style.BRIGHT}[NEW EDGE]{Style.RESET_ALL} ✅ ([{src}] -> [{dst}]) => ( {src_fw}  --  {dst_fw} )"
-                    )
-                    tn += 1
-            else:
-                print(
-                    f"{Fore.GREEN + Style.BRIGHT}[NEW EDGE]{Style.RESET_ALL} ✅ ({src} -> {dst}) => ?"
-                )
-                tn += 1
+    patched, vulns, history = graphs[0], graphs[1], graphs[2:]
 
-        print(
-            f"=== {Style.BRIGHT + Fore.YELLOW}{h}{Style.RESET_ALL} ===\n"
-            f"{Style.BRIGHT + Back.GREEN}TP {tp:3d}{Style.RESET_ALL} {Style.BRIGHT + Back.RED}FP {fp:3d}{Style.RESET_ALL} | ACCURC {(tp + tn) / (tp + fp + tn + fn):.4f}\n"
-            f"{Style.BRIGHT + Fore.RED}FN {fn:3d}{Style.RESET_ALL} {Style.BRIGHT + Fore.GREEN}TN {tn:3d}{Style.RESET_ALL} | RECALL {tp / (tp + fn):.4f}  PRECIS {tp / (tp + fp):.4f}\n"
+    fnames = args.functions or sorted(
+        set(comp[0]["symbol"])
+        & set(comp[1]["symbol"])
+        & target.built_functions(patched)
+        & target.built_functions(vulns)
+    )
+    built = {h: target.built_functions(h) for h in history}
+
+    store = args.db and ResultStore(args.db)
+    metrics = Metrics()
+    for fname in fnames:
+        evaluate_function(
+            target,
+            fname,
+            patched,
+            vulns,
+            [h for h in history if fname in built[h]],
+            metrics,
+            verbose=not args.quiet,
+            store=store,
+            solver=args.solver,
+            screen=args.screen,
         )
+    if store is not None:
+        store.close()
+
+    for h in history:
+        if h in metrics.per_commit:
+            print(Metrics.summary(h, metrics.per_commit[h]))
+        if metrics.screened[h]:
+            print(f"{h}: {metrics.screened[h]} function(s) screened out, not counted\n")
+    print(Metrics.summary("OVERALL", metrics.overall()))
+    print(graph_pool().summary())
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import functools
+from collections import Counter, defaultdict
+from typing import Callable
+
+from colorama import Back, Fore, Style
+
+import src.graph.topology as topology
+from src.cfgmatch.signature import PatchSignature, SignatureIndex
+from src.graph.lazy import lazy_import
+from src.graph.session import SESSION_MATCHERS, MatchingSession
+from src.graph.vertex import Vertex
+
+nx = lazy_import("networkx")
+
+"""
+<-- Vn --- V0 ---- P -->
+   {n} ... {n} -> {  }     Deleted Node | Should be conserved in the previous graph |  If not detected -> Actually Vuln, but judged Benign. (False Negative)
+   { } ... { } -> {n'}       Added Node | Should not exist, but detecting may cause FP.
+  {e'} ... {e} -> {  }     Deleted Edge | Should be conserved in the previous graph |  If not detected -> Actually Vuln, but judged Benign. (False Negative)
+  {  } ... {e} -> {e }       Added Edge | Should not exist.                         |  If     detected -> Actually Benign, but judged Vuln. (False Positive)
+"""
+
+
+def _mark(name: str | None, deleted: bool) -> str:
+    return f"[{name}]" if deleted else f" {name} "
+
+
+class Metrics:
+    """
+    TP/FP/FN/TN accumulated per commit, across functions. Functions
+    screened out (not matched) are only counted per commit, apart.
+    """
+
+    def __init__(self):
+        self.per_commit: dict[str, Counter] = defaultdict(Counter)
+        self.screened: Counter = Counter()
+
+    def add(self, commit: str, counts: Counter):
+        self.per_commit[commit].update(counts)
+
+    def screen_out(self, commit: str):
+        self.screened[commit] += 1
+
+    def overall(self) -> Counter:
+        return sum(self.per_commit.values(), Counter())
+
+    @staticmethod
+    def precision(c: Counter) -> float:
+        return c["tp"] / (c["tp"] + c["fp"]) if c["tp"] + c["fp"] else float("nan")
+
+    @staticmethod
+    def recall(c: Counter) -> float:
+        return c["tp"] / (c["tp"] + c["fn"]) if c["tp"] + c["fn"] else float("nan")
+
+    @staticmethod
+    def accuracy(c: Counter) -> float:
+        total = c["tp"] + c["fp"] + c["tn"] + c["fn"]
+        return (c["tp"] + c["tn"]) / total if total else float("nan")
+
+    @classmethod
+    def summary(cls, title: str, c: Counter) -> str:
+        return (
+            f"=== {Style.BRIGHT + Fore.YELLOW}{title}{Style.RESET_ALL} ===\n"
+            f"{Style.BRIGHT + Back.GREEN}TP {c['tp']:3d}{Style.RESET_ALL} {Style.BRIGHT + Back.RED}FP {c['fp']:3d}{Style.RESET_ALL} | ACCURC {cls.accuracy(c):.4f}\n"
+            f"{Style.BRIGHT + Fore.RED}FN {c['fn']:3d}{Style.RESET_ALL} {Style.BRIGHT + Fore.GREEN}TN {c['tn']:3d}{Style.RESET_ALL} | RECALL {cls.recall(c):.4f}  PRECIS {cls.precision(c):.4f}\n"
+        )
+
+
+class MatchIndex:
+    """
+    Dict/set index of a vertex matching in (Old, New).
+    Nonexistent (dummy) vertices are never indexed.
+    """
+
+    def __init__(self, pairs: list[tuple[Vertex, Vertex]]):
+        self.forward: dict[str, str] = {}
+        self.backward: dict[str, str] = {}
+        # Matched pairs whose old opcodes all appear in the new block.
+        self.conserved: set[tuple[str, str]] = set()
+
+        for old, new in pairs:
+            if old.name == "" or new.name == "":
+                continue
+            self.forward[old.name] = new.name
+            self.backward[new.name] = old.name
+            if set(old.llvm_ir_optype).issubset(new.llvm_ir_optype):
+                self.conserved.add((old.name, new.name))
+
+    def match_forward(self, blk_prev: str) -> str | None:
+        return self.forward.get(blk_prev)
+
+    def match_backward(self, blk_after: str) -> str | None:
+        return self.backward.get(blk_after)
+
+    def conserve_forward(self, blk_prev: str) -> bool:
+        return (blk_prev, self.forward.get(blk_prev)) in self.conserved
+
+    def conserve_backward(self, blk_after: str) -> bool:
+        return (self.backward.get(blk_after), blk_after) in self.conserved
+
+
+class PatchDiff:
+    """
+    Diff of vulnerable -> patched, indexed for evaluating history versions.
+    """
+
+    @classmethod
+    def from_solver(
+        cls, g_vuln: nx.DiGraph, g_patched: nx.DiGraph, solver: str = "exact"
+    ) -> PatchDiff:
+        """
+        `solver` is one of `topology.MATCHERS` or `SESSION_MATCHERS`.
+        """
+        if solver in SESSION_MATCHERS:
+            return cls(g_vuln, g_patched, session=SESSION_MATCHERS[solver])
+        if solver == "exact":
+            return cls(g_vuln, g_patched)
+        matcher = functools.partial(topology.graph_isomorphism, solver=solver)
+        return cls(g_vuln, g_patched, matcher)
+
+    def __init__(
+        self,
+        g_vuln: nx.DiGraph,
+        g_patched: nx.DiGraph,
+        matcher: Callable[[nx.DiGraph, nx.DiGraph], tuple] | None = None,
+        session: str | None = None,
+    ):
+        """
+        `matcher(g_old, g_new)` replaces `topology.graph_isomorphism`,
+        e.g. to match with other edit distance weights.
+        With a `session` solver, history versions are matched through one
+        `MatchingSession` per graph instead (the patch diff itself is not).
+        """
+        self.result: tuple = (matcher or topology.graph_isomorphism)(g_vuln, g_patched)
+        same_vert, diff_vert, _, _, del_edge, new_edge = self.result
+
+        self.g_vuln: nx.DiGraph = g_vuln
+        self.g_patched: nx.DiGraph = g_patched
+        self.del_vert: list[Vertex] = [vo for vo, _ in diff_vert if vo.name != ""]
+        self.new_vert: list[Vertex] = [vn for _, vn in diff_vert if vn.name != ""]
+        self.del_edge: list[tuple[str, str]] = del_edge
+        self.new_edge: list[tuple[str, str]] = new_edge
+
+        self.del_vert_names: set[str] = {v.name for v in self.del_vert}
+        self.same_vert_names: set[str] = {vo.name for vo, _ in same_vert}
+
+        # Every history version is matched against these two graphs.
+        if session is not None:
+            self.match_vuln = MatchingSession(g_vuln, "new", session).match
+            self.match_patched = MatchingSession(g_patched, "new", session).match
+        else:
+            match = matcher or topology.graph_isomorphism
+            self.match_vuln = lambda g: match(g, g_vuln)
+            self.match_patched = lambda g: match(g, g_patched)
+
+        self.signatures: SignatureIndex = SignatureIndex()
+        self.signatures.add(
+            "patch",
+            PatchSignature.from_diff(
+                g_vuln,
+                g_patched,
+                self.del_vert,
+                self.new_vert,
+                self.del_edge,
+                self.new_edge,
+            ),
+        )
+
+    def unchanged(self) -> bool:
+        return not (self.del_vert or self.new_vert or self.del_edge or self.new_edge)
+
+    def screen(self, history_graph: nx.DiGraph) -> bool:
+        """
+        False if the deleted signatures are not found in the history graph;
+        the history can then be judged benign without matching.
+        """
+        return not self.signatures.patterns["patch"].deleted or (
+            "patch" in self.signatures.screen(history_graph)
+        )
+
+    def evaluate(self, history_graph: nx.DiGraph, verbose: bool = True) -> Counter:
+        log = print if verbose else (lambda *_: None)
+        counts = Counter()
+
+        # Deleted components
+        same_v, diff_v, _, _, _, _ = self.match_vuln(history_graph)
+        to_vuln = MatchIndex(diff_v + same_v)  # history -> vulnerable
+
+        # Deleted Vertex
+        # Node should be CONSERVED in the original graph
+        #     DETECTED: Actually Vuln, Judged Vuln   -> TP
+        # NOT DETECTED: Actually Vuln, Judged Benign -> FN
+        for v in self.del_vert:
+            match = to_vuln.match_backward(v.name)
+            if match and to_vuln.conserve_backward(v.name):
+                log(
+                    f"{Fore.GREEN + Style.BRIGHT}[DEL VERT]{Style.RESET_ALL} ✅ [{v.name}] => [{match}]"
+                )
+                counts["tp"] += 1
+            elif match:
+                log(
+                    f"{Fore.RED + Style.BRIGHT}[DEL VERT]{Style.RESET_ALL} ❌ [{v.name}] =>  {match} "
+                    f"( {v.llvm_ir_optype} => {history_graph.nodes[match]['vertex'].llvm_ir_optype} )"
+                )
+                counts["fn"] += 1
+            else:
+                log(
+                    f"{Fore.RED + Style.BRIGHT}[DEL VERT]{Style.RESET_ALL} ❌ [{v.name}] => ?"
+                )
+                counts["fn"] += 1
+
+        # Deleted Edge
+        # Edge should be exist between the nodes; which should be CONSERVED if node is in the conserved one, else MATCHED.
+        #     DETECTED: Actually Vuln, Judged Vuln   -> TP
+        # NOT DETECTED: Actually Vuln, Judged Benign -> FN
+        for src, dst in self.del_edge:
+            src_del, dst_del = src in self.del_vert_names, dst in self.del_vert_names
+            if not (src_del or src in self.same_vert_names) or not (
+                dst_del or dst in self.same_vert_names
+            ):
+                continue
+
+            src_bw, dst_bw = to_vuln.match_backward(src), to_vuln.match_backward(dst)
+            if (
+                (not src_del or to_vuln.conserve_backward(src))
+                and (not dst_del or to_vuln.conserve_backward(dst))
+                and history_graph.has_edge(src_bw, dst_bw)
+            ):
+                log(
+                    f"{Fore.GREEN + Style.BRIGHT}[DEL EDGE]{Style.RESET_ALL} ✅ ({_mark(src, src_del)} -> {_mark(dst, dst_del)}) => "
+                    f"({_mark(src_bw, src_del)} -> {_mark(dst_bw, dst_del)})"
+                )
+                counts["tp"] += 1
+            else:
+                log(
+                    f"{Fore.RED + Style.BRIGHT}[DEL EDGE]{Style.RESET_ALL} ❌ ({_mark(src, src_del)} -> {_mark(dst, dst_del)}) => ( {src_bw}  ??  {dst_bw} )"
+                )
+                counts["fn"] += 1
+
+        # Added components
+        same_v, diff_v, _, _, _, _ = self.match_patched(history_graph)
+        to_patched = MatchIndex(diff_v + same_v)  # history -> patched
+
+        # NEW VERTEX.
+        # Pass. If there is a new simple vertex (`br` and `store`),
+        # it should be generate a easy false-positive.
+        #     DETECTED: Actually Benign, Judged Vuln   -> FP
+        # NOT DETECTED: Actually Benign, Judged Benign -> TN
+
+        # NEW EDGE.
+        for src, dst in self.new_edge:
+            src_fw, dst_fw = (
+                to_patched.match_backward(src),
+                to_patched.match_backward(dst),
+            )
+            if not (src_fw and dst_fw):
+                log(
+                    f"{Fore.GREEN + Style.BRIGHT}[NEW EDGE]{Style.RESET_ALL} ✅ ({src} -> {dst}) => ?"
+                )
+                counts["tn"] += 1
+            elif not (
+                to_patched.conserve_backward(src) and to_patched.conserve_backward(dst)
+            ):
+                log(
+                    f"{Fore.GREEN + Style.BRIGHT}[NEW EDGE]{Style.RESET_ALL} ✅ ([{src}] -> [{dst}]) => ( {src_fw}  --  {dst_fw} )"
+                )
+                counts["tn"] += 1
+            elif history_graph.has_edge(src_fw, dst_fw):
+                log(
+                    f"{Fore.RED + Style.BRIGHT}[NEW EDGE]{Style.RESET_ALL} ❌ ([{src}] -> [{dst}]) => ([{src_fw}] -> [{dst_fw}])"
+                )
+                counts["fp"] += 1
+            else:
+                log(
+                    f"{Fore.GREEN + Style.BRIGHT}[NEW EDGE]{Style.RESET_ALL} ✅ ([{src}] -> [{dst}]) => ([{src_fw}] -- [{dst_fw}])"
+                )
+                counts["tn"] += 1
+
+        return counts
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+from collections import defaultdict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+import src.graph.topology as topology
+from src.graph.dotio import dot_functions, dot_name
+from src.graph.lazy import lazy_import
+from src.graph.vertex import Vertex
+
+nx = lazy_import("networkx")
+
+NGRAM_SIZE = 3
+
+"""
+Signature of a patch.
+
+A patch (vulnerable -> patched) is summarized as two sets of hashed signatures:
+- DELETED: blocks / edges of the vulnerable graph that the patch removed or changed.
+- ADDED:   blocks / edges of the patched graph that the patch introduced.
+
+Block signature := whole opcode sequence of the block.
+Edge signature  := (last n opcodes of source, branch label, first n opcodes of destination).
+
+Addresses (NodeXXX) are never part of a signature, so any build of any function
+can be screened against the index with plain hash lookups.
+"""
+
+
+def _digest(*parts) -> str:
+    return hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+
+
+def block_signature(v: Vertex) -> str:
+    return _digest("B", tuple(v.llvm_ir_optype))
+
+
+def edge_signature(g: nx.DiGraph, src: str, dst: str, n: int = NGRAM_SIZE) -> str:
+    src_optype = g.nodes[src]["vertex"].llvm_ir_optype
+    dst_optype = g.nodes[dst]["vertex"].llvm_ir_optype
+    return _digest(
+        "E",
+        tuple(src_optype[-n:]),
+        topology.branch_label(g, src, dst),
+        tuple(dst_optype[:n]),
+    )
+
+
+def graph_signatures(g: nx.DiGraph, n: int = NGRAM_SIZE) -> set[str]:
+    return {block_signature(g.nodes[v]["vertex"]) for v in g.nodes} | {
+        edge_signature(g, src, dst, n) for src, dst in g.edges
+    }
+
+
+class PatchSignature:
+    def __init__(self, deleted: set[str], added: set[str]):
+        self.deleted: set[str] = deleted
+        self.added: set[str] = added
+
+    def __bool__(self):
+        return bool(self.deleted or self.added)
+
+    @classmethod
+    def from_graphs(
+        cls, g_vuln: nx.DiGraph, g_patched: nx.DiGraph, n: int = NGRAM_SIZE
+    ) -> "PatchSignature":
+        _, diff_vert, _, _, del_edge, new_edge = topology.graph_isomorphism(
+            g_vuln, g_patched
+        )
+        return cls.from_diff(
+            g_vuln,
+            g_patched,
+            [vo for vo, _ in diff_vert if vo.name != ""],
+            [vn for _, vn in diff_vert if vn.name != ""],
+            del_edge,
+            new_edge,
+            n,
+        )
+
+    @classmethod
+    def from_diff(
+        cls,
+        g_vuln: nx.DiGraph,
+        g_patched: nx.DiGraph,
+        del_vert: list[Vertex],
+        new_vert: list[Vertex],
+        del_edge: list[tuple[str, str]],
+        new_edge: list[tuple[str, str]],
+        n: int = NGRAM_SIZE,
+    ) -> "PatchSignature":
+        deleted = {block_signature(v) for v in del_vert} | {
+            edge_signature(g_vuln, src, dst, n) for src, dst in del_edge
+        }
+        added = {block_signature(v) for v in new_vert} | {
+            edge_signature(g_patched, src, dst, n) for src, dst in new_edge
+        }
+
+        # Only keep the signatures that discriminate the two versions.
+        return cls(
+            deleted - graph_signatures(g_patched, n),
+            added - graph_signatures(g_vuln, n),
+        )
+
+
+class SignatureIndex:
+    """
+    Inverted index: signature -> {(pattern id, "del" | "add")}.
+    """
+
+    def __init__(self, n: int = NGRAM_SIZE):
+        self.n: int = n
+        self.patterns: dict[str, PatchSignature] = {}
+        self.postings: dict[str, set[tuple[str, str]]] = defaultdict(set)
+
+    def add(self, pattern_id: str, sig: PatchSignature):
+        self.patterns[pattern_id] = sig
+        for s in sig.deleted:
+            self.postings[s].add((pattern_id, "del"))
+        for s in sig.added:
+            self.postings[s].add((pattern_id, "add"))
+
+    def screen(
+        self, g: nx.DiGraph, min_deleted: float = 0.5
+    ) -> dict[str, tuple[float, float]]:
+        """
+        Returns {pattern id: (deleted ratio, added ratio)} of the patterns
+        whose deleted signatures are present in `g` at least by `min_deleted`.
+        """
+        hits: dict[str, dict[str, int]] = defaultdict(lambda: {"del": 0, "add": 0})
+        for s in graph_signatures(g, self.n):
+            for pattern_id, kind in self.postings.get(s, ()):
+                hits[pattern_id][kind] += 1
+
+        result = {}
+        for pattern_id, count in hits.items():
+            sig = self.patterns[pattern_id]
+            del_ratio = count["del"] / max(len(sig.deleted), 1)
+            add_ratio = count["add"] / max(len(sig.added), 1)
+            if sig.deleted and del_ratio >= min_deleted:
+                result[pattern_id] = (del_ratio, add_ratio)
+        return result
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "n": self.n,
+                    "patterns": {
+                        pid: {
+                            "deleted": sorted(sig.deleted),
+                            "added": sorted(sig.added),
+                        }
+                        for pid, sig in self.patterns.items()
+                    },
+                },
+                f,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "SignatureIndex":
+        with open(path, "r") as f:
+            data = json.load(f)
+        index = cls(data["n"])
+        for pid, sig in data["patterns"].items():
+            index.add(pid, PatchSignature(set(sig["deleted"]), set(sig["added"])))
+        return index
+
+
+def sweep_build(index: SignatureIndex, build_dir: str, min_deleted: float = 0.5):
+    """
+    Screen every function of one build directory.
+    Yields (function name, {pattern id: (deleted ratio, added ratio)}) for the hits.
+    """
+    for fname in sorted(os.listdir(build_dir)):
+        if (name := dot_name(fname)) is None:
+            continue
+        g = topology.build_cfg_from_dot(os.path.join(build_dir, fname))
+        if hits := index.screen(g, min_deleted):
+            yield name, hits
+
+
+if __name__ == "__main__":
+    # python src/cfgmatch/signature.py <target> <prefix> [function ...]
+    #   Builds the index from (patched, vulnerable) = compares_target.json[0:2]
+    #   and sweeps every function of every build in build_output/<target>/.
+    target, prefix, *fnames = sys.argv[1:]
+
+    with open(f"compare/{target}/compares_target.json", "r") as f:
+        comp = json.load(f)
+
+    patched, vulns = comp[0]["hash"], comp[1]["hash"]
+    patched_dir = f"build_output/{target}/{prefix}-{patched}"
+    vulns_dir = f"build_output/{target}/{prefix}-{vulns}"
+
+    if not fnames:
+        fnames = sorted(dot_functions(patched_dir) & dot_functions(vulns_dir))
+
+    index = SignatureIndex()
+    for fname in fnames:
+        sig = PatchSignature.from_graphs(
+            topology.build_cfg_from_dot(f"{vulns_dir}/{fname}.dot"),
+            topology.build_cfg_from_dot(f"{patched_dir}/{fname}.dot"),
+        )
+        if sig:
+            index.add(f"{vulns}:{fname}", sig)
+
+    index.save(f"compare/{target}/signature_index.json")
+
+    for build in sorted(os.listdir(f"build_output/{target}")):
+        for fname, hits in sweep_build(index, f"build_output/{target}/{build}"):
+            for pattern_id, (del_ratio, add_ratio) in hits.items():
+                print(
+                    f"{build} {fname} <- {pattern_id} DEL {del_ratio:.2f} ADD {add_ratio:.2f}"
+                )
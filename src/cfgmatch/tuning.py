@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import csv
+import itertools
+import json
+import math
+import os
+import pickle
+import sys
+from collections import Counter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+import src.graph.topology as topology
+from src.cfgmatch.evaluate import Metrics, PatchDiff
+from src.convert.main import setup_env
+from src.convert.targets import Target, load_projects, parse_target
+from src.graph.lazy import lazy_import
+from src.graph.solver import SOLVERS
+
+nx = lazy_import("networkx")
+
+"""
+Edit distance weight tuning.
+
+`collect` parses every graph the cfgmatch evaluation needs once, pickles it,
+and saves the unweighted cost components (`topology.CostComponents`) of
+every pair it matches:
+
+    vulnerable -> patched, history -> vulnerable, history -> patched
+
+`search` then re-combines the components with each weight vector of a grid,
+re-solves the assignments and scores them with the cfgmatch metrics.
+Neither the DOT files nor the edit distance kernels are touched again.
+
+Layout of the store (compare/<name>/tuning/ by default):
+
+    cases.json                              functions and commits to evaluate
+    graphs/<commit>/<function>.pkl
+    components/<function>/<old>_<new>.npz
+"""
+
+WEIGHT_STEP = 0.05
+OBJECTIVES = ("accuracy", "precision", "recall")
+
+
+def graph_path(store: str, commit: str, fname: str) -> str:
+    return f"{store}/graphs/{commit}/{fname}.pkl"
+
+
+def components_path(store: str, fname: str, old: str, new: str) -> str:
+    return f"{store}/components/{fname}/{old}_{new}.npz"
+
+
+def collect_function(target: Target, store: str, case: dict):
+    fname = case["function"]
+    commits = [case["patched"], case["vulns"], *case["history"]]
+
+    graphs = {}
+    for commit in commits:
+        g = topology.build_cfg_from_dot(target.dot_path(commit, fname))
+        g.graph["commit"], g.graph["function"] = commit, fname
+        graphs[commit] = g
+
+        path = graph_path(store, commit, fname)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(g, f)
+
+    os.makedirs(f"{store}/components/{fname}", exist_ok=True)
+    pairs = [(case["vulns"], case["patched"])] + [
+        (h, ref) for h in case["history"] for ref in (case["vulns"], case["patched"])
+    ]
+    for old, new in pairs:
+        topology.graph_isomorphism(
+            graphs[old],
+            graphs[new],
+            components_path=components_path(store, fname, old, new),
+        )
+
+
+def collect(target: Target, store: str, cases: list[dict], workers: int | None = None):
+    os.makedirs(store, exist_ok=True)
+    with open(f"{store}/cases.json", "w") as f:
+        json.dump(cases, f)
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        for future in concurrent.futures.as_completed(
+            [pool.submit(collect_function, target, store, case) for case in cases]
+        ):
+            future.result()
+
+
+class ComponentMatcher:
+    """
+    `graph_isomorphism` replacement that re-solves stored cost components
+    with other weights. Components are loaded once and kept in memory.
+    """
+
+    def __init__(self, store: str, solver: str = "exact"):
+        self.store: str = store
+        self.solver: str = solver
+        self.weights: tuple[float, ...] = topology.DEFAULT_WEIGHTS
+        self.components: dict[tuple[str, str, str], topology.CostComponents] = {}
+
+    def __call__(self, g_old: nx.DiGraph, g_new: nx.DiGraph) -> topology.MatchResult:
+        key = (g_old.graph["function"], g_old.graph["commit"], g_new.graph["commit"])
+        if key not in self.components:
+            self.components[key] = topology.CostComponents.load(
+                components_path(self.store, *key)
+            )
+
+        pairs, _, inserted, report = self.components[key].assign(
+            self.weights, self.solver
+        )
+        forward = dict(pairs)
+        return topology.MatchResult(
+            topology.classify_matching(
+                g_old,
+                g_new,
+                [(v, forward.get(v)) for v in g_old.nodes]
+                + [(None, v) for v in inserted],
+            ),
+            report,
+        )
+
+
+class TuningCases:
+    """
+    Pickled graphs of every case, loaded once.
+    """
+
+    def __init__(self, store: str, solver: str = "exact"):
+        with open(f"{store}/cases.json", "r") as f:
+            self.cases: list[dict] = json.load(f)
+
+        self.graphs: dict[tuple[str, str], nx.DiGraph] = {}
+        for case in self.cases:
+            for commit in [case["patched"], case["vulns"], *case["history"]]:
+                with open(graph_path(store, commit, case["function"]), "rb") as f:
+                    self.graphs[case["function"], commit] = pickle.load(f)
+
+        self.matcher: ComponentMatcher = ComponentMatcher(store, solver)
+
+    def score(self, weights: tuple[float, ...]) -> Counter:
+        self.matcher.weights = weights
+
+        counts = Counter()
+        for case in self.cases:
+            fname = case["function"]
+            diff = PatchDiff(
+                self.graphs[fname, case["vulns"]],
+                self.graphs[fname, case["patched"]],
+                self.matcher,
+            )
+            if diff.unchanged():
+                continue
+
+            for h in case["history"]:
+                counts += diff.evaluate(self.graphs[fname, h], verbose=False)
+        return counts
+
+
+def weight_grid(step: float = WEIGHT_STEP) -> list[tuple[float, ...]]:
+    """
+    Every weight vector on a `step` grid whose components sum to 1.
+    """
+    n = round(1 / step)
+    return [
+        tuple(k / n for k in ks)
+        for ks in itertools.product(range(n + 1), repeat=len(topology.COMPONENTS))
+        if sum(ks) == n
+    ]
+
+
+# Per worker process
+_cases: TuningCases | None = None
+
+
+def _init_worker(store: str, solver: str):
+    global _cases
+    _cases = TuningCases(store, solver)
+
+
+def _score(weights: tuple[float, ...]) -> tuple[tuple[float, ...], Counter]:
+    return weights, _cases.score(weights)
+
+
+def grid_search(
+    store: str,
+    grid: list[tuple[float, ...]],
+    workers: int | None = None,
+    solver: str = "exact",
+) -> list[tuple[tuple[float, ...], Counter]]:
+    with concurrent.futures.ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(store, solver)
+    ) as pool:
+        return list(pool.map(_score, grid, chunksize=max(len(grid) // 64, 1)))
+
+
+def find_cases(target: Target, fnames: list[str]) -> list[dict]:
+    """
+    Same selection as cfgmatch.py: compares_target.json[0] is the patched
+    commit, [1] the vulnerable one, and the rest are history.
+    """
+    comp = target.compares_target()
+    patched, vulns = comp[0]["hash"], comp[1]["hash"]
+    history = [ver["hash"] for ver in comp[2:]]
+
+    fnames = fnames or sorted(
+        set(comp[0]["symbol"])
+        & set(comp[1]["symbol"])
+        & target.built_functions(patched)
+        & target.built_functions(vulns)
+    )
+    built = {h: target.built_functions(h) for h in history}
+    return [
+        {
+            "function": fname,
+            "patched": patched,
+            "vulns": vulns,
+            "history": [h for h in history if fname in built[h]],
+        }
+        for fname in fnames
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Tune the edit distance weights on stored cost components."
+    )
+    parser.add_argument("command", choices=("collect", "search"))
+    parser.add_argument("target", metavar="NAME[:PROJECT]")
+    parser.add_argument("functions", nargs="*", help="collect: functions to store")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--store", default=None)
+    parser.add_argument("--step", type=float, default=WEIGHT_STEP)
+    parser.add_argument("--objective", choices=OBJECTIVES, default="accuracy")
+    parser.add_argument(
+        "--solver",
+        choices=SOLVERS,
+        default="exact",
+        help="search: assignment solver the weights are scored with",
+    )
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--projects",
+        default=None,
+        help='JSON of extra projects: {"<project>": {"git_env": ..., "prefix": ...}}',
+    )
+    args = parser.parse_args()
+
+    if os.path.exists(".setup"):
+        setup_env()
+
+    if args.projects:
+        load_projects(args.projects)
+
+    target = parse_target(args.target)
+    store = args.store or f"compare/{target.name}/tuning"
+
+    if args.command == "collect":
+        cases = find_cases(target, args.functions)
+        collect(target, store, cases, args.workers)
+        print(f"{len(cases)} functions -> {store}")
+    else:
+        grid = weight_grid(args.step)
+        if topology.DEFAULT_WEIGHTS not in grid:
+            grid.append(topology.DEFAULT_WEIGHTS)
+        results = grid_search(store, grid, args.workers, args.solver)
+
+        with open(f"{store}/grid.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([*topology.COMPONENTS, "tp", "fp", "fn", "tn", *OBJECTIVES])
+            for weights, c in results:
+                writer.writerow(
+                    [*weights, c["tp"], c["fp"], c["fn"], c["tn"]]
+                    + [getattr(Metrics, objective)(c) for objective in OBJECTIVES]
+                )
+
+        objective = getattr(Metrics, args.objective)
+        print(Metrics.summary("DEFAULT", dict(results)[topology.DEFAULT_WEIGHTS]))
+
+        # Undefined (NaN) scores rank last.
+        results.sort(
+            key=lambda r: -objective(r[1]) if not math.isnan(objective(r[1])) else 1
+        )
+        for weights, c in results[: args.top]:
+            print(Metrics.summary(str(dict(zip(topology.COMPONENTS, weights))), c))
@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.convert.targets import PROJECTS, load_projects, parse_target
+
+"""
+Lightweight entry point. `targets` and `manifest` only read `compare/` and
+`build_output/` and never load the matching stack (networkx, numpy, scipy,
+pydot); `diff` hands over to `main.py`, which loads it on first use.
+
+    cli.py targets
+    cli.py manifest <target>
+    cli.py diff <target>... [main.py options]
+"""
+
+
+def list_targets() -> list[tuple[str, int]]:
+    """
+    (name, number of versions) of every `compare/<name>/compares_target.json`.
+    """
+    if not os.path.isdir("compare"):
+        return []
+
+    result = []
+    for name in sorted(os.listdir("compare")):
+        path = f"compare/{name}/compares_target.json"
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                result.append((name, len(json.load(f))))
+    return result
+
+
+def check_manifest(spec: str) -> list[dict]:
+    """
+    Build status of each version of a target's compares_target.json.
+    """
+    target = parse_target(spec)
+
+    result = []
+    for ver in target.compares_target():
+        built = (
+            target.built_functions(ver["hash"])
+            if os.path.isdir(target.build_dir(ver["hash"]))
+            else None
+        )
+        result.append(
+            {
+                "hash": ver["hash"],
+                "symbols": len(ver["symbol"]),
+                "built": None if built is None else len(built),
+                "missing": sorted(set(ver["symbol"]) - (built or set())),
+            }
+        )
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CFGDiff command line.")
+    parser.add_argument(
+        "--projects",
+        default=None,
+        help='JSON of extra projects: {"<project>": {"git_env": ..., "prefix": ...}}',
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("targets", help="List targets under compare/")
+
+    sub = commands.add_parser("manifest", help="Check a target's build status")
+    sub.add_argument("target", metavar="NAME[:PROJECT]")
+
+    sub = commands.add_parser("diff", help="Run main.py", add_help=False)
+    sub.add_argument("argv", nargs=argparse.REMAINDER)
+
+    args = parser.parse_args()
+
+    if args.projects:
+        load_projects(args.projects)
+
+    if args.command == "targets":
+        for name, versions in list_targets():
+            print(f"{name:<24} {versions:>4} versions")
+        print(f"projects: {', '.join(sorted(PROJECTS))}")
+
+    elif args.command == "manifest":
+        for ver in check_manifest(args.target):
+            if ver["built"] is None:
+                print(f"{ver['hash']}  not built")
+            else:
+                print(
+                    f"{ver['hash']}  {ver['built']} functions built, "
+                    f"{len(ver['missing'])}/{ver['symbols']} symbols missing"
+                )
+
+    else:
+        from src.convert.main import main
+
+        main(args.argv + (["--projects", args.projects] if args.projects else []))
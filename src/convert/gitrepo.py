@@ -0,0 +1,142 @@
+import functools
+import os
+import subprocess
+import tarfile
+import threading
+
+
+class GitRepository:
+    """
+    Checkout-free access to a local clone.
+
+    Objects are read through one long-lived `git cat-file --batch` process
+    (and its `--batch-check` sibling for object ids), so many commits can be
+    processed at once without touching the working tree.
+    """
+
+    def __init__(self, basedir: str):
+        self.basedir: str = basedir
+        self._batch: subprocess.Popen | None = None
+        self._batch_check: subprocess.Popen | None = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for proc in (self._batch, self._batch_check):
+            if proc is not None and proc.poll() is None:
+                proc.stdin.close()
+                proc.wait()
+        self._batch, self._batch_check = None, None
+
+    def _spawn(self, *args: str) -> subprocess.Popen:
+        return subprocess.Popen(
+            ["git", *args],
+            cwd=self.basedir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def _query(self, proc: subprocess.Popen, rev: str) -> list[str] | None:
+        proc.stdin.write(rev.encode() + b"\n")
+        proc.stdin.flush()
+        header = proc.stdout.readline().decode().split()
+        # "<rev> missing" / "<rev> ambiguous"
+        return None if len(header) != 3 else header
+
+    def object_id(self, rev: str) -> str | None:
+        """
+        Resolve `rev` (e.g. `<commit>:<path>`) to an object id.
+        """
+        with self._lock:
+            if self._batch_check is None:
+                self._batch_check = self._spawn("cat-file", "--batch-check")
+            header = self._query(self._batch_check, rev)
+        return header[0] if header else None
+
+    def read_object(self, rev: str) -> bytes | None:
+        with self._lock:
+            if self._batch is None:
+                self._batch = self._spawn("cat-file", "--batch")
+            if (header := self._query(self._batch, rev)) is None:
+                return None
+            size = int(header[2])
+            data = self._batch.stdout.read(size)
+            self._batch.stdout.read(1)  # Trailing LF
+        return data
+
+    def blob_hash(self, commit: str, path: str) -> str | None:
+        return self.object_id(f"{commit}:{path}")
+
+    def read_blob(self, commit: str, path: str) -> bytes | None:
+        return self.read_object(f"{commit}:{path}")
+
+    def file_history(self, path: str, rev: str = "HEAD") -> list[str]:
+        return self.file_histories([path], rev).get(path, [])
+
+    def file_histories(
+        self, paths: list[str], rev: str = "HEAD"
+    ) -> dict[str, list[str]]:
+        """
+        Commit hashes touching each of `paths`, newest first, from a single `git log`.
+        A merge counts as touching a path when it differs from its first parent,
+        i.e. when it brings the change into `rev`'s mainline.
+        """
+        proc = subprocess.run(
+            [
+                "git",
+                "log",
+                "--format=commit %H",
+                "--name-only",
+                "--diff-merges=first-parent",
+                rev,
+                "--",
+                *paths,
+            ],
+            cwd=self.basedir,
+            capture_output=True,
+        )
+
+        histories: dict[str, list[str]] = {path: [] for path in paths}
+        commit = None
+        for line in proc.stdout.decode().splitlines():
+            if line.startswith("commit "):
+                commit = line.split()[1]
+            elif line and line in histories:
+                histories[line].append(commit)
+        return histories
+
+    def list_files(self, commit: str, paths: list[str] = []) -> list[str]:
+        proc = subprocess.run(
+            ["git", "ls-tree", "-r", "--name-only", commit, "--", *paths],
+            cwd=self.basedir,
+            capture_output=True,
+        )
+        return proc.stdout.decode().splitlines()
+
+    def export_tree(self, commit: str, dest: str, paths: list[str] = []):
+        """
+        Materialize the tree of `commit` into `dest` (for building) without a checkout.
+        """
+        os.makedirs(dest, exist_ok=True)
+        proc = subprocess.Popen(
+            ["git", "archive", "--format=tar", commit, "--", *paths],
+            cwd=self.basedir,
+            stdout=subprocess.PIPE,
+        )
+        with tarfile.open(fileobj=proc.stdout, mode="r|") as tar:
+            # Refuse absolute paths, `..` and links out of `dest`.
+            tar.extractall(dest, filter="data")
+        proc.wait()
+
+
+@functools.lru_cache(maxsize=None)
+def open_repository(basedir: str) -> GitRepository:
+    """
+    One shared `GitRepository` per clone in this process.
+    """
+    return GitRepository(basedir)
@@ -1,6 +1,8 @@
-import json
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
 import os
-import subprocess
 import sys
 
 from colorama import Back, Fore, Style
@@ -8,14 +10,15 @@ from colorama import Back, Fore, Style
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 import src.graph.topology as topology
 import src.visual.diffview as diffview
+from src.convert.pool import configure_pool, graph_pool, merge_stats, summarize
+from src.convert.results import RESULTS_DB, ResultStore, diff_record
+from src.convert.stream import PARSE_DEPTH, PREFETCH_DEPTH, prefetch, stage
+from src.convert.targets import Target, load_projects, parse_target
+from src.convert.triage import rank_jobs
+from src.graph.dotio import read_dot
+from src.graph.lazy import lazy_import
 
-TARGET = "bn_sqrt"
-
-
-def file_diff(f_new: str, f_old: str) -> bool:
-    h_new = subprocess.run(["sha256sum", f_new], capture_output=True).stdout.split()[0]
-    h_old = subprocess.run(["sha256sum", f_old], capture_output=True).stdout.split()[0]
-    return h_new.split()[0] == h_old.split()[0]
+nx = lazy_import("networkx")
 
 
 def setup_env() -> dict[str, str]:
@@ -30,142 +33,442 @@ def setup_env() -> dict[str, str]:
     return config
 
 
-def git_checkout_to_hash(bid: str):
-    basedir = os.environ.get("OPENSSL_GIT_DIRECTORY")
-    subprocess.run(["git", "checkout", bid], cwd=basedir)
+def comparisons(target: Target) -> list[tuple[str, str, list[str]]]:
+    """
+    (new hash, old hash, functions to compare) of a target;
+    compares_target.json[0] against each of the rest.
+    """
+    comp = target.compares_target()
 
+    # --Suggestion.
+    # Get a "Patch" with v[0] and v[1], and
+    # Compare the (v[0], {v[2], v[3] ... v[n]}) to detect the diff-ed vulnerability
 
-def check_file_commit_hash(fname: str):
-    basedir = os.environ.get("OPENSSL_GIT_DIRECTORY")
-    file = basedir + "/" + fname
-    proc = subprocess.run(
-        ["git", "log", '--format="%H"', file], cwd=basedir, capture_output=True
-    )
+    v_new = comp[0]
+    new_hash = v_new["hash"]
+    new_fn = set(v_new["symbol"]) & target.built_functions(new_hash)
 
-    return proc.stdout.decode().replace('"', "").splitlines()
+    result = []
+    for v_old in comp[1:]:
+        old_hash = v_old["hash"]
+        old_fn = set(v_old["symbol"]) & target.built_functions(old_hash)
 
+        fn_intersect = new_fn & old_fn
+        result.append((new_hash, old_hash, sorted(fn_intersect)))
+    return result
+
+
+def compare_function(
+    target: Target,
+    new_hash: str,
+    old_hash: str,
+    f: str,
+    solver: str = "exact",
+    context: int | None = None,
+    memory_budget: int | None = None,
+    threads: int = 1,
+    record: bool = False,
+) -> tuple[str, dict | None]:
+    """
+    Diff one function, render its diff view and return the report text.
+    Empty if the function is unchanged. With `context`, only the changed
+    part and that many hops around it are rendered. Functions too large for
+    `memory_budget` (bytes) are matched out of core. `threads` builds
+    one function's cost matrix on that many threads. With `record`, the
+    `diff_record` for the results store is returned alongside, else None.
+    """
+    # Per-process pool; the baseline commit's graphs are reused for every `v_old`.
+    Gn = graph_pool().get(target, new_hash, f)
+    Go = graph_pool().get(target, old_hash, f)
+    return compare_graphs(
+        Gn,
+        Go,
+        new_hash,
+        old_hash,
+        f,
+        solver,
+        context,
+        memory_budget,
+        threads,
+        target.name if record else None,
+    )
 
-def fetch_symbols_from_file(fname: str) -> list[str]:
-    basedir = os.environ.get("OPENSSL_GIT_DIRECTORY")
-    file = basedir + "/" + fname
 
-    proc = subprocess.run(
-        ["ctags", "--languages=C", "--kinds-C=f", "--output-format=json", file],
-        cwd=basedir,
-        capture_output=True,
+def compare_in_worker(*args) -> tuple[str, dict | None, tuple[int, dict]]:
+    """
+    `compare_function` in a `run_targets` worker; also returns the worker's
+    pid and the stats of its graph pool so far.
+    """
+    return *compare_function(*args), (os.getpid(), graph_pool().stats())
+
+
+def compare_graphs(
+    Gn: nx.DiGraph,
+    Go: nx.DiGraph,
+    new_hash: str,
+    old_hash: str,
+    f: str,
+    solver: str = "exact",
+    context: int | None = None,
+    memory_budget: int | None = None,
+    threads: int = 1,
+    record: str | None = None,
+) -> tuple[str, dict | None]:
+    """
+    `compare_function` on already parsed graphs; `record` is the name of
+    the target to build the `diff_record` for.
+    """
+    result = topology.graph_isomorphism(
+        Go, Gn, solver, memory_budget=memory_budget, threads=threads
+    )
+    (v_same, v_diff, v_addr_matching, e_con, e_old, e_new) = result
+    # Unchanged functions are recorded too: their edges tell which commits
+    # still contain a pattern.
+    stored = (
+        diff_record(record, f, old_hash, new_hash, Go, Gn, result, solver)
+        if record is not None
+        else None
     )
 
-    return [
-        json.loads(func_info).get("name")
-        for func_info in proc.stdout.decode().splitlines()
+    if v_diff == [] and e_old == [] and e_new == []:
+        return "", stored
+
+    report = [
+        f"{Style.BRIGHT}{Back.RED}{f} @ {old_hash}{Style.RESET_ALL} vs\n{Style.BRIGHT}{Back.GREEN}{f} @ {new_hash}{Style.RESET_ALL}"
     ]
 
+    for v_old, v_new in v_diff:
+        if v_old.llvm_ir != []:
+            report.append(Fore.RED + "- [\n\t" + ";\n- \t".join(v_old.llvm_ir) + "\n- ]")
+        if v_new.llvm_ir != []:
+            report.append(
+                Fore.GREEN + "+ [\n\t" + ";\n+ \t".join(v_new.llvm_ir) + "\n+ ]\n"
+            )
 
-if __name__ == "__main__":
-    setup_env()
+    for edge in e_old:
+        v_src, v_dst = Go.nodes[edge[0]]["vertex"], Go.nodes[edge[1]]["vertex"]
+        report.append(
+            Fore.RED
+            + f"- {Go.edges[edge]['branch']}:\n- {v_src.llvm_ir_optype} ->\n- {v_dst.llvm_ir_optype}\n"
+        )
 
-    with open(f"compare/{TARGET}/compares_target.json", "r") as f:
-        comp = json.load(f)
+    for edge in e_new:
+        v_src, v_dst = Gn.nodes[edge[0]]["vertex"], Gn.nodes[edge[1]]["vertex"]
+        report.append(
+            Fore.GREEN
+            + f"+ {Gn.edges[edge]['branch']}:\n+ {v_src.llvm_ir_optype} ->\n+ {v_dst.llvm_ir_optype}\n"
+        )
 
-    v_new = comp[0]
-    new_hash, new_fn = v_new["hash"], set(v_new["symbol"])
-    new_built_set = set(
-        [
-            fname[:-4]
-            for fname in os.listdir(f"build_output/{TARGET}/openssl-bcs-{new_hash}/")
+    if context is None:
+        diffview.generate_diffview(
+            v_same,
+            v_diff,
+            v_addr_matching,
+            e_con,
+            e_old,
+            e_new,
+            func_name=f,
+            commit_hash=new_hash + "_" + old_hash,
+        )
+    else:
+        diffview.generate_focused_diffview(
+            v_same,
+            v_diff,
+            v_addr_matching,
+            e_con,
+            e_old,
+            e_new,
+            context=context,
+            func_name=f,
+            commit_hash=new_hash + "_" + old_hash,
+        )
+
+    return "\n".join(report) + Style.RESET_ALL, stored
+
+
+def run_targets(
+    jobs: list[tuple[Target, str, str, str]],
+    workers: int | None = None,
+    solver: str = "exact",
+    context: int | None = None,
+    memory_budget: int | None = None,
+    threads: int = 1,
+    pool_budget: int | None = None,
+    store: ResultStore | None = None,
+):
+    """
+    Process the (target, new hash, old hash, function) jobs of every target
+    in one run, submitted in order. All targets share one worker pool;
+    each worker keeps its graph pool and renderer warm across targets.
+    Results go to `store` if given; this process is its only writer.
+    The graph pool stats of all workers are printed at the end.
+    """
+    worker_stats: dict[int, dict] = {}
+    with concurrent.futures.ProcessPoolExecutor(
+        workers, initializer=configure_pool, initargs=(pool_budget,)
+    ) as pool:
+        futures = [
+            pool.submit(
+                compare_in_worker,
+                target,
+                new_hash,
+                old_hash,
+                f,
+                solver,
+                context,
+                memory_budget,
+                threads,
+                store is not None,
+            )
+            for target, new_hash, old_hash, f in jobs
         ]
+        for future in concurrent.futures.as_completed(futures):
+            report, stored, (pid, stats) = future.result()
+            worker_stats[pid] = stats
+            if report:
+                print(report)
+            if stored is not None:
+                store.add_diff(stored)
+
+    n = len(worker_stats)
+    print(
+        f"{summarize(merge_stats(worker_stats.values()))} "
+        f"over {n} worker{'s' if n != 1 else ''}"
     )
 
-    for v_old in comp[1:]:
 
-        # --Suggestion.
-        # Get a "Patch" with v[0] and v[1], and
-        # Compare the (v[0], {v[2], v[3] ... v[n]}) to detect the diff-ed vulnerability
+def target_jobs(targets: list[Target]):
+    """
+    The (target, new hash, old hash, function) jobs of `comparisons`,
+    grouped by function so that consecutive jobs share the baseline graph.
+    """
+    for target in targets:
+        jobs = [
+            (new_hash, old_hash, f)
+            for new_hash, old_hash, fn_intersect in comparisons(target)
+            for f in fn_intersect
+        ]
+        for new_hash, old_hash, f in sorted(jobs, key=lambda job: job[2]):
+            yield target, new_hash, old_hash, f
+
+
+def run_stream(
+    jobs: list[tuple[Target, str, str, str]],
+    solver: str = "exact",
+    context: int | None = None,
+    memory_budget: int | None = None,
+    threads: int = 1,
+    prefetch_depth: int = PREFETCH_DEPTH,
+    parse_depth: int = PARSE_DEPTH,
+    pool_budget: int | None = None,
+    store: ResultStore | None = None,
+):
+    """
+    Single-process `run_targets`: upcoming DOT files are read on a thread
+    pool and parsed on a background thread while the current function is
+    matched and rendered. Reports are printed in job order.
+    """
+    configure_pool(pool_budget)
+    graphs = graph_pool()
+
+    def read(job) -> tuple[str | None, str | None]:
+        # Graphs already pooled (e.g. the baseline of the current function;
+        # jobs come grouped by function) are not read again.
+        target, new_hash, old_hash, f = job
+        return tuple(
+            None if (target.name, h, f) in graphs else read_dot(target.dot_path(h, f))
+            for h in (new_hash, old_hash)
+        )
 
-        # v_new = comp[0]
-        # for v_old in comp[1:]:
+    def parse(item):
+        job, (text_new, text_old) = item
+        target, new_hash, old_hash, f = job
 
-        old_hash, old_fn = v_old["hash"], set(v_old["symbol"])
+        def load(text: str | None):
+            # None: the graph was pooled when the job was read. If it has been
+            # evicted since, the pool reads the file again.
+            return None if text is None else lambda: topology.parse_cfg(text)
 
-        old_built_set = set(
-            [
-                fname[:-4]
-                for fname in os.listdir(
-                    f"build_output/{TARGET}/openssl-bcs-{old_hash}/"
-                )
-            ]
+        return (
+            job,
+            graphs.get(target, new_hash, f, load(text_new)),
+            graphs.get(target, old_hash, f, load(text_old)),
         )
 
-        new_fn &= new_built_set
-        old_fn &= old_built_set
+    for (target, new_hash, old_hash, f), Gn, Go in stage(
+        prefetch(jobs, read, prefetch_depth), parse, parse_depth
+    ):
+        report, stored = compare_graphs(
+            Gn,
+            Go,
+            new_hash,
+            old_hash,
+            f,
+            solver,
+            context,
+            memory_budget,
+            threads,
+            target.name if store is not None else None,
+        )
+        if report:
+            print(report)
+        if stored is not None:
+            store.add_diff(stored)
 
-        fn_only_new = new_fn - old_fn
-        fn_only_old = old_fn - new_fn
-        fn_intersect = new_fn & old_fn
+    print(graphs.summary())
 
-        hash_same, hash_diff = [], []
 
-        for f in fn_intersect:
-            Gn = topology.build_cfg_from_dot(
-                f"build_output/{TARGET}/openssl-bcs-{new_hash}/{f}.dot"
-            )
-            Go = topology.build_cfg_from_dot(
-                f"build_output/{TARGET}/openssl-bcs-{old_hash}/{f}.dot"
-            )
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        description="Diff every function of compares_target.json[0] against the other commits."
+    )
+    parser.add_argument(
+        "targets",
+        nargs="+",
+        metavar="NAME[:PROJECT]",
+        help="e.g. `libarchive` or `bn_sqrt:openssl`",
+    )
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument(
+        "--solver",
+        choices=topology.MATCHERS,
+        default="exact",
+        help="Assignment solver; greedy / auction for a fast triage diff, "
+        "propagate to match along the CFG structure first, "
+        "hierarchical to assign blocks within matched regions (large functions)",
+    )
+    parser.add_argument(
+        "--context",
+        type=int,
+        default=None,
+        metavar="K",
+        help="Render only changed blocks and K hops of unchanged context",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        default=None,
+        metavar="MB",
+        help="Per-worker memory budget; larger functions are matched out of core "
+        "on a sparse candidate set",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=1,
+        help="Threads per worker for one function's cost matrix; "
+        "for targets dominated by a few huge functions",
+    )
+    parser.add_argument(
+        "--pool-budget",
+        type=int,
+        default=None,
+        metavar="MB",
+        help="Per-process budget of the parsed graph pool",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Single process; prefetch and parse upcoming functions on threads "
+        "while matching (ignores -j)",
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=PREFETCH_DEPTH,
+        metavar="N",
+        help="--stream: functions read ahead",
+    )
+    parser.add_argument(
+        "--parse-depth",
+        type=int,
+        default=PARSE_DEPTH,
+        metavar="N",
+        help="--stream: parsed functions queued ahead of matching",
+    )
+    parser.add_argument(
+        "--prioritize",
+        action="store_true",
+        help="Match functions in descending order of a cheap change score "
+        "(block / edge counts and opcode histograms); see src/convert/triage.py",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=None,
+        metavar="K",
+        help="Only match the K highest scoring jobs (implies --prioritize)",
+    )
+    parser.add_argument(
+        "--min-score",
+        type=float,
+        default=None,
+        metavar="S",
+        help="Only match jobs scoring at least S (implies --prioritize)",
+    )
+    parser.add_argument(
+        "--db",
+        nargs="?",
+        const=RESULTS_DB,
+        default=None,
+        metavar="PATH",
+        help=f"Also store matchings and edges in a SQLite results store "
+        f"(default path: {RESULTS_DB}); see src/convert/results.py",
+    )
+    parser.add_argument(
+        "--projects",
+        help="JSON file of extra project naming conventions "
+        '({"<project>": {"git_env": ..., "prefix": ...}})',
+    )
+    args = parser.parse_args(argv)
 
-            (v_same, v_diff, v_addr_matching, e_con, e_old, e_new) = (
-                topology.graph_isomorphism(Go, Gn)
-            )
+    setup_env()
 
-            if v_diff == [] and e_old == [] and e_new == []:
-                continue
+    if args.projects:
+        load_projects(args.projects)
 
-            print(
-                f"{Style.BRIGHT}{Back.RED}{f} @ {old_hash}{Style.RESET_ALL} vs\n{Style.BRIGHT}{Back.GREEN}{f} @ {new_hash}{Style.RESET_ALL}"
+    targets = [parse_target(spec) for spec in args.targets]
+    memory_budget = args.memory_budget and args.memory_budget << 20
+    pool_budget = args.pool_budget and args.pool_budget << 20
+    jobs = list(target_jobs(targets))
+    if args.prioritize or args.top is not None or args.min_score is not None:
+        ranked, scored, elapsed = rank_jobs(
+            jobs, args.top, args.min_score, args.prefetch
+        )
+        jobs = [job for _, job in ranked]
+        print(f"triage: {scored} jobs scored in {elapsed:.2f}s, {len(jobs)} scheduled")
+
+    store = args.db and ResultStore(args.db)
+    try:
+        if args.stream:
+            run_stream(
+                jobs,
+                args.solver,
+                args.context,
+                memory_budget,
+                args.threads,
+                args.prefetch,
+                args.parse_depth,
+                pool_budget,
+                store,
             )
-
-            if v_diff != []:
-                for v_old, v_new in v_diff:
-                    if v_old.llvm_ir != []:
-                        print(
-                            Fore.RED
-                            + "- [\n\t"
-                            + ";\n- \t".join(v_old.llvm_ir)
-                            + "\n- ]"
-                        )
-                    if v_new.llvm_ir != []:
-                        print(
-                            Fore.GREEN
-                            + "+ [\n\t"
-                            + ";\n+ \t".join(v_new.llvm_ir)
-                            + "\n+ ]\n"
-                        )
-
-            for edge in e_old:
-                v_src, v_dst = Go.nodes[edge[0]]["vertex"], Go.nodes[edge[1]]["vertex"]
-
-                print(
-                    Fore.RED
-                    + f"- {Go.edges[edge]['branch']}:\n- {v_src.llvm_ir_optype} ->\n- {v_dst.llvm_ir_optype}\n"
-                )
-
-            for edge in e_new:
-                v_src, v_dst = Gn.nodes[edge[0]]["vertex"], Gn.nodes[edge[1]]["vertex"]
-
-                print(
-                    Fore.GREEN
-                    + f"+ {Gn.edges[edge]['branch']}:\n+ {v_src.llvm_ir_optype} ->\n+ {v_dst.llvm_ir_optype}\n"
-                )
-
-            diffview.generate_diffview(
-                v_same,
-                v_diff,
-                v_addr_matching,
-                e_con,
-                e_old,
-                e_new,
-                func_name=f,
-                commit_hash=new_hash + "_" + old_hash,
+        else:
+            run_targets(
+                jobs,
+                args.workers,
+                args.solver,
+                args.context,
+                memory_budget,
+                args.threads,
+                pool_budget,
+                store,
             )
+    finally:
+        if store is not None:
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
 
 # Edit distance calculation should include the function symbol.
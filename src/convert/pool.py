@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import collections
+import os
+import sys
+from typing import Callable, Iterable
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+import src.graph.topology as topology
+from src.convert.targets import Target
+from src.graph.lazy import lazy_import
+
+nx = lazy_import("networkx")
+
+"""
+Process-wide pool of parsed CFGs keyed by (target, commit, function).
+
+Graphs are handed out frozen (`nx.freeze`): callers share one instance, so
+adding or removing nodes and edges raises. Least-recently-used graphs are
+evicted once the estimated size of the pool exceeds its budget.
+"""
+
+GRAPH_POOL_BUDGET = 512 << 20
+
+# Rough CPython footprint of a parsed graph, calibrated with tracemalloc:
+# node / edge dicts and the Vertex object, plus its IR and opcode strings.
+NODE_BYTES = 1000
+EDGE_BYTES = 300
+IR_CHAR_BYTES = 4
+
+
+def graph_size(g: nx.DiGraph) -> int:
+    ir_chars = sum(len(ir) for v in g.nodes for ir in g.nodes[v]["vertex"].llvm_ir)
+    return (
+        g.number_of_nodes() * NODE_BYTES
+        + g.number_of_edges() * EDGE_BYTES
+        + ir_chars * IR_CHAR_BYTES
+    )
+
+
+class GraphPool:
+    def __init__(self, budget: int = GRAPH_POOL_BUDGET):
+        self.budget: int = budget
+        self.entries: collections.OrderedDict = collections.OrderedDict()
+        self.size: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def __contains__(self, key: tuple[str, str, str]) -> bool:
+        return key in self.entries
+
+    def get(
+        self,
+        target: Target,
+        commit: str,
+        fname: str,
+        load: Callable[[], nx.DiGraph] | None = None,
+    ) -> nx.DiGraph:
+        """
+        The graph of `fname` at `commit`; parsed from its DOT file, or built
+        by `load` (e.g. from prefetched text), on a miss.
+        """
+        key = (target.name, commit, fname)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+
+        self.misses += 1
+        if load is None:
+            g = topology.build_cfg_from_dot(target.dot_path(commit, fname))
+        else:
+            g = load()
+        g = nx.freeze(g)
+        size = graph_size(g)
+        self.entries[key] = (g, size)
+        self.size += size
+
+        # The newest graph is kept even if it alone exceeds the budget.
+        while self.size > self.budget and len(self.entries) > 1:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.size -= evicted
+            self.evictions += 1
+        return g
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "budget": self.budget,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def summary(self) -> str:
+        return summarize(self.stats())
+
+
+def summarize(stats: dict) -> str:
+    total = stats["hits"] + stats["misses"]
+    return (
+        f"graph pool: {stats['hits']}/{total} hits, {stats['misses']} parsed, "
+        f"{stats['evictions']} evicted, {stats['entries']} graphs "
+        f"~{stats['bytes'] >> 20}/{stats['budget'] >> 20} MiB"
+    )
+
+
+def merge_stats(stats: Iterable[dict]) -> dict:
+    """
+    Sums the `GraphPool.stats` of several processes, e.g. pool workers.
+    """
+    merged = collections.Counter()
+    for s in stats:
+        merged.update(s)
+    return dict(merged)
+
+
+_pool: GraphPool | None = None
+
+
+def graph_pool() -> GraphPool:
+    global _pool
+    if _pool is None:
+        _pool = GraphPool()
+    return _pool
+
+
+def configure_pool(budget: int | None = None):
+    """
+    Replaces this process's pool; also usable as a worker initializer.
+    """
+    global _pool
+    _pool = GraphPool(GRAPH_POOL_BUDGET if budget is None else budget)
@@ -0,0 +1,380 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.cfgmatch.signature import edge_signature
+from src.graph.lazy import lazy_import
+
+nx = lazy_import("networkx")
+
+"""
+SQLite store of diff and evaluation results.
+
+    functions       (target, name)
+    commits         (target, hash)
+    diffs           one matching of a function: old commit -> new commit
+    vertex_matches  matched block pairs of a diff (NULL: inserted / deleted)
+    edges           deleted / added / conserved edges of a diff, each with the
+                    commit whose graph contains it and its `edge_signature`
+    evaluations     cfgmatch counts of one history commit against a patch
+
+Conserved edges are stored once per side, so `edges` holds every edge of both
+graphs of a diff: "which commits contain this edge" is an index lookup on
+(signature, commit). Writers buffer records and commit them in batches of
+BATCH_SIZE; matching workers only build plain `diff_record` dicts.
+
+    python src/convert/results.py edge <signature>
+    python src/convert/results.py patch <target> <function> <vulns> <patched>
+    python src/convert/results.py metrics <target>
+"""
+
+RESULTS_DB = "compare/results.db"
+BATCH_SIZE = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS functions (
+    id INTEGER PRIMARY KEY,
+    target TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (target, name)
+);
+CREATE TABLE IF NOT EXISTS commits (
+    id INTEGER PRIMARY KEY,
+    target TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    UNIQUE (target, hash)
+);
+CREATE TABLE IF NOT EXISTS diffs (
+    id INTEGER PRIMARY KEY,
+    function_id INTEGER NOT NULL REFERENCES functions (id),
+    old_commit_id INTEGER NOT NULL REFERENCES commits (id),
+    new_commit_id INTEGER NOT NULL REFERENCES commits (id),
+    solver TEXT NOT NULL,
+    total_cost REAL,
+    changed INTEGER NOT NULL,
+    created REAL NOT NULL,
+    UNIQUE (function_id, old_commit_id, new_commit_id, solver)
+);
+CREATE INDEX IF NOT EXISTS diffs_old ON diffs (old_commit_id);
+CREATE INDEX IF NOT EXISTS diffs_new ON diffs (new_commit_id);
+CREATE TABLE IF NOT EXISTS vertex_matches (
+    diff_id INTEGER NOT NULL REFERENCES diffs (id) ON DELETE CASCADE,
+    old_block TEXT,
+    new_block TEXT,
+    same INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS vertex_matches_diff ON vertex_matches (diff_id);
+CREATE TABLE IF NOT EXISTS edges (
+    diff_id INTEGER NOT NULL REFERENCES diffs (id) ON DELETE CASCADE,
+    commit_id INTEGER NOT NULL REFERENCES commits (id),
+    kind TEXT NOT NULL CHECK (kind IN ('deleted', 'added', 'conserved')),
+    src TEXT NOT NULL,
+    dst TEXT NOT NULL,
+    signature TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS edges_signature ON edges (signature, commit_id);
+CREATE INDEX IF NOT EXISTS edges_diff ON edges (diff_id, kind);
+CREATE TABLE IF NOT EXISTS evaluations (
+    id INTEGER PRIMARY KEY,
+    function_id INTEGER NOT NULL REFERENCES functions (id),
+    patched_commit_id INTEGER NOT NULL REFERENCES commits (id),
+    vulns_commit_id INTEGER NOT NULL REFERENCES commits (id),
+    history_commit_id INTEGER NOT NULL REFERENCES commits (id),
+    screened INTEGER NOT NULL,
+    tp INTEGER NOT NULL,
+    fp INTEGER NOT NULL,
+    fn INTEGER NOT NULL,
+    tn INTEGER NOT NULL,
+    created REAL NOT NULL,
+    UNIQUE (function_id, patched_commit_id, vulns_commit_id, history_commit_id)
+);
+CREATE INDEX IF NOT EXISTS evaluations_history ON evaluations (history_commit_id);
+"""
+
+# Edges of one stored diff: (target, function, old hash, new hash, kind or NULL).
+DIFF_EDGES = (
+    "SELECT e.kind, e.src, e.dst, e.signature FROM edges e "
+    "JOIN diffs d ON d.id = e.diff_id "
+    "JOIN functions f ON f.id = d.function_id "
+    "JOIN commits o ON o.id = d.old_commit_id "
+    "JOIN commits n ON n.id = d.new_commit_id "
+    "WHERE f.target = ? AND f.name = ? AND o.hash = ? AND n.hash = ? "
+    "AND (? IS NULL OR e.kind = ?)"
+)
+
+
+def diff_record(
+    target: str,
+    fname: str,
+    old_hash: str,
+    new_hash: str,
+    g_old: nx.DiGraph,
+    g_new: nx.DiGraph,
+    result: tuple,
+    solver: str = "exact",
+) -> dict:
+    """
+    Plain (picklable) record of one `graph_isomorphism` result.
+    """
+    same_vert, diff_vert, v_addr_matching, conserved_edge, del_edge, new_edge = result
+    report = getattr(result, "report", None)  # Custom matchers return plain tuples.
+    same = {(vo.name, vn.name) for vo, vn in same_vert}
+
+    edges = [
+        (old_hash, "deleted", src, dst, edge_signature(g_old, src, dst))
+        for src, dst in del_edge
+    ] + [
+        (new_hash, "added", src, dst, edge_signature(g_new, src, dst))
+        for src, dst in new_edge
+    ]
+    for (o_src, o_dst), (n_src, n_dst) in conserved_edge:
+        edges.append(
+            (old_hash, "conserved", o_src, o_dst, edge_signature(g_old, o_src, o_dst))
+        )
+        edges.append(
+            (new_hash, "conserved", n_src, n_dst, edge_signature(g_new, n_src, n_dst))
+        )
+
+    return {
+        "target": target,
+        "function": fname,
+        "old": old_hash,
+        "new": new_hash,
+        "solver": solver,
+        "total_cost": report and report.total_cost,
+        "changed": bool(diff_vert or del_edge or new_edge),
+        "vertices": [
+            (vo or None, vn or None, (vo, vn) in same) for vo, vn in v_addr_matching
+        ],
+        "edges": edges,
+    }
+
+
+class ResultStore:
+    def __init__(self, path: str = RESULTS_DB, batch_size: int = BATCH_SIZE):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db: sqlite3.Connection = sqlite3.connect(path)
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.executescript(SCHEMA)
+        self.batch_size: int = batch_size
+        self.pending: int = 0
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def flush(self):
+        self.db.commit()
+        self.pending = 0
+
+    def _written(self):
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def _id(self, table: str, column: str, target: str, value: str) -> int:
+        self.db.execute(
+            f"INSERT OR IGNORE INTO {table} (target, {column}) VALUES (?, ?)",
+            (target, value),
+        )
+        return self.db.execute(
+            f"SELECT id FROM {table} WHERE target = ? AND {column} = ?",
+            (target, value),
+        ).fetchone()[0]
+
+    def function_id(self, target: str, fname: str) -> int:
+        return self._id("functions", "name", target, fname)
+
+    def commit_id(self, target: str, commit: str) -> int:
+        return self._id("commits", "hash", target, commit)
+
+    def add_diff(self, record: dict):
+        """
+        Stores a `diff_record`, replacing an earlier result of the same diff.
+        """
+        target = record["target"]
+        commits = {h: self.commit_id(target, h) for h in (record["old"], record["new"])}
+        key = (
+            self.function_id(target, record["function"]),
+            commits[record["old"]],
+            commits[record["new"]],
+            record["solver"],
+        )
+        self.db.execute(
+            "DELETE FROM diffs WHERE function_id = ? AND old_commit_id = ? "
+            "AND new_commit_id = ? AND solver = ?",
+            key,
+        )
+        diff_id = self.db.execute(
+            "INSERT INTO diffs (function_id, old_commit_id, new_commit_id, solver, "
+            "total_cost, changed, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (*key, record["total_cost"], record["changed"], time.time()),
+        ).lastrowid
+        self.db.executemany(
+            "INSERT INTO vertex_matches VALUES (?, ?, ?, ?)",
+            [(diff_id, *vertex) for vertex in record["vertices"]],
+        )
+        self.db.executemany(
+            "INSERT INTO edges VALUES (?, ?, ?, ?, ?, ?)",
+            [(diff_id, commits[h], *edge) for h, *edge in record["edges"]],
+        )
+        self._written()
+
+    def add_evaluation(
+        self,
+        target: str,
+        fname: str,
+        patched: str,
+        vulns: str,
+        history: str,
+        counts: Counter,
+        screened: bool = False,
+    ):
+        self.db.execute(
+            "INSERT OR REPLACE INTO evaluations (function_id, patched_commit_id, "
+            "vulns_commit_id, history_commit_id, screened, tp, fp, fn, tn, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.function_id(target, fname),
+                self.commit_id(target, patched),
+                self.commit_id(target, vulns),
+                self.commit_id(target, history),
+                screened,
+                counts["tp"],
+                counts["fp"],
+                counts["fn"],
+                counts["tn"],
+                time.time(),
+            ),
+        )
+        self._written()
+
+    # Queries
+
+    def commits_with_edge(
+        self, signature: str, target: str | None = None
+    ) -> list[tuple[str, str, str]]:
+        """
+        (target, commit, function) of every stored graph containing an edge
+        with `signature`.
+        """
+        return self.db.execute(
+            "SELECT DISTINCT c.target, c.hash, f.name FROM edges e "
+            "JOIN commits c ON c.id = e.commit_id "
+            "JOIN diffs d ON d.id = e.diff_id "
+            "JOIN functions f ON f.id = d.function_id "
+            "WHERE e.signature = ? AND (? IS NULL OR c.target = ?) "
+            "ORDER BY c.target, c.hash, f.name",
+            (signature, target, target),
+        ).fetchall()
+
+    def diff_edges(
+        self, target: str, fname: str, old: str, new: str, kind: str | None = None
+    ) -> list[tuple[str, str, str, str]]:
+        """
+        (kind, src, dst, signature) of a stored diff's edges.
+        """
+        return self.db.execute(
+            DIFF_EDGES, (target, fname, old, new, kind, kind)
+        ).fetchall()
+
+    def patch_presence(
+        self, target: str, fname: str, vulns: str, patched: str
+    ) -> dict[str, tuple[int, int]]:
+        """
+        For each stored commit of `fname`: how many of the edge signatures
+        the patch (vulns -> patched) deleted its graph still contains,
+        out of how many.
+
+        The deleted signatures are joined in a subquery rather than bound as
+        parameters: a patch may delete more edges than SQLite allows variables.
+        """
+        deleted = {
+            sig for *_, sig in self.diff_edges(target, fname, vulns, patched, "deleted")
+        }
+        if not deleted:
+            return {}
+
+        rows = self.db.execute(
+            f"WITH deleted AS (SELECT DISTINCT signature FROM ({DIFF_EDGES})) "
+            "SELECT c.hash, COUNT(DISTINCT e.signature) FROM edges e "
+            "JOIN deleted s ON s.signature = e.signature "
+            "JOIN commits c ON c.id = e.commit_id "
+            "JOIN diffs d ON d.id = e.diff_id "
+            "JOIN functions f ON f.id = d.function_id "
+            "WHERE f.target = ? AND f.name = ? GROUP BY c.hash",
+            (target, fname, vulns, patched, "deleted", "deleted", target, fname),
+        ).fetchall()
+        return {commit: (found, len(deleted)) for commit, found in rows}
+
+    def metrics(self, target: str) -> dict[str, Counter]:
+        """
+        Summed evaluation counts per history commit, of the functions that
+        were matched (not screened out).
+        """
+        rows = self.db.execute(
+            "SELECT c.hash, SUM(tp), SUM(fp), SUM(fn), SUM(tn) FROM evaluations v "
+            "JOIN commits c ON c.id = v.history_commit_id "
+            "WHERE c.target = ? AND NOT v.screened GROUP BY c.hash",
+            (target,),
+        ).fetchall()
+        return {
+            commit: Counter(tp=tp, fp=fp, fn=fn, tn=tn)
+            for commit, tp, fp, fn, tn in rows
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the results store.")
+    parser.add_argument("--db", default=RESULTS_DB)
+    queries = parser.add_subparsers(dest="query", required=True)
+
+    sub = queries.add_parser("edge", help="Commits containing an edge signature")
+    sub.add_argument("signature")
+    sub.add_argument("--target", default=None)
+
+    sub = queries.add_parser(
+        "patch", help="Commits still containing a patch's deleted edges"
+    )
+    sub.add_argument("target")
+    sub.add_argument("function")
+    sub.add_argument("vulns")
+    sub.add_argument("patched")
+
+    sub = queries.add_parser("metrics", help="Evaluation counts per history commit")
+    sub.add_argument("target")
+
+    args = parser.parse_args()
+
+    with ResultStore(args.db) as store:
+        if args.query == "edge":
+            for target, commit, fname in store.commits_with_edge(
+                args.signature, args.target
+            ):
+                print(f"{target} {commit} {fname}")
+
+        elif args.query == "patch":
+            presence = store.patch_presence(
+                args.target, args.function, args.vulns, args.patched
+            )
+            for commit, (found, total) in sorted(presence.items()):
+                print(f"{commit} {found}/{total}")
+
+        else:
+            from src.cfgmatch.evaluate import Metrics
+
+            for commit, counts in sorted(store.metrics(args.target).items()):
+                print(Metrics.summary(commit, counts))
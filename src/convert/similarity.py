@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import csv
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+import src.graph.topology as topology
+from src.convert.main import setup_env
+from src.convert.targets import Target, load_projects, parse_target
+from src.graph.lazy import lazy_import
+from src.graph.solver import SOLVERS
+
+nx = lazy_import("networkx")
+np = lazy_import("numpy")
+
+"""
+All-pairs distance matrix between the versions of one function.
+
+matrix[k, i, j] is metric METRICS[k] of matching version j (old) against
+version i (new), in `compares_target.json` order. Only i < j is solved;
+the matrix is mirrored, with deleted and added edges swapped.
+"""
+
+METRICS = ("total_cost", "changed_blocks", "deleted_edges", "added_edges")
+# Metric of the reversed pair (old <-> new) each metric equals.
+MIRRORED = {"deleted_edges": "added_edges", "added_edges": "deleted_edges"}
+
+# Per worker process: every version's graph and features, loaded once.
+_versions: list[tuple[nx.DiGraph, topology.VertexFeatures]] = []
+
+
+def load_versions(
+    target: Target, hashes: list[str], fname: str
+) -> list[tuple[nx.DiGraph, topology.VertexFeatures]]:
+    versions = []
+    for h in hashes:
+        g = topology.build_cfg_from_dot(target.dot_path(h, fname))
+        versions.append((g, topology.VertexFeatures(g)))
+    return versions
+
+
+def _init_worker(versions: list[tuple[nx.DiGraph, topology.VertexFeatures]]):
+    global _versions
+    _versions = versions
+
+
+def compare_versions(i: int, j: int, solver: str = "exact") -> tuple[int, int, list]:
+    g_new, f_new = _versions[i]
+    g_old, f_old = _versions[j]
+
+    pairs, _, inserted, report = topology.assign_vertices(f_old, f_new, solver)
+    forward = dict(pairs)
+    _, diff_vert, _, _, del_edge, new_edge = topology.classify_matching(
+        g_old,
+        g_new,
+        [(v, forward.get(v)) for v in g_old.nodes] + [(None, v) for v in inserted],
+    )
+    return i, j, [report.total_cost, len(diff_vert), len(del_edge), len(new_edge)]
+
+
+def mirrored(values: list) -> list:
+    """
+    Metrics of the reversed pair: deleted edges become added ones and
+    vice versa; total cost and changed blocks are symmetric.
+    """
+    return [values[METRICS.index(MIRRORED.get(m, m))] for m in METRICS]
+
+
+def similarity_matrix(
+    target: Target,
+    hashes: list[str],
+    fname: str,
+    workers: int | None = None,
+    solver: str = "exact",
+) -> np.ndarray:
+    """
+    Returns a [len(METRICS), N, N] array over the versions `hashes`.
+    """
+    versions = load_versions(target, hashes, fname)
+    matrix = np.zeros((len(METRICS), len(hashes), len(hashes)))
+
+    with concurrent.futures.ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(versions,)
+    ) as pool:
+        futures = [
+            pool.submit(compare_versions, i, j, solver)
+            for i in range(len(hashes))
+            for j in range(i + 1, len(hashes))
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            i, j, values = future.result()
+            matrix[:, i, j] = values
+            matrix[:, j, i] = mirrored(values)
+
+    return matrix
+
+
+def save_matrix(path: str, hashes: list[str], matrix: np.ndarray):
+    """
+    `<path>.npy` holds the array; `<path>.csv` one row per (new, old) pair.
+    """
+    np.save(f"{path}.npy", matrix)
+    with open(f"{path}.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["new", "old", *METRICS])
+        for i in range(len(hashes)):
+            for j in range(i + 1, len(hashes)):
+                writer.writerow([hashes[i], hashes[j], *matrix[:, i, j]])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="All-pairs distance matrix of one function across compares_target.json versions."
+    )
+    parser.add_argument("target", metavar="NAME[:PROJECT]")
+    parser.add_argument("function")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--solver", choices=SOLVERS, default="exact")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="Output path without extension; compare/<name>/similarity_<function> by default",
+    )
+    parser.add_argument(
+        "--projects",
+        default=None,
+        help='JSON of extra projects: {"<project>": {"git_env": ..., "prefix": ...}}',
+    )
+    args = parser.parse_args()
+
+    setup_env()
+
+    if args.projects:
+        load_projects(args.projects)
+
+    target = parse_target(args.target)
+    hashes = [
+        ver["hash"]
+        for ver in target.compares_target()
+        if os.path.exists(target.dot_path(ver["hash"], args.function))
+    ]
+
+    matrix = similarity_matrix(target, hashes, args.function, args.workers, args.solver)
+
+    output = args.output or f"compare/{target.name}/similarity_{args.function}"
+    save_matrix(output, hashes, matrix)
+    print(f"{len(hashes)} versions -> {output}.npy, {output}.csv")
@@ -0,0 +1,99 @@
+import collections
+import concurrent.futures
+import queue
+import threading
+from typing import Callable, Iterable, Iterator
+
+"""
+Generator stages with bounded queues, for overlapping file reads, DOT
+parsing and matching in one process:
+
+    for job, g_new, g_old in stage(prefetch(jobs, read), parse):
+        match(...)
+
+Every stage holds at most `depth` finished items; when the consumer falls
+behind, the stage blocks (backpressure) instead of reading ahead without
+bound. Exceptions are re-raised in the consumer, in order.
+"""
+
+PREFETCH_DEPTH = 16
+PARSE_DEPTH = 4
+READ_THREADS = 4
+
+# Poll interval of a blocked producer, to notice a consumer that stopped.
+STAGE_POLL = 0.1
+
+
+def prefetch(
+    items: Iterable,
+    read: Callable,
+    depth: int = PREFETCH_DEPTH,
+    threads: int = READ_THREADS,
+) -> Iterator[tuple]:
+    """
+    Yields (item, read(item)) in order, with up to `depth` reads in flight
+    on a thread pool. File reads and decompression release the GIL.
+    """
+    with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+        pending = collections.deque()
+        try:
+            for item in items:
+                pending.append((item, pool.submit(read, item)))
+                if len(pending) >= depth:
+                    item, future = pending.popleft()
+                    yield item, future.result()
+            while pending:
+                item, future = pending.popleft()
+                yield item, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error: BaseException = error
+
+
+_DONE = object()
+
+
+def stage(items: Iterable, func: Callable, depth: int = PARSE_DEPTH) -> Iterator:
+    """
+    Yields func(item) for each item, computed on a background thread that
+    runs at most `depth` items ahead of the consumer.
+    """
+    results = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(value) -> bool:
+        while not stop.is_set():
+            try:
+                results.put(value, timeout=STAGE_POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(func(item)):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            if hasattr(items, "close"):
+                items.close()
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while (result := results.get()) is not _DONE:
+            if isinstance(result, _Failure):
+                raise result.error
+            yield result
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.convert.gitrepo import GitRepository, open_repository
+
+CTAGS_COMMAND = ["ctags", "--languages=C", "--kinds-C=f", "--output-format=json"]
+CTAGS_BATCH_SIZE = 64
+CTAGS_CONCURRENCY = os.cpu_count() or 4
+
+SYMBOL_CACHE_DIRECTORY = ".cache/symbols"
+
+
+class SymbolCache:
+    """
+    Function lists keyed by git blob hash; `<dir>/<hash[:2]>/<hash>.json`.
+    A blob's symbols never change, so entries never go stale.
+    """
+
+    def __init__(self, cache_dir: str = SYMBOL_CACHE_DIRECTORY):
+        self.cache_dir: str = cache_dir
+
+    def _path(self, blob: str) -> str:
+        return os.path.join(self.cache_dir, blob[:2], f"{blob}.json")
+
+    def get(self, blob: str) -> list[str] | None:
+        try:
+            with open(self._path(blob), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, blob: str, symbols: list[str]):
+        path = self._path(blob)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=os.path.dirname(path), delete=False
+        ) as f:
+            json.dump(symbols, f)
+        os.replace(f.name, path)
+
+
+class SymbolExtractor:
+    """
+    Extracts function symbols of files at given commits.
+
+    Files are read from git (no checkout), looked up by blob hash in the
+    cache, and only the missing blobs go to `ctags`, `batch_size` files per
+    invocation with at most `concurrency` invocations running at once.
+    """
+
+    def __init__(
+        self,
+        repo: GitRepository,
+        cache: SymbolCache | None = None,
+        concurrency: int = CTAGS_CONCURRENCY,
+        batch_size: int = CTAGS_BATCH_SIZE,
+    ):
+        self.repo: GitRepository = repo
+        self.cache: SymbolCache = cache or SymbolCache()
+        self.concurrency: int = concurrency
+        self.batch_size: int = batch_size
+
+    async def _run_ctags(
+        self, semaphore: asyncio.Semaphore, files: dict[str, str]
+    ) -> dict[str, list[str]]:
+        """
+        `files` maps a temporary file path to its blob hash.
+        Raises RuntimeError if ctags fails or its output cannot be parsed.
+        """
+        async with semaphore:
+            proc = await asyncio.create_subprocess_exec(
+                *CTAGS_COMMAND,
+                *files,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            stdout, stderr = await proc.communicate()
+
+        if proc.returncode != 0:
+            raise RuntimeError(
+                f"ctags exited with {proc.returncode}: {stderr.decode().strip()}"
+            )
+
+        symbols: dict[str, list[str]] = {blob: [] for blob in files.values()}
+        for func_info in stdout.decode().splitlines():
+            try:
+                tag = json.loads(func_info)
+            except json.JSONDecodeError:
+                raise RuntimeError(f"Malformed ctags output: {func_info!r}") from None
+            if (blob := files.get(tag.get("path"))) is not None:
+                symbols[blob].append(tag.get("name"))
+        return symbols
+
+    async def extract_many(
+        self, revs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], list[str]]:
+        """
+        Returns {(commit, path): [function name]}.
+        Paths missing at their commit are left out.
+        """
+        blobs = {
+            (commit, path): blob
+            for commit, path in revs
+            if (blob := self.repo.blob_hash(commit, path)) is not None
+        }
+
+        symbols: dict[str, list[str]] = {}
+        missing: dict[str, tuple[str, str]] = {}  # blob -> (commit, path)
+        for rev, blob in blobs.items():
+            if blob in symbols or blob in missing:
+                continue
+            if (cached := self.cache.get(blob)) is not None:
+                symbols[blob] = cached
+            else:
+                missing[blob] = rev
+
+        if missing:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            with tempfile.TemporaryDirectory() as tmpdir:
+                files = {}
+                for blob, (commit, path) in missing.items():
+                    # Keep the extension; ctags detects the language with it.
+                    file = os.path.join(tmpdir, blob + os.path.splitext(path)[1])
+                    with open(file, "wb") as f:
+                        f.write(self.repo.read_blob(commit, path))
+                    files[file] = blob
+
+                file_list = list(files.items())
+                batches = [
+                    dict(file_list[idx : idx + self.batch_size])
+                    for idx in range(0, len(file_list), self.batch_size)
+                ]
+                results = await asyncio.gather(
+                    *(self._run_ctags(semaphore, batch) for batch in batches),
+                    return_exceptions=True,
+                )
+
+            # Only successful batches are cached; a failed one is retried next time.
+            errors = [r for r in results if isinstance(r, BaseException)]
+            for result in results:
+                if isinstance(result, BaseException):
+                    continue
+                for blob, names in result.items():
+                    self.cache.put(blob, names)
+                    symbols[blob] = names
+            if errors:
+                raise errors[0]
+
+        return {rev: symbols[blob] for rev, blob in blobs.items()}
+
+    async def extract_commits(
+        self, commits: list[str], paths: list[str]
+    ) -> dict[str, list[str]]:
+        """
+        Returns {commit: [function name]} over all of `paths`.
+        """
+        per_rev = await self.extract_many(
+            [(commit, path) for commit in commits for path in paths]
+        )
+        return {
+            commit: list(
+                dict.fromkeys(
+                    name for path in paths for name in per_rev.get((commit, path), [])
+                )
+            )
+            for commit in commits
+        }
+
+    def symbols(self, commits: list[str], paths: list[str]) -> dict[str, list[str]]:
+        return asyncio.run(self.extract_commits(commits, paths))
+
+
+if __name__ == "__main__":
+    # python src/convert/symbols.py <git directory> <compares_target.json> <file> [file ...]
+    #   Fills the `symbol` list of every entry of compares_target.json.
+    basedir, target_json, *paths = sys.argv[1:]
+
+    with open(target_json, "r") as f:
+        comp = json.load(f)
+
+    extractor = SymbolExtractor(open_repository(basedir))
+    symbols = extractor.symbols([ver["hash"] for ver in comp], paths)
+    for ver in comp:
+        ver["symbol"] = symbols[ver["hash"]]
+
+    with open(target_json, "w") as f:
+        json.dump(comp, f, indent=4)
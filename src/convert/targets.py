@@ -0,0 +1,72 @@
+import json
+import os
+
+from src.convert.gitrepo import GitRepository, open_repository
+from src.graph.dotio import dot_functions, resolve_dot
+
+
+class Target:
+    """
+    One comparison target.
+
+    name    : directory under `compare/` and `build_output/`
+    git_env : environment variable holding the path of the project's clone
+    prefix  : build directory prefix, `build_output/<name>/<prefix>-<hash>/`
+    """
+
+    def __init__(self, name: str, git_env: str, prefix: str):
+        self.name: str = name
+        self.git_env: str = git_env
+        self.prefix: str = prefix
+
+    def __repr__(self):
+        return f"Target({self.name!r}, {self.git_env!r}, {self.prefix!r})"
+
+    def basedir(self) -> str | None:
+        return os.environ.get(self.git_env)
+
+    def repository(self) -> GitRepository:
+        return open_repository(self.basedir())
+
+    def compares_target(self) -> list[dict]:
+        with open(f"compare/{self.name}/compares_target.json", "r") as f:
+            return json.load(f)
+
+    def build_dir(self, commit: str) -> str:
+        return f"build_output/{self.name}/{self.prefix}-{commit}"
+
+    def dot_path(self, commit: str, fname: str) -> str:
+        # `.dot`, or its `.dot.gz` / `.dot.xz` / `.dot.zst` if stored compressed.
+        return resolve_dot(f"{self.build_dir(commit)}/{fname}.dot")
+
+    def built_functions(self, commit: str) -> set[str]:
+        return dot_functions(self.build_dir(commit))
+
+
+# Naming conventions of the projects we build.
+PROJECTS = {
+    "openssl": ("OPENSSL_GIT_DIRECTORY", "openssl-bcs"),
+    "libarchive": ("LIBARCHIVE_DIRECTORY", "libarchive-bcs"),
+}
+
+
+def load_projects(path: str):
+    """
+    Register extra projects from a JSON file:
+    {"<project>": {"git_env": "...", "prefix": "..."}}
+    """
+    with open(path, "r") as f:
+        for project, conv in json.load(f).items():
+            PROJECTS[project] = (conv["git_env"], conv["prefix"])
+
+
+def parse_target(spec: str) -> Target:
+    """
+    `<name>[:<project>]`; the project defaults to the name,
+    e.g. `libarchive` or `bn_sqrt:openssl`.
+    """
+    name, _, project = spec.partition(":")
+    project = project or name
+    if project not in PROJECTS:
+        raise ValueError(f"Unknown project {project!r} for target {name!r}")
+    return Target(name, *PROJECTS[project])
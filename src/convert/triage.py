@@ -0,0 +1,101 @@
+import collections
+import os
+import re
+import sys
+import time
+from typing import Iterable
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.convert.stream import PREFETCH_DEPTH, READ_THREADS, prefetch
+from src.graph.dotio import read_dot
+from src.graph.topology import node_label_preprocess
+from src.graph.vertex import instruction_parse
+
+"""
+Cheap change-magnitude estimate of a function between two commits, to
+schedule full matching in descending order of how much it changed.
+
+A `CFGProfile` is read straight off the DOT text (no pydot / networkx
+parse): block and edge counts, and the histogram of opcodes as
+`Vertex.llvm_ir_optype` sees them.
+
+    change_score = |blocks| + |edges| + |opcodes|
+
+with each term a normalized difference in [0, 1]. Zero does not prove
+the function unchanged (blocks may be rewired or reordered), but such
+functions sort last.
+"""
+
+NODE_STATEMENT = re.compile(
+    r'^\s*(Node\w+)\s*\[.*?label="((?:[^"\\]|\\.)*)".*\];?\s*$', re.M
+)
+EDGE_STATEMENT = re.compile(r"^\s*(Node\w+)(?::\w+)?\s*->\s*(Node\w+)", re.M)
+
+
+class CFGProfile:
+    def __init__(self, blocks: int, edges: int, opcodes: collections.Counter):
+        self.blocks: int = blocks
+        self.edges: int = edges
+        self.opcodes: collections.Counter = opcodes
+
+    @classmethod
+    def from_dot(cls, dot_text: str) -> "CFGProfile":
+        blocks, opcodes = 0, collections.Counter()
+        for _, label in NODE_STATEMENT.findall(dot_text):
+            blocks += 1
+            opcodes.update(instruction_parse(node_label_preprocess(label)[1]))
+        edges = len(set(EDGE_STATEMENT.findall(dot_text)))
+        return cls(blocks, edges, opcodes)
+
+
+def _relative(a: int, b: int) -> float:
+    return abs(a - b) / max(a, b, 1)
+
+
+def change_score(old: CFGProfile, new: CFGProfile) -> float:
+    moved = sum(((old.opcodes - new.opcodes) + (new.opcodes - old.opcodes)).values())
+    total = sum(old.opcodes.values()) + sum(new.opcodes.values())
+    return (
+        _relative(old.blocks, new.blocks)
+        + _relative(old.edges, new.edges)
+        + moved / max(total, 1)
+    )
+
+
+def rank_jobs(
+    jobs: Iterable[tuple],
+    top: int | None = None,
+    min_score: float | None = None,
+    depth: int = PREFETCH_DEPTH,
+    threads: int = READ_THREADS,
+) -> tuple[list[tuple[float, tuple]], int, float]:
+    """
+    Scores (target, new_hash, old_hash, f) jobs, reading DOT files ahead on
+    a thread pool. Returns the (score, job) pairs in descending score order,
+    cut to those scoring at least `min_score` and to the `top` best; then
+    the number of jobs scored and the seconds it took.
+    """
+    start = time.perf_counter()
+    profiles: dict[tuple[str, str, str], CFGProfile] = {}
+
+    def profile(target, commit: str, fname: str) -> CFGProfile:
+        # The baseline commit's profile is shared by every job of a function.
+        key = (target.name, commit, fname)
+        if key not in profiles:
+            profiles[key] = CFGProfile.from_dot(
+                read_dot(target.dot_path(commit, fname))
+            )
+        return profiles[key]
+
+    def read(job) -> float:
+        target, new_hash, old_hash, f = job
+        return change_score(profile(target, old_hash, f), profile(target, new_hash, f))
+
+    scored = [(score, job) for job, score in prefetch(jobs, read, depth, threads)]
+    # Stable: equal scores keep job order.
+    ranked = sorted(scored, key=lambda item: -item[0])
+    if min_score is not None:
+        ranked = [(score, job) for score, job in ranked if score >= min_score]
+    if top is not None:
+        ranked = ranked[:top]
+    return ranked, len(scored), time.perf_counter() - start
@@ -0,0 +1,189 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+import src.graph.topology as topology
+import src.visual.diffview as diffview
+from src.convert.main import setup_env
+from src.convert.pool import graph_pool
+from src.convert.targets import Target, load_projects, parse_target
+from src.pipeline.journal import Journal
+
+"""
+Watch `build_output/<name>/` and diff each newly built commit against a
+baseline commit, one function at a time.
+
+Processed (commit, function) pairs are kept in a state file; results are
+appended to a JSON-lines file, so old results are never recomputed.
+A build directory is taken as finished once nothing in it changed for
+`settle` seconds.
+"""
+
+POLL_INTERVAL = 10.0
+SETTLE_TIME = 30.0
+
+
+class WatchState:
+    """
+    {commit: [processed function, ...]}; each update is appended to a `Journal`.
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.journal: Journal = Journal(path)
+        self.processed: dict[str, list[str]] = self.journal.load({}, self._replay)
+
+    @staticmethod
+    def _replay(processed: dict[str, list[str]], record: dict):
+        functions = processed.setdefault(record["commit"], [])
+        if record["function"] not in functions:
+            functions.append(record["function"])
+
+    def pending(self, commit: str, functions: set[str]) -> list[str]:
+        return sorted(functions - set(self.processed.get(commit, [])))
+
+    def mark(self, commit: str, fname: str):
+        self.processed.setdefault(commit, []).append(fname)
+        self.journal.append({"commit": commit, "function": fname})
+
+    def compact(self):
+        """
+        Folds the journal into the state file.
+        """
+        self.journal.snapshot(self.processed)
+
+
+def built_commits(target: Target) -> list[str]:
+    root = os.path.dirname(target.build_dir(""))
+    if not os.path.isdir(root):
+        return []
+    return [
+        d[len(target.prefix) + 1 :]
+        for d in sorted(os.listdir(root))
+        if d.startswith(target.prefix + "-")
+    ]
+
+
+def is_settled(path: str, settle: float) -> bool:
+    latest = os.stat(path).st_mtime
+    for entry in os.scandir(path):
+        latest = max(latest, entry.stat().st_mtime)
+    return time.time() - latest >= settle
+
+
+def diff_function(
+    target: Target, baseline: str, commit: str, fname: str, solver: str = "exact"
+) -> dict:
+    Go = graph_pool().get(target, baseline, fname)
+    Gn = graph_pool().get(target, commit, fname)
+
+    result = topology.graph_isomorphism(Go, Gn, solver)
+    _, v_diff, _, _, e_old, e_new = result
+
+    changed = bool(v_diff or e_old or e_new)
+    if changed:
+        diffview.generate_diffview(
+            *result, func_name=fname, commit_hash=commit + "_" + baseline
+        )
+
+    return {
+        "commit": commit,
+        "baseline": baseline,
+        "function": fname,
+        "changed": changed,
+        "changed_blocks": len(v_diff),
+        "deleted_edges": [list(e) for e in e_old],
+        "added_edges": [list(e) for e in e_new],
+        "total_cost": result.report.total_cost,
+    }
+
+
+def poll(
+    target: Target,
+    baseline: str,
+    state: WatchState,
+    results_path: str,
+    pool: concurrent.futures.Executor,
+    settle: float = SETTLE_TIME,
+    solver: str = "exact",
+) -> int:
+    """
+    One pass over the build tree. Returns the number of functions submitted.
+    """
+    baseline_fn = target.built_functions(baseline)
+
+    futures = {}
+    for commit in built_commits(target):
+        if commit == baseline or not is_settled(target.build_dir(commit), settle):
+            continue
+        for fname in state.pending(
+            commit, target.built_functions(commit) & baseline_fn
+        ):
+            future = pool.submit(diff_function, target, baseline, commit, fname, solver)
+            futures[future] = (commit, fname)
+
+    with open(results_path, "a") as out:
+        for future in concurrent.futures.as_completed(futures):
+            commit, fname = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                # Not marked; retried on the next pass.
+                print(f"[FAILED] {fname} @ {commit}: {e}")
+                continue
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            state.mark(commit, fname)
+
+    state.compact()
+    return len(futures)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Diff newly built commits against a baseline as they appear."
+    )
+    parser.add_argument("target", metavar="NAME[:PROJECT]")
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="Baseline commit; the first entry of compares_target.json by default",
+    )
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--solver", choices=topology.MATCHERS, default="exact")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument("--settle", type=float, default=SETTLE_TIME)
+    parser.add_argument("--once", action="store_true", help="Single pass, then exit")
+    parser.add_argument("--state", default=None)
+    parser.add_argument("--results", default=None)
+    parser.add_argument(
+        "--projects",
+        default=None,
+        help='JSON of extra projects: {"<project>": {"git_env": ..., "prefix": ...}}',
+    )
+    args = parser.parse_args()
+
+    if os.path.exists(".setup"):
+        setup_env()
+
+    if args.projects:
+        load_projects(args.projects)
+
+    target = parse_target(args.target)
+    baseline = args.baseline or target.compares_target()[0]["hash"]
+    state = WatchState(args.state or f"compare/{target.name}/watch_state.json")
+    results_path = args.results or f"compare/{target.name}/watch_results.jsonl"
+
+    with concurrent.futures.ProcessPoolExecutor(args.workers) as pool:
+        while True:
+            if n := poll(
+                target, baseline, state, results_path, pool, args.settle, args.solver
+            ):
+                print(f"{n} functions diffed -> {results_path}")
+            if args.once:
+                break
+            time.sleep(args.interval)
@@ -0,0 +1,76 @@
+import argparse
+import json
+import socket
+import sys
+
+"""
+Thin client of the diff daemon (`src/daemon/server.py`).
+Standard library only, so it starts fast.
+
+    client.py diff     <target> <new> <old> <function> [--solver S]
+    client.py render   <target> <new> <old> <function> [--solver S] [--context K]
+    client.py evaluate <target> <patched> <vulns> <function> <history>... [--solver S] [--screen]
+    client.py stats
+    client.py shutdown
+"""
+
+SOCKET_PATH = ".cfgdiff.sock"
+
+
+class DiffClient:
+    def __init__(self, path: str = SOCKET_PATH):
+        self.sock: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.stream = self.sock.makefile("rwb")
+
+    def request(self, op: str, **kwargs):
+        self.stream.write(json.dumps({"op": op, **kwargs}).encode() + b"\n")
+        self.stream.flush()
+
+        reply = json.loads(self.stream.readline())
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        return reply["result"]
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the diff daemon.")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    ops = parser.add_subparsers(dest="op", required=True)
+
+    for op in ("diff", "render"):
+        sub = ops.add_parser(op)
+        sub.add_argument("target")
+        sub.add_argument("new")
+        sub.add_argument("old")
+        sub.add_argument("function")
+        sub.add_argument("--solver", default="exact")
+    sub.add_argument("--context", type=int, default=None)
+
+    sub = ops.add_parser("evaluate")
+    sub.add_argument("target")
+    sub.add_argument("patched")
+    sub.add_argument("vulns")
+    sub.add_argument("function")
+    sub.add_argument("history", nargs="+")
+    sub.add_argument("--solver", default="exact")
+    sub.add_argument("--screen", action="store_true")
+
+    ops.add_parser("stats")
+    ops.add_parser("shutdown")
+
+    args = vars(parser.parse_args())
+    path, op = args.pop("socket"), args.pop("op")
+
+    client = DiffClient(path)
+    try:
+        json.dump(client.request(op, **args), sys.stdout, indent=2)
+        print()
+    except RuntimeError as e:
+        sys.exit(str(e))
+    finally:
+        client.close()
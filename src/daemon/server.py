@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socketserver
+import sys
+import time
+import traceback
+from collections import OrderedDict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+import src.graph.topology as topology
+import src.visual.diffview as diffview
+from src.cfgmatch.evaluate import PatchDiff
+from src.convert.main import setup_env
+from src.convert.targets import Target, load_projects, parse_target
+from src.graph.lazy import lazy_import
+
+nx = lazy_import("networkx")
+
+"""
+Diff daemon. Keeps parsed CFGs, matching results and patch diffs in memory
+and answers requests over a Unix socket.
+
+Protocol: one JSON object per line in each direction.
+
+    {"op": "diff",     "target": T, "new": H, "old": H, "function": F, ["solver": S]}
+    {"op": "render",   "target": T, "new": H, "old": H, "function": F, ["solver": S, "context": K]}
+    {"op": "evaluate", "target": T, "patched": H, "vulns": H, "history": [H, ...], "function": F, ["solver": S, "screen": true]}
+    {"op": "stats"}
+    {"op": "shutdown"}
+
+Replies are {"ok": true, "result": ...} or {"ok": false, "error": "..."}.
+With "screen", history commits the signature screen rules out map to null
+instead of counts.
+Paths are relative to the daemon's working directory, as for the other scripts.
+"""
+
+SOCKET_PATH = ".cfgdiff.sock"
+CACHE_SIZE = 1024
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize: int = maxsize
+        self.entries: OrderedDict = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, key, build):
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        self.misses += 1
+        value = self.entries[key] = build()
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return value
+
+    def stats(self) -> dict:
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+class DiffService:
+    """
+    Request handlers with warm caches. Graphs are keyed by path and mtime,
+    so a rebuilt DOT file is parsed again.
+    """
+
+    def __init__(self, cache_size: int = CACHE_SIZE):
+        self.graphs: LRUCache = LRUCache(cache_size)
+        self.diffs: LRUCache = LRUCache(cache_size)
+        self.patches: LRUCache = LRUCache(cache_size)
+        self.started: float = time.time()
+
+    @staticmethod
+    def graph_key(target: Target, commit: str, fname: str) -> tuple[str, int]:
+        path = target.dot_path(commit, fname)
+        return path, os.stat(path).st_mtime_ns
+
+    def graph(self, key: tuple[str, int]) -> nx.DiGraph:
+        return self.graphs.get(key, lambda: topology.build_cfg_from_dot(key[0]))
+
+    def match(self, req: dict) -> topology.MatchResult:
+        target = parse_target(req["target"])
+        key_new = self.graph_key(target, req["new"], req["function"])
+        key_old = self.graph_key(target, req["old"], req["function"])
+        solver = req.get("solver", "exact")
+        return self.diffs.get(
+            (key_old, key_new, solver),
+            lambda: topology.graph_isomorphism(
+                self.graph(key_old), self.graph(key_new), solver
+            ),
+        )
+
+    def diff(self, req: dict) -> dict:
+        result = self.match(req)
+        same_vert, diff_vert, _, conserved_edge, del_edge, new_edge = result
+        return {
+            "same": [[vo.name, vn.name] for vo, vn in same_vert],
+            "changed": [[vo.name or None, vn.name or None] for vo, vn in diff_vert],
+            "conserved_edges": len(conserved_edge),
+            "deleted_edges": [list(e) for e in del_edge],
+            "added_edges": [list(e) for e in new_edge],
+            "total_cost": result.report.total_cost,
+            "gap": result.report.gap,
+        }
+
+    def render(self, req: dict) -> dict:
+        result = self.match(req)
+        commit_hash = req["new"] + "_" + req["old"]
+        if req.get("context") is None:
+            diffview.generate_diffview(
+                *result, func_name=req["function"], commit_hash=commit_hash
+            )
+        else:
+            diffview.generate_focused_diffview(
+                *result,
+                context=req["context"],
+                func_name=req["function"],
+                commit_hash=commit_hash,
+            )
+        return {"path": f"diffview_{req['function']}_{commit_hash}.dot"}
+
+    def evaluate(self, req: dict) -> dict:
+        target = parse_target(req["target"])
+        fname = req["function"]
+        key_vuln = self.graph_key(target, req["vulns"], fname)
+        key_patched = self.graph_key(target, req["patched"], fname)
+        solver = req.get("solver", "exact")
+        diff = self.patches.get(
+            (key_vuln, key_patched, solver),
+            lambda: PatchDiff.from_solver(
+                self.graph(key_vuln), self.graph(key_patched), solver
+            ),
+        )
+        if diff.unchanged():
+            return {}
+
+        result = {}
+        for h in req["history"]:
+            history_graph = self.graph(self.graph_key(target, h, fname))
+            if req.get("screen") and not diff.screen(history_graph):
+                result[h] = None
+            else:
+                result[h] = dict(diff.evaluate(history_graph, verbose=False))
+        return result
+
+    def stats(self, req: dict) -> dict:
+        return {
+            "uptime": time.time() - self.started,
+            "graphs": self.graphs.stats(),
+            "diffs": self.diffs.stats(),
+            "patches": self.patches.stats(),
+        }
+
+    def handle(self, req: dict) -> dict:
+        op = req.get("op")
+        if op not in ("diff", "render", "evaluate", "stats"):
+            raise ValueError(f"Unknown op {op!r}")
+        return getattr(self, op)(req)
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                req = json.loads(line)
+                if req.get("op") == "shutdown":
+                    self.reply({"ok": True, "result": None})
+                    self.server.shutdown_requested = True
+                    return
+                self.reply({"ok": True, "result": self.server.service.handle(req)})
+            except Exception as e:
+                self.reply(
+                    {
+                        "ok": False,
+                        "error": f"{type(e).__name__}: {e}",
+                        "traceback": traceback.format_exc(),
+                    }
+                )
+
+    def reply(self, obj: dict):
+        self.wfile.write(json.dumps(obj).encode() + b"\n")
+        self.wfile.flush()
+
+
+class DiffServer(socketserver.UnixStreamServer):
+    """
+    Serves one connection at a time; requests share the service's caches.
+    """
+
+    def __init__(self, path: str, service: DiffService):
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, RequestHandler)
+        self.service: DiffService = service
+        self.shutdown_requested: bool = False
+
+    def serve(self):
+        try:
+            while not self.shutdown_requested:
+                self.handle_request()
+        finally:
+            self.server_close()
+            os.unlink(self.server_address)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the diff daemon.")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    parser.add_argument(
+        "--projects",
+        default=None,
+        help='JSON of extra projects: {"<project>": {"git_env": ..., "prefix": ...}}',
+    )
+    args = parser.parse_args()
+
+    if os.path.exists(".setup"):
+        setup_env()
+
+    if args.projects:
+        load_projects(args.projects)
+
+    server = DiffServer(args.socket, DiffService(args.cache_size))
+    print(f"Listening on {args.socket}")
+    server.serve()
@@ -0,0 +1,176 @@
+import argparse
+import concurrent.futures
+import gzip
+import lzma
+import os
+import stat
+import tempfile
+
+"""
+Transparent reading of compressed DOT files, and a tool to recompress
+a `build_output/` tree in place.
+
+`<function>.dot` may be stored as `<function>.dot.gz`, `.dot.xz` or
+`.dot.zst` (the latter needs the optional `zstandard` package). Readers go
+through `resolve_dot` / `read_dot`, and function discovery through
+`dot_functions`, so they do not care which one is on disk.
+
+    python src/graph/dotio.py build_output/libarchive --format xz -j 8
+    python src/graph/dotio.py build_output/libarchive --format dot   # decompress
+"""
+
+COMPRESSED_SUFFIXES = {"gz": ".dot.gz", "xz": ".dot.xz", "zst": ".dot.zst"}
+DOT_SUFFIXES = (".dot", *COMPRESSED_SUFFIXES.values())
+FORMATS = ("dot", *COMPRESSED_SUFFIXES)
+
+# Levels of the recompress tool; DOT text compresses well at moderate levels.
+DEFAULT_LEVELS = {"gz": 6, "xz": 6, "zst": 10}
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "Reading or writing .dot.zst files requires the `zstandard` package"
+        ) from None
+    return zstandard
+
+
+def dot_name(filename: str) -> str | None:
+    """
+    Function name of a DOT file name in any of DOT_SUFFIXES; None otherwise.
+    """
+    for suffix in DOT_SUFFIXES:
+        if filename.endswith(suffix):
+            return filename[: -len(suffix)]
+    return None
+
+
+def dot_functions(directory: str) -> set[str]:
+    return {name for f in os.listdir(directory) if (name := dot_name(f)) is not None}
+
+
+def resolve_dot(path: str) -> str:
+    """
+    The file actually stored for `<function>.dot`: the plain file if it
+    exists, else its first compressed variant found. The plain path is
+    returned if none exists, so that callers fail (or test existence) as usual.
+    """
+    if os.path.exists(path) or not path.endswith(".dot"):
+        return path
+    for suffix in COMPRESSED_SUFFIXES.values():
+        if os.path.exists(path[: -len(".dot")] + suffix):
+            return path[: -len(".dot")] + suffix
+    return path
+
+
+def open_dot(path: str, mode: str = "rt"):
+    """
+    Opens a DOT file of any of DOT_SUFFIXES by its suffix.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    if path.endswith(".xz"):
+        return lzma.open(path, mode)
+    if path.endswith(".zst"):
+        return _zstandard().open(path, mode)
+    return open(path, mode)
+
+
+def read_dot(path: str) -> str:
+    with open_dot(resolve_dot(path)) as f:
+        return f.read()
+
+
+def _writer(path: str, fmt: str, level: int | None):
+    if fmt == "gz":
+        return gzip.open(path, "wb", compresslevel=level or DEFAULT_LEVELS["gz"])
+    if fmt == "xz":
+        return lzma.open(path, "wb", preset=level or DEFAULT_LEVELS["xz"])
+    if fmt == "zst":
+        zstandard = _zstandard()
+        return zstandard.open(
+            path,
+            "wb",
+            cctx=zstandard.ZstdCompressor(level=level or DEFAULT_LEVELS["zst"]),
+        )
+    return open(path, "wb")
+
+
+def recompress_file(path: str, fmt: str, level: int | None = None) -> tuple[int, int]:
+    """
+    Rewrites one DOT file in format `fmt` next to it and removes the original.
+    The new file is written to a temporary file first and keeps the original's
+    mode and mtime. Returns (bytes before, bytes after).
+    """
+    dest = dot_name(path) + (".dot" if fmt == "dot" else COMPRESSED_SUFFIXES[fmt])
+    st = os.stat(path)
+    if dest == path:
+        return st.st_size, st.st_size
+
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        with open_dot(path, "rb") as src, _writer(tmp, fmt, level) as dst:
+            while chunk := src.read(1 << 20):
+                dst.write(chunk)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+    # `mkstemp` creates the file owner-only.
+    os.chmod(tmp, stat.S_IMODE(st.st_mode))
+    os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.replace(tmp, dest)
+    os.unlink(path)
+    return st.st_size, os.stat(dest).st_size
+
+
+def recompress_tree(
+    root: str, fmt: str, level: int | None = None, workers: int | None = None
+) -> tuple[int, int, int]:
+    """
+    Recompresses every DOT file under `root`.
+    Returns (files, bytes before, bytes after).
+    """
+    if fmt == "zst":
+        _zstandard()  # Fail before touching any file.
+
+    paths = [
+        os.path.join(dirpath, f)
+        for dirpath, _, files in os.walk(root)
+        for f in files
+        if dot_name(f) is not None
+    ]
+
+    before = after = 0
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        for size_before, size_after in pool.map(
+            recompress_file,
+            paths,
+            [fmt] * len(paths),
+            [level] * len(paths),
+            chunksize=64,
+        ):
+            before += size_before
+            after += size_after
+    return len(paths), before, after
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Recompress the DOT files of a build_output/ tree in place."
+    )
+    parser.add_argument("roots", nargs="+")
+    parser.add_argument("--format", choices=FORMATS, default="xz")
+    parser.add_argument("--level", type=int, default=None)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    for root in args.roots:
+        files, before, after = recompress_tree(
+            root, args.format, args.level, args.workers
+        )
+        ratio = before / after if after else float("nan")
+        print(f"{root}: {files} files, {before} -> {after} bytes ({ratio:.1f}x)")
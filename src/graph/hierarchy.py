@@ -0,0 +1,257 @@
+from collections import Counter
+
+import networkx as nx
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from src.graph.edge import Edge
+from src.graph.solver import AssignmentReport
+from src.graph.topology import (
+    MatchResult,
+    VertexFeatures,
+    assign_vertices,
+    classify_matching,
+    get_root_node,
+)
+from src.graph.vertex import Vertex
+
+MAX_REGION_SIZE = 64
+REGION_MATCH_THRESHOLD = 0.5
+
+SIZE_DIFF_WEIGHT = 0.30
+OPHIST_DIFF_WEIGHT = 0.40
+LEVEL_DIFF_WEIGHT = 0.20
+LOOP_DIFF_WEIGHT = 0.10
+
+
+class Region:
+    def __init__(self, g: nx.DiGraph, members: list[str], max_level: int):
+        self.members: list[str] = members
+
+        vertices = [g.nodes[v]["vertex"] for v in members]
+        self.size: int = len(members)
+        self.optype_hist: Counter = Counter(
+            op for v in vertices for op in v.llvm_ir_optype
+        )
+        self.level: float = (
+            sum(max(v.level, 0) for v in vertices) / self.size / max(max_level, 1)
+        )
+
+        self.loop_size: int = sum(
+            len(scc)
+            for scc in nx.strongly_connected_components(g.subgraph(members))
+            if len(scc) > 1 or any(g.has_edge(v, v) for v in scc)
+        )
+
+
+def decompose_regions(
+    g: nx.DiGraph, max_region_size: int = MAX_REGION_SIZE
+) -> list[list[str]]:
+    """
+    Partition the CFG into single-entry regions.
+
+    Loops are collapsed first (SCC condensation), then the dominator tree of
+    the condensed DAG is cut bottom-up so that each region stays below
+    `max_region_size` blocks. A single SCC is never split.
+    """
+    cond = nx.condensation(g)
+    members = nx.get_node_attributes(cond, "members")
+    root = cond.graph["mapping"][get_root_node(g)]
+
+    idom = nx.immediate_dominators(cond, root)
+    children: dict[int, list[int]] = {c: [] for c in idom}
+    for c, parent in idom.items():
+        if c != root:
+            children[parent].append(c)
+
+    regions: list[list[str]] = []
+    pending: dict[int, list[str]] = {}
+
+    # Iterative post-order walk; dominator trees of huge functions are deep.
+    stack = [(root, False)]
+    while stack:
+        c, expanded = stack.pop()
+        if not expanded:
+            stack.append((c, True))
+            stack.extend((child, False) for child in children[c])
+            continue
+
+        acc = list(members[c])
+        for child in children[c]:
+            child_pending = pending.pop(child)
+            if len(acc) + len(child_pending) > max_region_size:
+                regions.append(child_pending)
+            else:
+                acc += child_pending
+        pending[c] = acc
+
+    regions.append(pending.pop(root))
+
+    # Unreachable blocks are not dominated by the entry; keep them on their own.
+    unreachable = [v for c in cond.nodes if c not in idom for v in members[c]]
+    if unreachable:
+        regions.append(unreachable)
+
+    return regions
+
+
+def region_distance(r_old: Region, r_new: Region) -> float:
+    size_diff = abs(r_old.size - r_new.size) / max(r_old.size, r_new.size, 1)
+
+    ophist_total = sum(r_old.optype_hist.values()) + sum(r_new.optype_hist.values())
+    ophist_diff = sum(
+        (
+            (r_old.optype_hist - r_new.optype_hist)
+            + (r_new.optype_hist - r_old.optype_hist)
+        ).values()
+    ) / max(ophist_total, 1)
+
+    level_diff = abs(r_old.level - r_new.level)
+
+    loop_diff = abs(
+        r_old.loop_size / max(r_old.size, 1) - r_new.loop_size / max(r_new.size, 1)
+    )
+
+    return (
+        size_diff * SIZE_DIFF_WEIGHT
+        + ophist_diff * OPHIST_DIFF_WEIGHT
+        + level_diff * LEVEL_DIFF_WEIGHT
+        + loop_diff * LOOP_DIFF_WEIGHT
+    )
+
+
+def region_distances(
+    regions_old: list[Region], regions_new: list[Region]
+) -> np.ndarray:
+    """
+    `region_distance` of every (old, new) region pair, as a float32 matrix.
+    """
+    size_old = np.array([r.size for r in regions_old], dtype=np.float64)[:, None]
+    size_new = np.array([r.size for r in regions_new], dtype=np.float64)[None, :]
+    size_diff = np.abs(size_old - size_new) / np.maximum(
+        np.maximum(size_old, size_new), 1
+    )
+
+    # One opcode at a time keeps the temporaries at (old, new).
+    ops = sorted({op for r in regions_old + regions_new for op in r.optype_hist})
+    moved = np.zeros((len(regions_old), len(regions_new)))
+    for op in ops:
+        count_old = np.array([r.optype_hist[op] for r in regions_old], dtype=np.float64)
+        count_new = np.array([r.optype_hist[op] for r in regions_new], dtype=np.float64)
+        moved += np.abs(count_old[:, None] - count_new[None, :])
+    total_old = np.array([sum(r.optype_hist.values()) for r in regions_old])
+    total_new = np.array([sum(r.optype_hist.values()) for r in regions_new])
+    ophist_diff = moved / np.maximum(total_old[:, None] + total_new[None, :], 1)
+
+    level_old = np.array([r.level for r in regions_old])[:, None]
+    level_new = np.array([r.level for r in regions_new])[None, :]
+
+    loop_old = np.array([r.loop_size for r in regions_old])[:, None] / size_old
+    loop_new = np.array([r.loop_size for r in regions_new])[None, :] / size_new
+
+    return (
+        size_diff * SIZE_DIFF_WEIGHT
+        + ophist_diff * OPHIST_DIFF_WEIGHT
+        + np.abs(level_old - level_new) * LEVEL_DIFF_WEIGHT
+        + np.abs(loop_old - loop_new) * LOOP_DIFF_WEIGHT
+    ).astype(np.float32)
+
+
+def hierarchical_graph_isomorphism(
+    g_old: nx.DiGraph,
+    g_new: nx.DiGraph,
+    max_region_size: int = MAX_REGION_SIZE,
+    region_threshold: float = REGION_MATCH_THRESHOLD,
+    solver: str = "exact",
+    threads: int = 1,
+) -> tuple[
+    list[tuple[Vertex, Vertex]],
+    list[tuple[Vertex, Vertex]],
+    list[tuple[str, str]],
+    list[tuple[Edge, Edge]],
+    list[Edge],
+    list[Edge],
+]:
+    """
+    Same result as `topology.graph_isomorphism`, but block-level assignment
+    only runs inside matched region pairs.
+
+    1. Decompose both CFGs into regions.
+    2. Match regions by aggregate features; pairs above `region_threshold` are dropped.
+    3. Assign blocks within each matched region pair.
+    4. Blocks left over from 2. and 3. go through one global assignment.
+
+    Only the pairs inside matched regions are costed, so the quadratic cost
+    matrix and the cubic assignment shrink to the sum over regions. The
+    `report` adds up the assignments solved; it does not bound what the
+    region restriction itself costs.
+    """
+    max_level_old = max(
+        (g_old.nodes[v]["vertex"].level for v in g_old.nodes), default=0
+    )
+    max_level_new = max(
+        (g_new.nodes[v]["vertex"].level for v in g_new.nodes), default=0
+    )
+
+    regions_old = [
+        Region(g_old, members, max_level_old)
+        for members in decompose_regions(g_old, max_region_size)
+    ]
+    regions_new = [
+        Region(g_new, members, max_level_new)
+        for members in decompose_regions(g_new, max_region_size)
+    ]
+
+    region_dist = region_distances(regions_old, regions_new)
+    old_ids, new_ids = linear_sum_assignment(region_dist)
+
+    features_old, features_new = VertexFeatures(g_old), VertexFeatures(g_new)
+
+    node_pairs: list[tuple[str | None, str | None]] = []
+    leftover_old, leftover_new = [], []
+    matched_old, matched_new = set(), set()
+    reports: list[AssignmentReport] = []
+
+    for i, j in zip(old_ids, new_ids):
+        if region_dist[i][j] > region_threshold:
+            continue
+        matched_old.add(i)
+        matched_new.add(j)
+        pairs, rest_old, rest_new, report = assign_vertices(
+            features_old.subset(regions_old[i].members),
+            features_new.subset(regions_new[j].members),
+            solver,
+            threads,
+        )
+        reports.append(report)
+        node_pairs += pairs
+        leftover_old += rest_old
+        leftover_new += rest_new
+
+    leftover_old += [
+        v for i, r in enumerate(regions_old) if i not in matched_old for v in r.members
+    ]
+    leftover_new += [
+        v for j, r in enumerate(regions_new) if j not in matched_new for v in r.members
+    ]
+
+    # Global fallback
+    pairs, rest_old, rest_new, report = assign_vertices(
+        features_old.subset(leftover_old),
+        features_new.subset(leftover_new),
+        solver,
+        threads,
+    )
+    reports.append(report)
+    node_pairs += pairs
+    node_pairs += [(v, None) for v in rest_old]
+    node_pairs += [(None, v) for v in rest_new]
+
+    return MatchResult(
+        classify_matching(g_old, g_new, node_pairs),
+        AssignmentReport(
+            solver,
+            sum(r.total_cost for r in reports),
+            sum(r.lower_bound for r in reports),
+        ),
+    )
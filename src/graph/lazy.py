@@ -0,0 +1,31 @@
+import importlib
+import types
+
+"""
+Deferred imports of the heavy dependencies (networkx, numpy, scipy, pydot).
+
+    np = lazy_import("numpy")
+
+binds a placeholder module; the real import happens on the first attribute
+access, e.g. `np.zeros`. Scripts that only parse arguments, list targets or
+read manifests never pay for them, and neither do worker processes until
+they match their first graph.
+
+Modules using this need `from __future__ import annotations`, so that
+annotations such as `np.ndarray` are not evaluated at import time.
+"""
+
+
+class LazyModule(types.ModuleType):
+    def __getattr__(self, attr: str):
+        module = importlib.import_module(self.__name__)
+        # Later lookups hit the copied namespace, not `__getattr__`.
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return f"<lazy module {self.__name__!r}>"
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    return LazyModule(name)
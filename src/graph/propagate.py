@@ -0,0 +1,140 @@
+from collections import Counter, defaultdict, deque
+
+import networkx as nx
+import numpy as np
+
+from src.graph.edge import Edge
+from src.graph.topology import (
+    MatchResult,
+    VertexFeatures,
+    assign_vertices,
+    branch_label,
+    classify_matching,
+    get_root_node,
+    pair_costs,
+)
+from src.graph.vertex import Vertex
+
+PROPAGATION_THRESHOLD = 0.30
+
+
+def exact_anchors(g_old: nx.DiGraph, g_new: nx.DiGraph) -> list[tuple[str, str]]:
+    """
+    Blocks whose opcode sequence occurs exactly once in each graph.
+    """
+    sig_old = {v: tuple(g_old.nodes[v]["vertex"].llvm_ir_optype) for v in g_old.nodes}
+    sig_new = {v: tuple(g_new.nodes[v]["vertex"].llvm_ir_optype) for v in g_new.nodes}
+    count_old, count_new = Counter(sig_old.values()), Counter(sig_new.values())
+
+    unique_new = {sig: v for v, sig in sig_new.items() if count_new[sig] == 1}
+    return [
+        (v, unique_new[sig])
+        for v, sig in sig_old.items()
+        if count_old[sig] == 1 and sig in unique_new
+    ]
+
+
+def neighbours_by_label(
+    g: nx.DiGraph, v: str, matched: dict[str, str]
+) -> dict[tuple[str, str], list[str]]:
+    """
+    Unmatched successors and predecessors of `v`, keyed by (direction, branch label).
+    """
+    groups = defaultdict(list)
+    for succ in g.successors(v):
+        if succ not in matched:
+            groups["succ", branch_label(g, v, succ)].append(succ)
+    for pred in g.predecessors(v):
+        if pred not in matched:
+            groups["pred", branch_label(g, pred, v)].append(pred)
+    return groups
+
+
+def propagation_graph_isomorphism(
+    g_old: nx.DiGraph,
+    g_new: nx.DiGraph,
+    threshold: float = PROPAGATION_THRESHOLD,
+    solver: str = "exact",
+    threads: int = 1,
+) -> tuple[
+    list[tuple[Vertex, Vertex]],
+    list[tuple[Vertex, Vertex]],
+    list[tuple[str, str]],
+    list[tuple[Edge, Edge]],
+    list[Edge],
+    list[Edge],
+]:
+    """
+    Same result as `topology.graph_isomorphism`, but blocks are matched by
+    following the graph structure first.
+
+    1. Seed with the entry blocks and blocks with a unique, identical opcode sequence.
+    2. From each matched pair, match the unmatched neighbours reached over the
+       same edge direction and branch label, when that neighbour is unique on
+       both sides and its edit distance is within `threshold`; repeat.
+    3. Blocks left over go through one global assignment; its `report`
+       covers that residue only.
+    """
+    features_old, features_new = VertexFeatures(g_old), VertexFeatures(g_new)
+    index_old = {v: i for i, v in enumerate(features_old.nodes)}
+    index_new = {v: j for j, v in enumerate(features_new.nodes)}
+
+    forward: dict[str, str] = {}
+    backward: dict[str, str] = {}
+    queue: deque[tuple[str, str]] = deque()
+
+    def try_match(candidates: list[tuple[str, str]]):
+        candidates = [
+            (vo, vn)
+            for vo, vn in candidates
+            if vo not in forward and vn not in backward
+        ]
+        if not candidates:
+            return
+        costs = pair_costs(
+            features_old,
+            np.array([index_old[vo] for vo, _ in candidates], dtype=np.intp),
+            features_new,
+            np.array([index_new[vn] for _, vn in candidates], dtype=np.intp),
+        )
+        for (vo, vn), cost in zip(candidates, costs):
+            if cost <= threshold and vo not in forward and vn not in backward:
+                forward[vo], backward[vn] = vn, vo
+                queue.append((vo, vn))
+
+    # 1. Seeds
+    seeds = []
+    if len(g_old) and len(g_new):
+        seeds.append((get_root_node(g_old), get_root_node(g_new)))
+    try_match(seeds + exact_anchors(g_old, g_new))
+
+    # 2. Extend along edges with the same branch label
+    while queue:
+        vo, vn = queue.popleft()
+        groups_old = neighbours_by_label(g_old, vo, forward)
+        groups_new = neighbours_by_label(g_new, vn, backward)
+        try_match(
+            [
+                (members[0], groups_new[key][0])
+                for key, members in groups_old.items()
+                if len(members) == 1 and len(groups_new.get(key, ())) == 1
+            ]
+        )
+
+    # 3. Residual
+    pairs, rest_old, rest_new, report = assign_vertices(
+        features_old.subset([v for v in features_old.nodes if v not in forward]),
+        features_new.subset([v for v in features_new.nodes if v not in backward]),
+        solver,
+        threads,
+    )
+    forward.update(pairs)
+
+    return MatchResult(
+        classify_matching(
+            g_old,
+            g_new,
+            [(v, forward.get(v)) for v in g_old.nodes] + [(None, v) for v in rest_new],
+        ),
+        report,
+    )
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+from collections import Counter
+
+from src.graph.lazy import lazy_import
+from src.graph.solver import AssignmentReport, auction_assignment, min_bound
+from src.graph.topology import (
+    MatchResult,
+    VertexFeatures,
+    classify_matching,
+    cost_matrix,
+    indel_cost,
+    signature_distances,
+)
+
+nx = lazy_import("networkx")
+np = lazy_import("numpy")
+optimize = lazy_import("scipy.optimize")
+
+SESSION_SOLVERS = ("exact", "auction")
+
+# Matcher names that re-match history versions through a session
+# (cfgmatch `--solver`, daemon "solver"), and the session solver they use.
+SESSION_MATCHERS = {"session": "exact"}
+
+
+class MatchingSession:
+    """
+    Matches one reference graph against many versions of the same function.
+
+    The reference graph's features, indel costs and signature distance rows
+    are kept between calls, so each version only pays for its own features
+    and the signatures not seen before. Every call solves the whole
+    assignment:
+
+    - "exact"   : Hungarian method; the same total cost as `graph_isomorphism`.
+    - "auction" : the reference vertices' dual prices from the previous call
+                  warm-start the auction; `report` bounds its gap.
+
+    `ref_side` tells which side of `graph_isomorphism` the reference is on;
+    `match(g)` returns what `graph_isomorphism(g, ref)` (or `(ref, g)`) does.
+    """
+
+    def __init__(self, g_ref: nx.DiGraph, ref_side: str = "new", solver: str = "exact"):
+        if ref_side not in ("old", "new"):
+            raise ValueError(f"Unknown side {ref_side!r}; expected 'old' or 'new'")
+        if solver not in SESSION_SOLVERS:
+            raise ValueError(
+                f"Unknown solver {solver!r}; expected one of {SESSION_SOLVERS}"
+            )
+
+        self.g_ref: nx.DiGraph = g_ref
+        self.ref_side: str = ref_side
+        self.solver: str = solver
+
+        self.features: VertexFeatures = VertexFeatures(g_ref)
+        self.indel: np.ndarray = indel_cost(self.features)
+        # other signature -> (IR distance row, call distance row) over reference signatures
+        self.signature_rows: dict[tuple[str, ...], tuple[np.ndarray, np.ndarray]] = {}
+
+        # Auction dual prices of the reference vertices and of the padding.
+        self.prices: np.ndarray | None = None
+        self.pad_price: float = 0.0
+
+        self.stats: Counter = Counter()
+
+    def _tables(self, f_other: VertexFeatures) -> tuple[np.ndarray, np.ndarray]:
+        missing = [sig for sig in f_other.signatures if sig not in self.signature_rows]
+        if missing:
+            if self.ref_side == "new":
+                ir, call = signature_distances(missing, self.features.signatures)
+            else:
+                ir, call = signature_distances(self.features.signatures, missing)
+                ir, call = ir.T, call.T
+            for sig, ir_row, call_row in zip(missing, ir, call):
+                self.signature_rows[sig] = (ir_row.copy(), call_row.copy())
+
+        ir_sig = np.stack([self.signature_rows[sig][0] for sig in f_other.signatures])
+        call_sig = np.stack([self.signature_rows[sig][1] for sig in f_other.signatures])
+        if self.ref_side == "new":
+            return ir_sig, call_sig
+        return ir_sig.T, call_sig.T
+
+    def _cost(self, f_other: VertexFeatures) -> np.ndarray:
+        """
+        [other vertex, reference vertex] edit distances.
+        """
+        if len(f_other) == 0 or len(self.features) == 0:
+            return np.empty((len(f_other), len(self.features)), dtype=np.float32)
+        tables = self._tables(f_other)
+        if self.ref_side == "new":
+            return cost_matrix(f_other, self.features, tables)
+        return cost_matrix(self.features, f_other, tables).T
+
+    @staticmethod
+    def _pad(
+        cost: np.ndarray, indel_rows: np.ndarray, indel_cols: np.ndarray
+    ) -> np.ndarray:
+        """
+        Square matrix where the excess side is matched with nonexistent vertices.
+        """
+        n, m = cost.shape
+        square = np.zeros((max(n, m), max(n, m)), dtype=np.float64)
+        square[:n, :m] = cost
+        square[:n, m:] = indel_rows[:, None]
+        square[n:, :m] = indel_cols[None, :]
+        return square
+
+    def match(self, g_other: nx.DiGraph) -> MatchResult:
+        f_other = VertexFeatures(g_other)
+        indel_other = indel_cost(f_other)
+        cost = self._cost(f_other)
+        n, m = cost.shape
+        square = self._pad(cost, indel_other, self.indel)
+
+        if self.solver == "auction":
+            warm = None
+            if self.prices is not None:
+                warm = np.full(len(square), self.pad_price)
+                warm[:m] = self.prices
+            rows, cols, prices, _ = auction_assignment(square, warm)
+            self.prices = prices[:m]
+            if len(prices) > m:
+                self.pad_price = float(prices[m:].mean())
+        else:
+            rows, cols = optimize.linear_sum_assignment(square)
+
+        pairs = {int(r): int(c) for r, c in zip(rows, cols) if r < n and c < m}
+        self.stats["solves"] += 1
+
+        return MatchResult(
+            self._classify(g_other, f_other, pairs),
+            self._report(square, cost, indel_other, pairs),
+        )
+
+    def _report(
+        self,
+        square: np.ndarray,
+        cost: np.ndarray,
+        indel_other: np.ndarray,
+        pairs: dict[int, int],
+    ) -> AssignmentReport:
+        matched_cols = set(pairs.values())
+        total = float(
+            sum(cost[i, j] for i, j in pairs.items())
+            + sum(c for i, c in enumerate(indel_other) if i not in pairs)
+            + sum(c for j, c in enumerate(self.indel) if j not in matched_cols)
+        )
+        if self.solver == "exact":
+            return AssignmentReport(self.solver, total, total)
+
+        # Dual bound of the padded problem for the final prices.
+        prices = np.full(len(square), self.pad_price)
+        prices[: len(self.prices)] = self.prices
+        bound = max(
+            min_bound(square),
+            float((square + prices[None, :]).min(axis=1).sum() - prices.sum()),
+        )
+        return AssignmentReport(self.solver, total, bound)
+
+    def _classify(
+        self, g_other: nx.DiGraph, f_other: VertexFeatures, pairs: dict[int, int]
+    ):
+        matched = {f_other.nodes[i]: self.features.nodes[j] for i, j in pairs.items()}
+        if self.ref_side == "new":
+            inserted = set(self.features.nodes) - set(matched.values())
+            return classify_matching(
+                g_other,
+                self.g_ref,
+                [(v, matched.get(v)) for v in g_other.nodes]
+                + [(None, v) for v in self.g_ref.nodes if v in inserted],
+            )
+
+        backward = {ref: other for other, ref in matched.items()}
+        return classify_matching(
+            self.g_ref,
+            g_other,
+            [(v, backward.get(v)) for v in self.g_ref.nodes]
+            + [(None, v) for v in g_other.nodes if v not in matched],
+        )
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+from src.graph.lazy import lazy_import
+
+np = lazy_import("numpy")
+optimize = lazy_import("scipy.optimize")
+sparse = lazy_import("scipy.sparse")
+csgraph = lazy_import("scipy.sparse.csgraph")
+
+SOLVERS = ("exact", "greedy", "auction", "sparse")
+
+AUCTION_EPSILON_SCALING = 5.0
+AUCTION_PRECISION = 1e-4
+AUCTION_WARM_START_SCALING = 25.0
+
+SPARSE_CANDIDATES = 16
+
+
+class AssignmentReport:
+    """
+    Total cost of an assignment and a lower bound of the optimum.
+    `gap` bounds how far the assignment is from the exact solution.
+    """
+
+    def __init__(self, solver: str, total_cost: float, lower_bound: float):
+        self.solver: str = solver
+        self.total_cost: float = total_cost
+        self.lower_bound: float = min(lower_bound, total_cost)
+
+    def __repr__(self):
+        return (
+            f"AssignmentReport({self.solver!r}, total_cost={self.total_cost:.4f}, "
+            f"gap<={self.gap:.4f})"
+        )
+
+    @property
+    def gap(self) -> float:
+        return self.total_cost - self.lower_bound
+
+    def shift(self, offset: float) -> "AssignmentReport":
+        return AssignmentReport(
+            self.solver, self.total_cost + offset, self.lower_bound + offset
+        )
+
+
+def min_bound(cost: np.ndarray) -> float:
+    """
+    Every vertex of the smaller side is matched at least at its cheapest cost.
+    """
+    if cost.shape[0] <= cost.shape[1]:
+        return float(cost.min(axis=1).sum())
+    return float(cost.min(axis=0).sum())
+
+
+def greedy_assignment(cost: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Best-first: repeatedly take the cheapest pair whose row and column are free.
+    """
+    n, m = cost.shape
+    order = np.argsort(cost, axis=None, kind="stable")
+    row_free, col_free = np.ones(n, dtype=bool), np.ones(m, dtype=bool)
+    rows, cols = [], []
+    for flat in order:
+        i, j = divmod(int(flat), m)
+        if row_free[i] and col_free[j]:
+            row_free[i], col_free[j] = False, False
+            rows.append(i)
+            cols.append(j)
+            if len(rows) == min(n, m):
+                break
+
+    rows, cols = np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def auction_assignment(
+    cost: np.ndarray,
+    prices: np.ndarray | None = None,
+    precision: float = AUCTION_PRECISION,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+    """
+    Gauss-Seidel forward auction with epsilon-scaling (Bertsekas) on a square
+    matrix. Rows bid for columns; `prices` may warm-start the column prices.
+    Warm-started prices are assumed to be close to optimal already, so the
+    first scaling phases are skipped.
+
+    Returns (rows, cols, prices, final epsilon). The assignment is within
+    n * epsilon of the optimum.
+    """
+    n = cost.shape[0]
+    benefit = -cost.astype(np.float64)
+
+    spread = float(benefit.max() - benefit.min()) if n else 0.0
+    eps_final = max(spread, 1.0) * precision / max(n, 1)
+    eps = max(spread / 2, eps_final)
+    if prices is not None:
+        eps = max(eps / AUCTION_WARM_START_SCALING, eps_final)
+
+    prices = np.zeros(n) if prices is None else prices.astype(np.float64).copy()
+    assigned = np.full(n, -1, dtype=np.intp)
+
+    while True:
+        owner = np.full(n, -1, dtype=np.intp)
+        assigned[:] = -1
+        unassigned = list(range(n))
+
+        while unassigned:
+            i = unassigned.pop()
+            values = benefit[i] - prices
+            j = int(np.argmax(values))
+            best = values[j]
+            values[j] = -np.inf
+            second = values.max() if n > 1 else best
+
+            prices[j] += best - second + eps
+            if owner[j] >= 0:
+                assigned[owner[j]] = -1
+                unassigned.append(owner[j])
+            owner[j], assigned[i] = i, j
+
+        if eps <= eps_final:
+            break
+        eps = max(eps / AUCTION_EPSILON_SCALING, eps_final)
+
+    return np.arange(n, dtype=np.intp), assigned, prices, eps
+
+
+def candidate_entries(
+    block: np.ndarray, row_offset: int = 0, k: int = SPARSE_CANDIDATES
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The `k` cheapest entries of each row of a row block starting at
+    `row_offset`, plus its diagonal entries. The diagonal guarantees that
+    a full matching exists among the candidates.
+
+    Returns global (rows, cols, values).
+    """
+    b, m = block.shape
+    k = min(k, m)
+    cols = np.argpartition(block, k - 1, axis=1)[:, :k]
+    rows = np.repeat(np.arange(b), k)
+    cols = cols.ravel()
+
+    diag = np.arange(b)[row_offset + np.arange(b) < m]
+    rows = np.concatenate([rows, diag])
+    cols = np.concatenate([cols, row_offset + diag])
+
+    # Drop diagonal entries that are also among the cheapest.
+    flat = np.unique(rows * m + cols)
+    rows, cols = np.divmod(flat, m)
+    return rows + row_offset, cols, block[rows, cols].astype(np.float64)
+
+
+def sparse_assignment(
+    shape: tuple[int, int],
+    rows: np.ndarray,
+    cols: np.ndarray,
+    values: np.ndarray,
+    lower_bound: float,
+) -> tuple[np.ndarray, np.ndarray, AssignmentReport]:
+    """
+    Min-cost full matching restricted to the candidate entries (LAPJVsp).
+    Exact on the candidates; `lower_bound` must hold for the full matrix.
+    """
+    # Missing entries are non-edges, so the weights are shifted to >= 1.
+    # Every full matching has min(shape) edges: the optimum is unchanged.
+    weights = values - values.min() + 1.0 if len(values) else values
+    graph = sparse.csr_matrix((weights, (rows, cols)), shape=shape)
+    row_ind, col_ind = csgraph.min_weight_full_bipartite_matching(graph)
+
+    flat = rows * shape[1] + cols
+    order = np.argsort(flat)
+    matched = order[np.searchsorted(flat[order], row_ind * shape[1] + col_ind)]
+    total = float(values[matched].sum())
+    return row_ind, col_ind, AssignmentReport("sparse", total, lower_bound)
+
+
+def solve_assignment(
+    cost: np.ndarray, solver: str = "exact"
+) -> tuple[np.ndarray, np.ndarray, AssignmentReport]:
+    """
+    Min-cost assignment of a (rectangular) cost matrix.
+    The smaller side is matched completely.
+    """
+    if solver == "exact":
+        rows, cols = optimize.linear_sum_assignment(cost)
+        total = float(cost[rows, cols].sum())
+        return rows, cols, AssignmentReport(solver, total, total)
+
+    if solver == "greedy":
+        rows, cols = greedy_assignment(cost)
+        total = float(cost[rows, cols].sum())
+        return rows, cols, AssignmentReport(solver, total, min_bound(cost))
+
+    if solver == "auction":
+        n, m = cost.shape
+        # Pad with zero-cost rows / columns; the square problem has the same optimum.
+        size = max(n, m)
+        square = np.zeros((size, size), dtype=np.float64)
+        square[:n, :m] = cost
+        rows, cols, prices, _ = auction_assignment(square)
+
+        keep = (rows < n) & (cols < m)
+        rows, cols = rows[keep], cols[keep]
+        total = float(cost[rows, cols].sum())
+
+        # Dual bound of the padded problem: u_i = min_j (c_ij + p_j), v_j = -p_j
+        dual = float((square + prices[None, :]).min(axis=1).sum() - prices.sum())
+        return rows, cols, AssignmentReport(solver, total, max(dual, min_bound(cost)))
+
+    if solver == "sparse":
+        rows, cols, values = candidate_entries(cost)
+        return sparse_assignment(cost.shape, rows, cols, values, min_bound(cost))
+
+    raise ValueError(f"Unknown solver {solver!r}; expected one of {SOLVERS}")
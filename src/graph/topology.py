@@ -1,22 +1,65 @@
+from __future__ import annotations
+
+import concurrent.futures
 import itertools
 import os
+import re
 import sys
-
-import networkx as nx
-import numpy as np
-from scipy.optimize import linear_sum_assignment
+import tempfile
 
 from typing import Iterable
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.graph.dotio import read_dot
 from src.graph.edge import Edge
+from src.graph.lazy import lazy_import
+from src.graph.solver import (
+    SOLVERS,
+    AssignmentReport,
+    candidate_entries,
+    solve_assignment,
+    sparse_assignment,
+)
 from src.graph.vertex import Vertex
 
+nx = lazy_import("networkx")
+np = lazy_import("numpy")
+pydot = lazy_import("pydot")
+
 IR_DIFF_WEIGHT = 0.50
 LEVEL_DIFF_WEIGHT = 0.20
 INDEG_DIFF_WEIGHT = 0.15
 OUTDEG_DIFF_WEIGHT = 0.15
 
+# `graph_isomorphism` solvers: the assignment solvers, or structural matchers
+# that only leave a residue to the global assignment ("exact").
+MATCHERS = (*SOLVERS, "propagate", "hierarchical")
+
+# Branch field of a record label: `<s0>T`, `<s1>F`, `<s2>3` (switch case).
+BRANCH_PORT = re.compile(r"<(\w+)>(.*)", re.S)
+
+# Out-of-core matching (`assign_vertices_blocked`)
+MEMORY_BUDGET = 1 << 30
+# Rough peak working set of the dense path per (old, new) pair: the float64
+# components and temporaries, the float32 matrix and the solver's copy.
+DENSE_BYTES_PER_PAIR = 96
+
+# Row chunks per thread of a threaded cost matrix build, for load balance.
+THREAD_CHUNKS = 4
+
+# Signatures per side of one tile of the vectorized edit distance
+# (`edit_distance_table`); tiles group signatures of similar length.
+EDIT_TILE = 64
+
+# Unweighted edit distance components, in the order of DEFAULT_WEIGHTS.
+COMPONENTS = ("ir", "level", "indeg", "outdeg")
+DEFAULT_WEIGHTS = (
+    IR_DIFF_WEIGHT,
+    LEVEL_DIFF_WEIGHT,
+    INDEG_DIFF_WEIGHT,
+    OUTDEG_DIFF_WEIGHT,
+)
+
 assert (
     round(
         IR_DIFF_WEIGHT + LEVEL_DIFF_WEIGHT + INDEG_DIFF_WEIGHT + OUTDEG_DIFF_WEIGHT, 3
@@ -161,7 +204,26 @@ def match_vertice_backward(v: list[tuple[int, int]], dst: int) -> int:
         return found[0][0]
 
 
-def graph_isomorphism(g_old: nx.DiGraph, g_new: nx.DiGraph) -> tuple[
+class MatchResult(tuple):
+    """
+    Unpacks as the `graph_isomorphism` 6-tuple;
+    `report` carries the total matching cost and its gap bound.
+    """
+
+    def __new__(cls, items, report: AssignmentReport | None = None):
+        result = super().__new__(cls, items)
+        result.report = report
+        return result
+
+
+def graph_isomorphism(
+    g_old: nx.DiGraph,
+    g_new: nx.DiGraph,
+    solver: str = "exact",
+    components_path: str | None = None,
+    memory_budget: int | None = None,
+    threads: int = 1,
+) -> tuple[
     list[tuple[Vertex, Vertex]],  # Same Vertices       - Mapping in (Old, New)
     list[tuple[Vertex, Vertex]],  # Different Vertices  - Mapping in (Old, New)
     list[tuple[str, str]],  # Vertex Address     - Mapping in (Old, New)
@@ -179,52 +241,790 @@ def graph_isomorphism(g_old: nx.DiGraph, g_new: nx.DiGraph) -> tuple[
     #   (Vo -> Vo) -> (Vn -> Vn) -> bool.
 
     # 1. Match Vertex-Vertex
-    #   1.1. Put extra null node for excessive nodes, easier graph matching.
+    #   1.1. Excessive nodes are matched with a nonexistent node.
+    #       Instead of padding the graphs with dummy nodes, the cost of
+    #       matching with a nonexistent node is given as an explicit
+    #       deletion (old) / insertion (new) cost. Inputs are left untouched.
+    #
+    #   1.2. Setup the vertex-vertex edit distance graph
+    #       Dim: [size_v_g_old * size_v_g_new]
+    #       edit_dist[i][j] := d(Vo_i, Ve_j)
 
-    size_v_g_old = g_old.number_of_nodes()
-    size_v_g_new = g_new.number_of_nodes()
-    size_v_array = max(size_v_g_old, size_v_g_new)
+    #   solver "propagate": seed-and-extend along the CFG first
+    #   (`propagate.propagation_graph_isomorphism`).
+    if solver == "propagate":
+        from src.graph.propagate import propagation_graph_isomorphism
 
-    if size_v_g_new > size_v_g_old:
-        for idx in range(size_v_g_new - size_v_g_old):
-            g_old.add_node(f"dummy_{idx}", vertex=Vertex())
-    elif size_v_g_old > size_v_g_new:
-        for idx in range(size_v_g_old - size_v_g_new):
-            g_new.add_node(f"dummy_{idx}", vertex=Vertex())
+        return propagation_graph_isomorphism(g_old, g_new, threads=threads)
 
-    assert g_old.number_of_nodes() == g_new.number_of_nodes()
+    #   solver "hierarchical": assign blocks within matched regions only
+    #   (`hierarchy.hierarchical_graph_isomorphism`).
+    if solver == "hierarchical":
+        from src.graph.hierarchy import hierarchical_graph_isomorphism
 
-    #   1.2. Setup the vertex-vertex edit distance graph
-    #       Dim: [size_v_g_new * size_v_g_old]
-    #       edit_dist[i][j] := d(Vo_i, Ve_j)
+        return hierarchical_graph_isomorphism(g_old, g_new, threads=threads)
+
+    features_old, features_new = VertexFeatures(g_old), VertexFeatures(g_new)
 
-    edit_dist = np.empty((size_v_array, size_v_array), dtype=np.float32)
+    # 2. Min-cost Bipartite Graph Matching
+    #   solver: "exact" (Hungarian), or "greedy" / "auction" for a fast triage diff.
+
+    #   components_path: also save the unweighted cost components (`CostComponents`)
+    #   to re-solve with other weights later.
 
-    g_old_array_index = {
-        old_idx: old_node for old_idx, old_node in enumerate(g_old.nodes)
-    }
-    g_new_array_index = {
-        new_idx: new_node for new_idx, new_node in enumerate(g_new.nodes)
-    }
+    #   memory_budget: functions whose dense working set would exceed it (bytes)
+    #   are matched out of core, on a sparse candidate set (`assign_vertices_blocked`).
 
-    for (old_idx, old_node), (new_idx, new_node) in itertools.product(
-        enumerate(g_old.nodes), enumerate(g_new.nodes)
+    #   threads: build the cost matrix in row chunks on a thread pool (`cost_matrix`).
+
+    if memory_budget is not None and (
+        dense_bytes(len(features_old), len(features_new)) > memory_budget
     ):
-        edit_dist[old_idx][new_idx] = vertex_edit_distance(
-            g_old, g_new, old_node, new_node
+        pairs, _, inserted, report = assign_vertices_blocked(
+            features_old, features_new, memory_budget, threads=threads
+        )
+    elif components_path is None:
+        pairs, _, inserted, report = assign_vertices(
+            features_old, features_new, solver, threads
         )
+    else:
+        components = CostComponents.from_features(features_old, features_new)
+        components.save(components_path)
+        pairs, _, inserted, report = components.assign(DEFAULT_WEIGHTS, solver)
 
-    # 2. Min-cost Bipartite Graph Matching
+    forward = dict(pairs)
+    return MatchResult(
+        classify_matching(
+            g_old,
+            g_new,
+            [(old_node, forward.get(old_node)) for old_node in g_old.nodes]
+            + [(None, new_node) for new_node in inserted],
+        ),
+        report,
+    )
+
+
+def signature_distance(
+    sig_old: tuple[str, ...], sig_new: tuple[str, ...]
+) -> tuple[float, float]:
+    """
+    IR edit distance between two opcode sequences, and the edit distance of
+    their call ops (NaN unless both sides have a call).
+    """
+    ir_diff = boolean_edit_distance(sig_old, sig_new)
+
+    sig_old_call_ops = [op for op in sig_old if op.startswith("call")]
+    sig_new_call_ops = [op for op in sig_new if op.startswith("call")]
+
+    if sig_old_call_ops and sig_new_call_ops:
+        call_diff = boolean_edit_distance(sig_old_call_ops, sig_new_call_ops)
+    else:
+        call_diff = np.nan
+
+    return float(ir_diff), float(call_diff)
+
+
+def batch_edit_distance(
+    a: np.ndarray, len_a: np.ndarray, b: np.ndarray, len_b: np.ndarray
+) -> np.ndarray:
+    """
+    Unnormalized `boolean_edit_distance` of every (a[p], b[q]) pair of
+    padded opcode-id rows, as an int32 [len(a), len(b)] array.
+
+    The DP table is computed one row (position of `b`) at a time for all
+    pairs at once; insertions along a row are a running minimum. Padding
+    never reaches the cells read back, which only depend on the prefixes.
+    """
+    cols = np.arange(a.shape[1] + 1, dtype=np.int32)
+    row = np.broadcast_to(cols, (len(a), len(b), len(cols))).copy()
+    dist = np.empty((len(a), len(b)), dtype=np.int32)
+    dist[:, len_b == 0] = len_a[:, None]
+
+    for i in range(1, b.shape[1] + 1):
+        nxt = np.empty_like(row)
+        nxt[..., 0] = i
+        np.minimum(
+            row[..., :-1] + (a[:, None, :] != b[None, :, i - 1, None]),
+            row[..., 1:] + 1,
+            out=nxt[..., 1:],
+        )
+        nxt -= cols
+        np.minimum.accumulate(nxt, axis=2, out=nxt)
+        nxt += cols
+        row = nxt
+
+        if (done := len_b == i).any():
+            dist[:, done] = np.take_along_axis(
+                row[:, done],
+                np.broadcast_to(len_a[:, None, None], (len(a), done.sum(), 1)),
+                axis=2,
+            )[..., 0]
+    return dist
+
+
+def padded(seqs: list[np.ndarray], fill: int) -> tuple[np.ndarray, np.ndarray]:
+    lengths = np.array([len(seq) for seq in seqs], dtype=np.int32)
+    rows = np.full((len(seqs), lengths.max(initial=0)), fill, dtype=np.int32)
+    for k, seq in enumerate(seqs):
+        rows[k, : len(seq)] = seq
+    return rows, lengths
+
+
+def edit_distance_table(
+    seqs_old: list[np.ndarray], seqs_new: list[np.ndarray], threads: int = 1
+) -> np.ndarray:
+    """
+    `boolean_edit_distance` of every (old, new) pair of opcode-id sequences,
+    as a [len(seqs_old), len(seqs_new)] table; bit-identical to it.
+    Tiles of EDIT_TILE x EDIT_TILE sequences run on `threads` threads
+    (the NumPy kernels release the GIL).
+    """
+    table = np.empty((len(seqs_old), len(seqs_new)))
+    order_old = np.argsort([len(seq) for seq in seqs_old], kind="stable")
+    order_new = np.argsort([len(seq) for seq in seqs_new], kind="stable")
+
+    def tile(rows: np.ndarray, cols: np.ndarray):
+        a, len_a = padded([seqs_old[k] for k in rows], -1)
+        b, len_b = padded([seqs_new[k] for k in cols], -2)
+        table[np.ix_(rows, cols)] = batch_edit_distance(a, len_a, b, len_b) / (
+            np.maximum(np.maximum.outer(len_a, len_b), 1)
+        )
+
+    tiles = [
+        (order_old[r : r + EDIT_TILE], order_new[c : c + EDIT_TILE])
+        for r in range(0, len(seqs_old), EDIT_TILE)
+        for c in range(0, len(seqs_new), EDIT_TILE)
+    ]
+    if threads <= 1:
+        for rows, cols in tiles:
+            tile(rows, cols)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+            for _ in pool.map(lambda t: tile(*t), tiles):
+                pass
+    return table
+
+
+def signature_distances(
+    sigs_old: list[tuple[str, ...]],
+    sigs_new: list[tuple[str, ...]],
+    threads: int = 1,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    `signature_distance` of every (old, new) signature pair, as
+    [old, new] IR and call distance tables.
+    """
+    vocab: dict[str, int] = {}
+
+    def encode(ops) -> np.ndarray:
+        return np.array(
+            [vocab.setdefault(op, len(vocab)) for op in ops], dtype=np.int32
+        )
+
+    ir = edit_distance_table(
+        [encode(sig) for sig in sigs_old], [encode(sig) for sig in sigs_new], threads
+    )
+
+    calls_old = [[op for op in sig if op.startswith("call")] for sig in sigs_old]
+    calls_new = [[op for op in sig if op.startswith("call")] for sig in sigs_new]
+    with_old = [k for k, ops in enumerate(calls_old) if ops]
+    with_new = [k for k, ops in enumerate(calls_new) if ops]
+
+    call = np.full((len(sigs_old), len(sigs_new)), np.nan)
+    if with_old and with_new:
+        call[np.ix_(with_old, with_new)] = edit_distance_table(
+            [encode(calls_old[k]) for k in with_old],
+            [encode(calls_new[k]) for k in with_new],
+            threads,
+        )
+    return ir, call
+
+
+class VertexFeatures:
+    """
+    Per-vertex arrays of one graph, in the order of `nodes`.
+    Identical opcode sequences share one entry of `signatures`.
+    """
+
+    def __init__(self, g: nx.DiGraph, nodes: list[str] | None = None):
+        nodes = list(g.nodes) if nodes is None else nodes
+        max_level = max(
+            max((g.nodes[v]["vertex"].level for v in g.nodes), default=1), 1
+        )
+
+        signature_ids: dict[tuple[str, ...], int] = {}
+        signature_id = []
+        level = []
+        for v in nodes:
+            vertex = g.nodes[v]["vertex"]
+            sig = tuple(vertex.llvm_ir_optype)
+            signature_id.append(signature_ids.setdefault(sig, len(signature_ids)))
+            level.append(vertex.level)
+
+        self.nodes: list[str] = nodes
+        self.index: dict[str, int] = {v: idx for idx, v in enumerate(nodes)}
+        self.signatures: list[tuple[str, ...]] = list(signature_ids)
+        self.signature_id: np.ndarray = np.array(signature_id, dtype=np.intp)
+
+        level = np.array(level, dtype=np.float64)
+        self.valid: np.ndarray = level != -1
+        self.level: np.ndarray = level / max_level
+        self.in_degree: np.ndarray = np.array(
+            [g.in_degree(v) for v in nodes], dtype=np.float64
+        )
+        self.out_degree: np.ndarray = np.array(
+            [g.out_degree(v) for v in nodes], dtype=np.float64
+        )
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def subset(self, nodes: list[str]) -> "VertexFeatures":
+        idx = np.array([self.index[v] for v in nodes], dtype=np.intp)
+        # Keep only the signatures in use, so tables stay the subset's size.
+        used, signature_id = np.unique(self.signature_id[idx], return_inverse=True)
+
+        sub = object.__new__(VertexFeatures)
+        sub.nodes = list(nodes)
+        sub.index = {v: i for i, v in enumerate(sub.nodes)}
+        sub.signatures = [self.signatures[k] for k in used]
+        sub.signature_id = signature_id.reshape(-1).astype(np.intp)
+        sub.valid = self.valid[idx]
+        sub.level = self.level[idx]
+        sub.in_degree = self.in_degree[idx]
+        sub.out_degree = self.out_degree[idx]
+        return sub
+
+
+def signature_tables(
+    f_old: VertexFeatures, f_new: VertexFeatures, threads: int = 1
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    `signature_distance` of every (old, new) signature pair in use,
+    as [old signature, new signature] IR and call distance tables.
+    Each unique pair is computed once per comparison; most blocks share a
+    handful of signatures. (`MatchingSession` keeps its rows across versions.)
+    """
+    sig_old = np.unique(f_old.signature_id)
+    sig_new = np.unique(f_new.signature_id)
+
+    ir_sig = np.empty((len(f_old.signatures), len(f_new.signatures)))
+    call_sig = np.empty((len(f_old.signatures), len(f_new.signatures)))
+    ir_sig[np.ix_(sig_old, sig_new)], call_sig[np.ix_(sig_old, sig_new)] = (
+        signature_distances(
+            [f_old.signatures[i] for i in sig_old],
+            [f_new.signatures[j] for j in sig_new],
+            threads,
+        )
+    )
+    return ir_sig, call_sig
+
+
+def cost_matrix(
+    f_old: VertexFeatures,
+    f_new: VertexFeatures,
+    tables: tuple[np.ndarray, np.ndarray] | None = None,
+    threads: int = 1,
+) -> np.ndarray:
+    """
+    Vectorized `vertex_edit_distance` over every (old, new) vertex pair.
+    IR distances are computed once per unique signature pair and
+    scattered into the full matrix; precomputed `signature_tables`
+    may be passed in.
+
+    With `threads` > 1, the signature tables (tiles of signature pairs)
+    and then the row chunks are computed on a thread pool (NumPy releases
+    the GIL in the kernels). Entries are computed independently, so the
+    result is bit-identical to the serial one.
+    """
+    if threads <= 1:
+        return combine_components(cost_components(f_old, f_new, tables))
+
+    edit_dist = np.empty((len(f_old), len(f_new)), dtype=np.float32)
+    fill_cost_rows(
+        edit_dist,
+        f_old,
+        f_new,
+        tables or signature_tables(f_old, f_new, threads),
+        -(-len(f_old) // (threads * THREAD_CHUNKS)),
+        threads,
+    )
+    return edit_dist
+
+
+def cost_rows(
+    f_old: VertexFeatures,
+    f_new: VertexFeatures,
+    tables: tuple[np.ndarray, np.ndarray],
+    start: int,
+    stop: int,
+) -> np.ndarray:
+    """
+    Rows [start, stop) of `cost_matrix`.
+    """
+    ir_sig, call_sig = tables
+    old_ids = np.arange(start, min(stop, len(f_old)))[:, None]
+    rows = f_old.signature_id[old_ids]
+    cols = f_new.signature_id[None, :]
+    return edit_distance(
+        f_old,
+        old_ids,
+        f_new,
+        np.arange(len(f_new))[None, :],
+        ir_sig[rows, cols],
+        call_sig[rows, cols],
+    )
+
+
+def fill_cost_rows(
+    edit_dist: np.ndarray,
+    f_old: VertexFeatures,
+    f_new: VertexFeatures,
+    tables: tuple[np.ndarray, np.ndarray],
+    step: int,
+    threads: int = 1,
+):
+    """
+    Writes `cost_rows` into `edit_dist` (an array or memmap) in chunks
+    of `step` rows, on `threads` threads.
+    """
+
+    def fill(start: int):
+        edit_dist[start : start + step] = cost_rows(
+            f_old, f_new, tables, start, start + step
+        )
+
+    starts = range(0, len(f_old), max(step, 1))
+    if threads <= 1:
+        for start in starts:
+            fill(start)
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+        for _ in pool.map(fill, starts):
+            pass
+
+
+def cost_components(
+    f_old: VertexFeatures,
+    f_new: VertexFeatures,
+    tables: tuple[np.ndarray, np.ndarray] | None = None,
+) -> np.ndarray:
+    """
+    Unweighted [component, old vertex, new vertex] terms of `cost_matrix`.
+    """
+    ir_sig, call_sig = tables or signature_tables(f_old, f_new)
+
+    rows = f_old.signature_id[:, None]
+    cols = f_new.signature_id[None, :]
+    return edit_distance_components(
+        f_old,
+        np.arange(len(f_old))[:, None],
+        f_new,
+        np.arange(len(f_new))[None, :],
+        ir_sig[rows, cols],
+        call_sig[rows, cols],
+    )
 
-    v_old_vertex_id, v_new_vertex_id = map(list, linear_sum_assignment(edit_dist))
 
-    match_cost = edit_dist[v_old_vertex_id, v_new_vertex_id]
+def pair_costs(
+    f_old: VertexFeatures,
+    old_ids: np.ndarray,
+    f_new: VertexFeatures,
+    new_ids: np.ndarray,
+) -> np.ndarray:
+    """
+    `cost_matrix` entries of the given (old, new) index pairs only.
+    """
+    keys = list(zip(f_old.signature_id[old_ids], f_new.signature_id[new_ids]))
+    memo: dict[tuple[int, int], tuple[float, float]] = {}
+    for i, j in keys:
+        if (i, j) not in memo:
+            memo[i, j] = signature_distance(f_old.signatures[i], f_new.signatures[j])
+    dist = [memo[key] for key in keys]
+    return edit_distance(
+        f_old,
+        old_ids,
+        f_new,
+        new_ids,
+        np.array([ir for ir, _ in dist], dtype=np.float64),
+        np.array([call for _, call in dist], dtype=np.float64),
+    )
+
+
+def edit_distance(
+    f_old: VertexFeatures,
+    old_ids: np.ndarray,
+    f_new: VertexFeatures,
+    new_ids: np.ndarray,
+    ir_sig: np.ndarray,
+    call_diff: np.ndarray,
+) -> np.ndarray:
+    """
+    `vertex_edit_distance` of broadcast (old, new) index arrays,
+    given the `signature_distance` of each pair.
+    """
+    return combine_components(
+        edit_distance_components(f_old, old_ids, f_new, new_ids, ir_sig, call_diff)
+    )
+
+
+def edit_distance_components(
+    f_old: VertexFeatures,
+    old_ids: np.ndarray,
+    f_new: VertexFeatures,
+    new_ids: np.ndarray,
+    ir_sig: np.ndarray,
+    call_diff: np.ndarray,
+) -> np.ndarray:
+    """
+    Unweighted terms of `edit_distance`, stacked along a leading axis in
+    `COMPONENTS` order. The IR term already includes the call-op adjustment.
+    """
+    valid = f_old.valid[old_ids] & f_new.valid[new_ids]
+
+    ir_diff = np.where(valid, ir_sig, 1.0)
+    ir_diff = np.where(np.isnan(call_diff), ir_diff, ir_diff * 0.3 + 0.7 * call_diff)
+
+    level_diff = np.where(
+        valid, np.abs(f_old.level[old_ids] - f_new.level[new_ids]), 1.0
+    )
+
+    indeg_old, indeg_new = f_old.in_degree[old_ids], f_new.in_degree[new_ids]
+    indeg_diff = np.abs(indeg_new - indeg_old) / np.maximum(
+        np.maximum(indeg_new, indeg_old), 1
+    )
+    outdeg_old, outdeg_new = f_old.out_degree[old_ids], f_new.out_degree[new_ids]
+    outdeg_diff = np.abs(outdeg_new - outdeg_old) / np.maximum(
+        np.maximum(outdeg_new, outdeg_old), 1
+    )
+
+    return np.stack(np.broadcast_arrays(ir_diff, level_diff, indeg_diff, outdeg_diff))
+
+
+def combine_components(
+    components: np.ndarray, weights: tuple[float, ...] = DEFAULT_WEIGHTS
+) -> np.ndarray:
+    ir_diff, level_diff, indeg_diff, outdeg_diff = components
+    ir_weight, level_weight, indeg_weight, outdeg_weight = weights
+    return (
+        ir_diff * ir_weight
+        + level_diff * level_weight
+        + indeg_diff * indeg_weight
+        + outdeg_diff * outdeg_weight
+    ).astype(np.float32)
+
+
+def indel_cost(f: VertexFeatures) -> np.ndarray:
+    """
+    Cost of matching each vertex with a nonexistent vertex;
+    equals `vertex_edit_distance` against an empty `Vertex()`.
+    """
+    return combine_components(indel_components(f))
+
+
+def indel_components(f: VertexFeatures) -> np.ndarray:
+    return np.stack(
+        [
+            np.ones(len(f)),
+            np.ones(len(f)),
+            f.in_degree / np.maximum(f.in_degree, 1),
+            f.out_degree / np.maximum(f.out_degree, 1),
+        ]
+    )
+
+
+def assign_vertices(
+    f_old: VertexFeatures,
+    f_new: VertexFeatures,
+    solver: str = "exact",
+    threads: int = 1,
+) -> tuple[list[tuple[str, str]], list[str], list[str], AssignmentReport]:
+    """
+    Min-cost assignment between two node subsets.
+    Returns (matched pairs, deleted old nodes, inserted new nodes, report).
+    """
+    if len(f_old) == 0 or len(f_new) == 0:
+        edit_dist = np.empty((len(f_old), len(f_new)), dtype=np.float32)
+    else:
+        edit_dist = cost_matrix(f_old, f_new, threads=threads)
+
+    return assign_costs(
+        edit_dist,
+        indel_cost(f_old),
+        indel_cost(f_new),
+        f_old.nodes,
+        f_new.nodes,
+        solver,
+    )
+
+
+def assign_costs(
+    edit_dist: np.ndarray,
+    indel_old: np.ndarray,
+    indel_new: np.ndarray,
+    nodes_old: list[str],
+    nodes_new: list[str],
+    solver: str = "exact",
+) -> tuple[list[tuple[str, str]], list[str], list[str], AssignmentReport]:
+    """
+    `assign_vertices` on a precomputed cost matrix and indel costs.
+
+    The smaller side is matched completely; each vertex left over on the
+    larger side pays its `indel_cost`. Since that cost does not depend on the
+    counterpart, it is folded into the rectangular matrix:
+
+        sum(C[i, j] for matched) + sum(del[i] for unmatched)
+            = sum(del) + sum(C[i, j] - del[i] for matched)
+    """
+    if len(nodes_old) == 0 or len(nodes_new) == 0:
+        total = float(indel_old.sum() + indel_new.sum())
+        return (
+            [],
+            list(nodes_old),
+            list(nodes_new),
+            AssignmentReport(solver, total, total),
+        )
+
+    edit_dist = edit_dist.copy()
+    offset = 0.0
+    if len(nodes_old) > len(nodes_new):
+        edit_dist -= indel_old[:, None]
+        offset = float(indel_old.sum())
+    elif len(nodes_new) > len(nodes_old):
+        edit_dist -= indel_new[None, :]
+        offset = float(indel_new.sum())
+
+    old_ids, new_ids, report = solve_assignment(edit_dist, solver)
+    pairs = [(nodes_old[i], nodes_new[j]) for i, j in zip(old_ids, new_ids)]
+    matched_old, matched_new = set(old_ids), set(new_ids)
+    return (
+        pairs,
+        [n for i, n in enumerate(nodes_old) if i not in matched_old],
+        [n for j, n in enumerate(nodes_new) if j not in matched_new],
+        report.shift(offset),
+    )
+
+
+def dense_bytes(n: int, m: int) -> int:
+    return n * m * DENSE_BYTES_PER_PAIR
+
+
+def block_rows(m: int, memory_budget: int) -> int:
+    """
+    Rows of an (n, m) cost matrix that fit one block in `memory_budget`.
+    """
+    return max(memory_budget // max(dense_bytes(1, m), 1), 1)
+
+
+def blocked_cost_matrix(
+    f_old: VertexFeatures,
+    f_new: VertexFeatures,
+    path: str,
+    memory_budget: int = MEMORY_BUDGET,
+    threads: int = 1,
+) -> np.memmap:
+    """
+    `cost_matrix` written in row blocks into a float32 memmap at `path`;
+    at most `memory_budget` bytes of temporaries are alive at a time,
+    shared by the `threads` blocks in flight.
+    """
+    n, m = len(f_old), len(f_new)
+    edit_dist = np.memmap(path, dtype=np.float32, mode="w+", shape=(n, m))
+
+    fill_cost_rows(
+        edit_dist,
+        f_old,
+        f_new,
+        signature_tables(f_old, f_new, threads),
+        block_rows(m, memory_budget // max(threads, 1)),
+        threads,
+    )
+    edit_dist.flush()
+    return edit_dist
+
+
+def assign_costs_blocked(
+    edit_dist: np.ndarray,
+    indel_old: np.ndarray,
+    indel_new: np.ndarray,
+    nodes_old: list[str],
+    nodes_new: list[str],
+    memory_budget: int = MEMORY_BUDGET,
+) -> tuple[list[tuple[str, str]], list[str], list[str], AssignmentReport]:
+    """
+    `assign_costs` reading `edit_dist` (e.g. a memmap) in row blocks.
+    Only the cheapest `candidate_entries` of each row are kept and solved
+    sparsely, so the result may be suboptimal; the report's lower bound
+    is taken over the full matrix.
+    """
+    n, m = len(nodes_old), len(nodes_new)
+    if n == 0 or m == 0:
+        return assign_costs(edit_dist, indel_old, indel_new, nodes_old, nodes_new)
+
+    offset = 0.0
+    if n > m:
+        offset = float(indel_old.sum())
+    elif m > n:
+        offset = float(indel_new.sum())
+
+    candidates = []
+    row_min, col_min = [], np.full(m, np.inf)
+    step = block_rows(m, memory_budget)
+    for start in range(0, n, step):
+        block = np.array(edit_dist[start : start + step], dtype=np.float32)
+        # Same indel fold as `assign_costs`.
+        if n > m:
+            block -= indel_old[start : start + step, None]
+        elif m > n:
+            block -= indel_new[None, :]
+
+        candidates.append(candidate_entries(block, start))
+        row_min.append(block.min(axis=1))
+        col_min = np.minimum(col_min, block.min(axis=0))
+
+    # Same bound as `min_bound`, accumulated over the blocks.
+    lower_bound = float(np.concatenate(row_min).sum() if n <= m else col_min.sum())
+
+    old_ids, new_ids, report = sparse_assignment(
+        (n, m),
+        *(np.concatenate(entries) for entries in zip(*candidates)),
+        lower_bound,
+    )
+    pairs = [(nodes_old[i], nodes_new[j]) for i, j in zip(old_ids, new_ids)]
+    matched_old, matched_new = set(old_ids), set(new_ids)
+    return (
+        pairs,
+        [v for i, v in enumerate(nodes_old) if i not in matched_old],
+        [v for j, v in enumerate(nodes_new) if j not in matched_new],
+        report.shift(offset),
+    )
+
+
+def assign_vertices_blocked(
+    f_old: VertexFeatures,
+    f_new: VertexFeatures,
+    memory_budget: int = MEMORY_BUDGET,
+    scratch_dir: str | None = None,
+    threads: int = 1,
+) -> tuple[list[tuple[str, str]], list[str], list[str], AssignmentReport]:
+    """
+    Memory-bounded `assign_vertices` for giant functions: the cost matrix
+    goes to a scratch file under `scratch_dir` (the system temp dir by
+    default) and is solved sparsely. Always uses the "sparse" solver.
+    """
+    if len(f_old) == 0 or len(f_new) == 0:
+        return assign_vertices(f_old, f_new, "sparse", threads)
+
+    with tempfile.TemporaryDirectory(dir=scratch_dir) as scratch:
+        edit_dist = blocked_cost_matrix(
+            f_old, f_new, os.path.join(scratch, "cost.f32"), memory_budget, threads
+        )
+        result = assign_costs_blocked(
+            edit_dist,
+            indel_cost(f_old),
+            indel_cost(f_new),
+            f_old.nodes,
+            f_new.nodes,
+            memory_budget,
+        )
+        del edit_dist
+    return result
+
+
+class CostComponents:
+    """
+    Unweighted cost components of one (old, new) graph pair, so the
+    assignment can be re-solved for other weights without the graphs'
+    features or the edit distance kernels.
+    """
+
+    def __init__(
+        self,
+        nodes_old: list[str],
+        nodes_new: list[str],
+        cost: np.ndarray,
+        indel_old: np.ndarray,
+        indel_new: np.ndarray,
+    ):
+        self.nodes_old: list[str] = nodes_old
+        self.nodes_new: list[str] = nodes_new
+        self.cost: np.ndarray = cost  # [component, old, new]
+        self.indel_old: np.ndarray = indel_old  # [component, old]
+        self.indel_new: np.ndarray = indel_new  # [component, new]
+
+    @classmethod
+    def from_features(
+        cls, f_old: VertexFeatures, f_new: VertexFeatures
+    ) -> "CostComponents":
+        if len(f_old) == 0 or len(f_new) == 0:
+            cost = np.empty((len(COMPONENTS), len(f_old), len(f_new)))
+        else:
+            cost = cost_components(f_old, f_new)
+        return cls(
+            list(f_old.nodes),
+            list(f_new.nodes),
+            cost,
+            indel_components(f_old),
+            indel_components(f_new),
+        )
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path,
+            nodes_old=np.array(self.nodes_old, dtype=str),
+            nodes_new=np.array(self.nodes_new, dtype=str),
+            cost=self.cost,
+            indel_old=self.indel_old,
+            indel_new=self.indel_new,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "CostComponents":
+        with np.load(path) as data:
+            return cls(
+                data["nodes_old"].tolist(),
+                data["nodes_new"].tolist(),
+                data["cost"],
+                data["indel_old"],
+                data["indel_new"],
+            )
+
+    def assign(
+        self, weights: tuple[float, ...] = DEFAULT_WEIGHTS, solver: str = "exact"
+    ) -> tuple[list[tuple[str, str]], list[str], list[str], AssignmentReport]:
+        return assign_costs(
+            combine_components(self.cost, weights),
+            combine_components(self.indel_old, weights),
+            combine_components(self.indel_new, weights),
+            self.nodes_old,
+            self.nodes_new,
+            solver,
+        )
+
+
+def classify_matching(
+    g_old: nx.DiGraph,
+    g_new: nx.DiGraph,
+    node_pairs: list[tuple[str | None, str | None]],
+) -> tuple[
+    list[tuple[Vertex, Vertex]],
+    list[tuple[Vertex, Vertex]],
+    list[tuple[str, str]],
+    list[tuple[Edge, Edge]],
+    list[Edge],
+    list[Edge],
+]:
+    """
+    Classify a vertex matching into the `graph_isomorphism` result.
+    `None` on either side of a pair stands for a nonexistent (dummy) vertex.
+    """
     match_vertices_pair = [
         (
-            g_old.nodes[g_old_array_index[old_id]]["vertex"],
-            g_new.nodes[g_new_array_index[new_id]]["vertex"],
+            g_old.nodes[old_node]["vertex"] if old_node is not None else Vertex(),
+            g_new.nodes[new_node]["vertex"] if new_node is not None else Vertex(),
         )
-        for (old_id, new_id) in zip(v_old_vertex_id, v_new_vertex_id)
+        for (old_node, new_node) in node_pairs
     ]
 
     match_vertices_addr = [
@@ -255,13 +1055,18 @@ def graph_isomorphism(g_old: nx.DiGraph, g_new: nx.DiGraph) -> tuple[
     # For each edge, both source and destination of edge
     # should be a matched basic blocks.
 
+    forward, backward = {}, {}
+    for v_old_name, v_new_name in match_vertices_addr:
+        forward.setdefault(v_old_name, v_new_name)
+        backward.setdefault(v_new_name, v_old_name)
+
     conserved_edge = [
         (e_old, (e_new_src, e_new_dst))
         for e_old in g_old.edges
         if (
             (
-                e_new_src := match_vertice_forward(match_vertices_addr, e_old[0]),
-                e_new_dst := match_vertice_forward(match_vertices_addr, e_old[1]),
+                e_new_src := forward.get(e_old[0]),
+                e_new_dst := forward.get(e_old[1]),
             )
             in g_new.edges
         )
@@ -270,21 +1075,13 @@ def graph_isomorphism(g_old: nx.DiGraph, g_new: nx.DiGraph) -> tuple[
     deleted_edge = [
         e_old
         for e_old in g_old.edges
-        if (
-            (p_src := match_vertice_forward(match_vertices_addr, e_old[0])) == -1
-            or (p_dst := match_vertice_forward(match_vertices_addr, e_old[1])) == -1
-            or (p_src, p_dst) not in g_new.edges
-        )
+        if (forward.get(e_old[0]), forward.get(e_old[1])) not in g_new.edges
     ]
 
     added_edge = [
         e_new
         for e_new in g_new.edges
-        if (
-            (p_src := match_vertice_backward(match_vertices_addr, e_new[0])) == -1
-            or (p_dst := match_vertice_backward(match_vertices_addr, e_new[1])) == -1
-            or (p_src, p_dst) not in g_old.edges
-        )
+        if (backward.get(e_new[0]), backward.get(e_new[1])) not in g_old.edges
     ]
 
     return (
@@ -301,8 +1098,31 @@ def get_root_node(g: nx.DiGraph) -> str:
     return [n for n in g.nodes if g.in_degree(n) == 0][0]
 
 
+def branch_label(g: nx.DiGraph, src: str, dst: str) -> str:
+    # Edge attribute is formatted as `{src}:{dst}:{label}`
+    return g.edges[src, dst].get("branch", "next").rsplit(":", 1)[-1]
+
+
 def build_cfg_from_dot(path: str) -> nx.DiGraph:
-    G: nx.DiGraph = nx.nx_pydot.read_dot(path)
+    # `path` may be stored compressed; see `dotio.resolve_dot`.
+    return parse_cfg(read_dot(path))
+
+
+def port_labels(node_br: list[str]) -> dict[str, str]:
+    """
+    Port name -> text of the branch fields of a record label,
+    e.g. ["<s0>T", "<s1>F"] -> {"s0": "T", "s1": "F"}.
+    """
+    labels = {}
+    for field in node_br:
+        if match := BRANCH_PORT.fullmatch(field.strip()):
+            port, text = match.groups()
+            labels[port] = text.strip() or port
+    return labels
+
+
+def parse_cfg(dot_text: str) -> nx.DiGraph:
+    G: nx.DiGraph = nx.nx_pydot.from_pydot(pydot.graph_from_dot_data(dot_text)[0])
     CFG: nx.DiGraph = nx.DiGraph()
     """
     Preprocess the graph notation.
@@ -314,21 +1134,25 @@ def build_cfg_from_dot(path: str) -> nx.DiGraph:
             G.remove_edge(src, dst)
             G.add_edge(name, dst, branch=branch_from)
 
+    ports: dict[str, dict[str, str]] = {}
     for name, prop in list(G.nodes.data()):
         if len(data := name.split(":")) == 1:  # Node[addr]
             node_ssa_id, node_llvm_ir, node_br = node_label_preprocess(prop["label"])
             CFG.add_node(
                 name, vertex=Vertex(name, ssa_id=node_ssa_id, llvm_ir=node_llvm_ir)
             )
+            ports[name] = port_labels(node_br)
         elif len(data) == 2:  # Node[addr]:branchname
             G.remove_node(name)
         else:
             raise Exception("Invalid node name format")
 
     for src, dst, branch in list(G.edges.data()):
-        if len(data := src.split(":")) == 2:
-            name, branch_from = data
-            CFG.add_edge(name, dst, branch=f"{name}:{dst}:{branch_from}")
+        # Edges out of a port (`Node[addr]:s0`) are labeled with the port's
+        # text in the record label: T / F, or a switch case.
+        if "branch" in branch:
+            label = ports[src].get(branch["branch"], branch["branch"])
+            CFG.add_edge(src, dst, branch=f"{src}:{dst}:{label}")
         else:
             CFG.add_edge(src, dst, branch=f"{src}:{dst}:next")
 
@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+from typing import Callable
+
+
+class Journal:
+    """
+    State kept as a JSON snapshot at `path` plus a JSON-lines journal at
+    `<path>.journal` of the updates made since.
+
+    Each update appends one line, so a run of n updates writes O(n) bytes
+    instead of rewriting the whole state n times. `load` replays the
+    journal onto the snapshot and compacts both into a new snapshot.
+    A line cut short by a crash is dropped; `replay` must tolerate seeing
+    an update twice (a crash between writing the snapshot and removing
+    the journal).
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.journal_path: str = path + ".journal"
+        self._journal = None
+
+    def load(self, default, replay: Callable[[object, dict], None]):
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = default
+
+        try:
+            with open(self.journal_path, "r") as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return state
+
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            replay(state, record)
+
+        self.snapshot(state)
+        return state
+
+    def snapshot(self, state):
+        """
+        Writes `state` atomically and starts a new, empty journal.
+        """
+        self.close()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False) as f:
+            json.dump(state, f)
+        os.replace(f.name, self.path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    def append(self, record: dict):
+        if self._journal is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._journal = open(self.journal_path, "a")
+        self._journal.write(json.dumps(record) + "\n")
+        self._journal.flush()
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
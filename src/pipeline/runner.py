@@ -0,0 +1,184 @@
+import concurrent.futures
+import hashlib
+import importlib
+import json
+import os
+import traceback
+
+from src.pipeline.journal import Journal
+
+
+class Task:
+    """
+    A unit of work in the pipeline DAG.
+
+    `func` is a "module:function" reference so the task can be shipped to a
+    worker process and recorded in the state file. The function may return a
+    list of `Task` to expand the DAG; the new tasks depend on this one.
+    """
+
+    def __init__(
+        self,
+        task_id: str,
+        func: str,
+        args: list = [],
+        deps: list[str] = [],
+        inputs: list[str] = [],
+        outputs: list[str] = [],
+    ):
+        self.id: str = task_id
+        self.func: str = func
+        self.args: list = list(args)
+        self.deps: list[str] = list(deps)
+        self.inputs: list[str] = list(inputs)
+        self.outputs: list[str] = list(outputs)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "func": self.func,
+            "args": self.args,
+            "deps": self.deps,
+            "inputs": self.inputs,
+            "outputs": self.outputs,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Task":
+        return cls(d["id"], d["func"], d["args"], d["deps"], d["inputs"], d["outputs"])
+
+    def fingerprint(self) -> str:
+        h = hashlib.sha256(json.dumps([self.func, self.args]).encode())
+        for path in self.inputs:
+            try:
+                st = os.stat(path)
+                h.update(f"{path}:{st.st_size}:{st.st_mtime_ns}".encode())
+            except FileNotFoundError:
+                h.update(f"{path}:missing".encode())
+        return h.hexdigest()
+
+
+def execute(func: str, args: list) -> list[dict]:
+    module, name = func.split(":")
+    expanded = getattr(importlib.import_module(module), name)(*args) or []
+    return [t.to_dict() for t in expanded]
+
+
+class PipelineState:
+    """
+    Checkpoint of completed tasks; each completion is appended to a `Journal`.
+    {task id: {"fingerprint": str, "expanded": [task dict]}}
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.journal: Journal = Journal(path)
+        self.tasks: dict[str, dict] = self.journal.load({}, self._replay)
+
+    @staticmethod
+    def _replay(tasks: dict[str, dict], record: dict):
+        tasks[record["id"]] = record["state"]
+
+    def is_fresh(self, task: Task, fingerprint: str) -> bool:
+        return (
+            (record := self.tasks.get(task.id)) is not None
+            and record["fingerprint"] == fingerprint
+            and all(os.path.exists(path) for path in task.outputs)
+        )
+
+    def expanded(self, task: Task) -> list[Task]:
+        return [Task.from_dict(d) for d in self.tasks[task.id]["expanded"]]
+
+    def complete(self, task: Task, fingerprint: str, expanded: list[dict]):
+        self.tasks[task.id] = {"fingerprint": fingerprint, "expanded": expanded}
+        self.journal.append({"id": task.id, "state": self.tasks[task.id]})
+
+    def compact(self):
+        """
+        Folds the journal into the state file.
+        """
+        self.journal.snapshot(self.tasks)
+
+
+class PipelineRunner:
+    """
+    Runs a task DAG on a process pool.
+
+    A task is skipped when its recorded fingerprint (function, arguments and
+    input file stats) is unchanged and all of its outputs exist; otherwise it
+    is (re-)run. Failed tasks are reported and their dependents are not run.
+    """
+
+    def __init__(self, state_path: str, workers: int | None = None):
+        self.state: PipelineState = PipelineState(state_path)
+        self.workers: int | None = workers
+
+    def run(self, tasks: list[Task]) -> tuple[set[str], dict[str, str]]:
+        """
+        Returns (completed task ids, {failed task id: reason}).
+        """
+        pending: dict[str, Task] = {t.id: t for t in tasks}
+        done: set[str] = set()
+        failed: dict[str, str] = {}
+
+        def expand(parent: Task, children: list[Task]):
+            for child in children:
+                if parent.id not in child.deps:
+                    child.deps.append(parent.id)
+                if child.id not in done:
+                    pending.setdefault(child.id, child)
+
+        with concurrent.futures.ProcessPoolExecutor(self.workers) as pool:
+            running: dict[concurrent.futures.Future, tuple[Task, str]] = {}
+
+            while pending or running:
+                # Skipping a fresh task may expand the DAG; schedule until settled.
+                progress = True
+                while progress:
+                    progress = False
+                    for task in list(pending.values()):
+                        if any(dep in failed for dep in task.deps):
+                            failed[task.id] = "dependency failed"
+                        elif all(dep in done for dep in task.deps):
+                            fingerprint = task.fingerprint()
+                            if self.state.is_fresh(task, fingerprint):
+                                done.add(task.id)
+                                expand(task, self.state.expanded(task))
+                            else:
+                                future = pool.submit(execute, task.func, task.args)
+                                running[future] = (task, fingerprint)
+                        else:
+                            continue
+                        del pending[task.id]
+                        progress = True
+
+                if not running:
+                    if pending:
+                        # Nothing runnable; dependencies that will never exist.
+                        for task_id in pending:
+                            failed[task_id] = "unresolved dependency"
+                        pending.clear()
+                    continue
+
+                finished, _ = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in finished:
+                    task, fingerprint = running.pop(future)
+                    try:
+                        expanded = future.result()
+                    except Exception:
+                        failed[task.id] = traceback.format_exc()
+                        continue
+
+                    if missing := [p for p in task.outputs if not os.path.exists(p)]:
+                        failed[task.id] = f"missing outputs: {missing}"
+                        continue
+
+                    self.state.complete(task, fingerprint, expanded)
+                    done.add(task.id)
+                    expand(task, [Task.from_dict(d) for d in expanded])
+
+        # A crash leaves the journal behind; the next load replays it.
+        self.state.compact()
+        return done, failed
@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+import src.graph.topology as topology
+import src.visual.diffview as diffview
+from src.convert.main import setup_env
+from src.convert.targets import parse_target
+from src.graph.dotio import dot_functions, resolve_dot
+from src.pipeline.runner import PipelineRunner, Task
+
+"""
+compares_target.json -> task DAG
+
+    build:<hash>  (per commit)
+        |
+    plan:<new>:<old>  (per compared pair; expands into diff tasks)
+        |
+    diff:<new>:<old>:<function>  (load DOT + match; expands into a render task if changed)
+        |
+    render:<new>:<old>:<function>
+
+Builds are produced outside of this repository. A build task only runs
+`BUILD_COMMAND` from the environment (formatted with {target}, {hash} and
+{out}) when the build directory is missing.
+"""
+
+MODULE = "src.pipeline.workflow"
+
+
+def build_dir(target: str, prefix: str, commit: str) -> str:
+    return f"build_output/{target}/{prefix}-{commit}"
+
+
+def result_path(target: str, new_hash: str, old_hash: str, fname: str) -> str:
+    return f"compare/{target}/results/{new_hash}_{old_hash}/{fname}.pkl"
+
+
+def diffview_path(fname: str, new_hash: str, old_hash: str) -> str:
+    return f"diffview_{fname}_{new_hash}_{old_hash}.dot"
+
+
+def build_commit(target: str, prefix: str, commit: str):
+    out = build_dir(target, prefix, commit)
+    if not os.path.isdir(out) and (command := os.environ.get("BUILD_COMMAND")):
+        subprocess.run(
+            command.format(target=target, hash=commit, out=out), shell=True, check=True
+        )
+
+
+def plan_comparison(
+    target: str,
+    prefix: str,
+    new_hash: str,
+    old_hash: str,
+    new_symbols: list[str],
+    old_symbols: list[str],
+) -> list[Task]:
+    new_dir, old_dir = (
+        build_dir(target, prefix, new_hash),
+        build_dir(target, prefix, old_hash),
+    )
+    fn_intersect = (
+        set(new_symbols)
+        & set(old_symbols)
+        & dot_functions(new_dir)
+        & dot_functions(old_dir)
+    )
+
+    return [
+        Task(
+            f"diff:{new_hash}:{old_hash}:{f}",
+            f"{MODULE}:diff_function",
+            [target, prefix, new_hash, old_hash, f],
+            inputs=[
+                resolve_dot(f"{new_dir}/{f}.dot"),
+                resolve_dot(f"{old_dir}/{f}.dot"),
+            ],
+            outputs=[result_path(target, new_hash, old_hash, f)],
+        )
+        for f in sorted(fn_intersect)
+    ]
+
+
+def diff_function(
+    target: str, prefix: str, new_hash: str, old_hash: str, fname: str
+) -> list[Task]:
+    Gn = topology.build_cfg_from_dot(
+        f"{build_dir(target, prefix, new_hash)}/{fname}.dot"
+    )
+    Go = topology.build_cfg_from_dot(
+        f"{build_dir(target, prefix, old_hash)}/{fname}.dot"
+    )
+
+    result = topology.graph_isomorphism(Go, Gn)
+
+    path = result_path(target, new_hash, old_hash, fname)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        pickle.dump(result, f)
+
+    _, v_diff, _, _, e_old, e_new = result
+    if v_diff == [] and e_old == [] and e_new == []:
+        return []
+
+    return [
+        Task(
+            f"render:{new_hash}:{old_hash}:{fname}",
+            f"{MODULE}:render_function",
+            [target, new_hash, old_hash, fname],
+            inputs=[path],
+            outputs=[diffview_path(fname, new_hash, old_hash)],
+        )
+    ]
+
+
+def render_function(target: str, new_hash: str, old_hash: str, fname: str):
+    with open(result_path(target, new_hash, old_hash, fname), "rb") as f:
+        result = pickle.load(f)
+
+    diffview.generate_diffview(
+        *result, func_name=fname, commit_hash=new_hash + "_" + old_hash
+    )
+
+
+def plan_tasks(target: str, prefix: str) -> list[Task]:
+    with open(f"compare/{target}/compares_target.json", "r") as f:
+        comp = json.load(f)
+
+    tasks = [
+        Task(
+            f"build:{ver['hash']}",
+            f"{MODULE}:build_commit",
+            [target, prefix, ver["hash"]],
+            outputs=[build_dir(target, prefix, ver["hash"])],
+        )
+        for ver in comp
+    ]
+
+    v_new = comp[0]
+    for v_old in comp[1:]:
+        tasks.append(
+            Task(
+                f"plan:{v_new['hash']}:{v_old['hash']}",
+                f"{MODULE}:plan_comparison",
+                [
+                    target,
+                    prefix,
+                    v_new["hash"],
+                    v_old["hash"],
+                    v_new["symbol"],
+                    v_old["symbol"],
+                ],
+                deps=[f"build:{v_new['hash']}", f"build:{v_old['hash']}"],
+                # A directory's mtime changes when a DOT file is added or
+                # removed, so the plan is redone when `dot_functions` changes.
+                inputs=[
+                    build_dir(target, prefix, v_new["hash"]),
+                    build_dir(target, prefix, v_old["hash"]),
+                ],
+            )
+        )
+
+    return tasks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run the compares_target.json workflow as a resumable DAG."
+    )
+    parser.add_argument("target", metavar="NAME[:PROJECT]")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--state", default=None)
+    args = parser.parse_args()
+
+    if os.path.exists(".setup"):
+        setup_env()
+
+    target = parse_target(args.target)
+
+    runner = PipelineRunner(
+        args.state or f"compare/{target.name}/pipeline_state.json", args.workers
+    )
+    done, failed = runner.run(plan_tasks(target.name, target.prefix))
+
+    print(f"{len(done)} tasks done, {len(failed)} failed")
+    for task_id, reason in failed.items():
+        print(f"[FAILED] {task_id}\n{reason}")
@@ -1,12 +1,15 @@
+from __future__ import annotations
+
 import os
 import subprocess
 import sys
 
-import pydot
-
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
 from ..graph import edge, topology, vertex
+from ..graph.lazy import lazy_import
+
+pydot = lazy_import("pydot")
 
 RED_COLOR = "#e78284"
 GREEN_COLOR = "#a6d189"
@@ -14,6 +17,10 @@ BLACK_COLOR = "#303446"
 GREY_COLOR = "#acb0be"
 WHITE_COLOR = "#c6d0f5"
 
+# Focused view: hops of unchanged context kept around changes, and node budget.
+DIFFVIEW_CONTEXT = 2
+DIFFVIEW_MAX_NODES = 200
+
 
 def generate_diffview(
     vertex_same: list[tuple[vertex.Vertex, vertex.Vertex]],
@@ -27,6 +34,29 @@ def generate_diffview(
     """
     Generate a diff view of the two graphs.
     """
+    diff_graph = build_diffview(
+        vertex_same,
+        vertex_diff,
+        vertex_addr_matching,
+        edge_same,
+        edge_del,
+        edge_add,
+        **kwargs,
+    )
+    write_diffview(
+        diff_graph, kwargs.get("func_name") or "", kwargs.get("commit_hash") or ""
+    )
+
+
+def build_diffview(
+    vertex_same: list[tuple[vertex.Vertex, vertex.Vertex]],
+    vertex_diff: list[tuple[vertex.Vertex, vertex.Vertex]],
+    vertex_addr_matching: list[tuple[str, str]],
+    edge_same: list[tuple[edge.Edge, edge.Edge]],
+    edge_del: list[edge.Edge],
+    edge_add: list[edge.Edge],
+    **kwargs,
+) -> pydot.Graph:
 
     # Create a new graph for the diff view
     func_name = kwargs.get("func_name") or ""
@@ -283,6 +313,10 @@ def generate_diffview(
             )
         )
 
+    return diff_graph
+
+
+def write_diffview(diff_graph: pydot.Graph, func_name: str, commit_hash: str):
     # Save the diff graph to a file
     with open(f"diffview_{func_name}_{commit_hash}.dot", "w") as f:
         f.write(diff_graph.to_string(indent="\t"))
@@ -296,3 +330,161 @@ def generate_diffview(
             f"diffview_{func_name}_{commit_hash}.png",
         ]
     )
+
+
+def _pair_id(old_name: str, new_name: str) -> str:
+    # Same naming as the nodes of `build_diffview`
+    return f"{old_name.strip('Node')}_{new_name.strip('Node')}"
+
+
+def focus_diff(
+    vertex_same: list[tuple[vertex.Vertex, vertex.Vertex]],
+    vertex_diff: list[tuple[vertex.Vertex, vertex.Vertex]],
+    vertex_addr_matching: list[tuple[str, str]],
+    edge_same: list[tuple[edge.Edge, edge.Edge]],
+    edge_del: list[edge.Edge],
+    edge_add: list[edge.Edge],
+    context: int = DIFFVIEW_CONTEXT,
+    max_nodes: int = DIFFVIEW_MAX_NODES,
+) -> tuple[tuple, list[tuple[int, set[str], set[str]]]]:
+    """
+    Keep the changed vertices and edges, plus unchanged vertices within
+    `context` hops of them over conserved edges. `context` is lowered until
+    the view fits in `max_nodes` (changed vertices are always kept).
+
+    Returns the pruned `graph_isomorphism` tuple, and the pruned unchanged
+    vertices collapsed into connected groups:
+    [(number of vertices, node ids entering the group, node ids leaving it)].
+    """
+    forward = {o: n for o, n in vertex_addr_matching if o != "" and n != ""}
+    backward = {n: o for o, n in forward.items()}
+
+    same = {(vo.name, vn.name) for vo, vn in vertex_same}
+    changed = {
+        (vo.name, vn.name) for vo, vn in vertex_diff if vo.name != "" and vn.name != ""
+    }
+
+    # Pair graph over conserved edges
+    adjacent: dict[tuple[str, str], set[tuple[str, str]]] = {}
+    pair_edges = []
+    for e_old, e_new in edge_same:
+        src, dst = (e_old[0], e_new[0]), (e_old[1], e_new[1])
+        pair_edges.append((src, dst))
+        adjacent.setdefault(src, set()).add(dst)
+        adjacent.setdefault(dst, set()).add(src)
+
+    seeds = set(changed)
+    for src, dst in edge_del:
+        seeds |= {(v, forward[v]) for v in (src, dst) if v in forward}
+    for src, dst in edge_add:
+        seeds |= {(backward[v], v) for v in (src, dst) if v in backward}
+
+    n_changed = sum(1 if "" in (vo.name, vn.name) else 2 for vo, vn in vertex_diff)
+
+    for k in range(context, -1, -1):
+        kept, frontier = set(seeds), set(seeds)
+        for _ in range(k):
+            frontier = {
+                nb for p in frontier for nb in adjacent.get(p, ()) if nb not in kept
+            }
+            kept |= frontier
+
+        # Unchanged vertices outside the context, grouped by connectivity
+        dropped = same - kept
+        groups, group_of = [], {}
+        for p in dropped:
+            if p in group_of:
+                continue
+            group, stack = set(), [p]
+            while stack:
+                q = stack.pop()
+                if q in group_of:
+                    continue
+                group_of[q] = len(groups)
+                group.add(q)
+                stack += [nb for nb in adjacent.get(q, ()) if nb in dropped]
+            groups.append(group)
+
+        n_nodes = n_changed + len(same & kept) + len(groups)
+        if n_nodes <= max_nodes:
+            break
+
+    def node_id(p: tuple[str, str]) -> str:
+        return _pair_id(*p) + ("_old" if p in changed else "")
+
+    collapsed = [(len(group), set(), set()) for group in groups]
+    for src, dst in pair_edges:
+        if src in group_of and dst not in group_of:
+            collapsed[group_of[src]][2].add(node_id(dst))
+        elif dst in group_of and src not in group_of:
+            collapsed[group_of[dst]][1].add(node_id(src))
+
+    pruned = (
+        [(vo, vn) for vo, vn in vertex_same if (vo.name, vn.name) in kept],
+        vertex_diff,
+        vertex_addr_matching,
+        [
+            (e_old, e_new)
+            for e_old, e_new in edge_same
+            if (e_old[0], e_new[0]) not in group_of
+            and (e_old[1], e_new[1]) not in group_of
+        ],
+        edge_del,
+        edge_add,
+    )
+    return pruned, collapsed
+
+
+def generate_focused_diffview(
+    vertex_same: list[tuple[vertex.Vertex, vertex.Vertex]],
+    vertex_diff: list[tuple[vertex.Vertex, vertex.Vertex]],
+    vertex_addr_matching: list[tuple[str, str]],
+    edge_same: list[tuple[edge.Edge, edge.Edge]],
+    edge_del: list[edge.Edge],
+    edge_add: list[edge.Edge],
+    context: int = DIFFVIEW_CONTEXT,
+    max_nodes: int = DIFFVIEW_MAX_NODES,
+    **kwargs,
+) -> None:
+    """
+    Diff view of the changed part only; see `focus_diff`.
+    Collapsed unchanged vertices are drawn as one summary node per group.
+    """
+    pruned, collapsed = focus_diff(
+        vertex_same,
+        vertex_diff,
+        vertex_addr_matching,
+        edge_same,
+        edge_del,
+        edge_add,
+        context,
+        max_nodes,
+    )
+    diff_graph = build_diffview(*pruned, **kwargs)
+
+    for idx, (size, entering, leaving) in enumerate(collapsed):
+        summary = f"collapsed_{idx}"
+        diff_graph.add_node(
+            pydot.Node(
+                summary,
+                label=f"{size} unchanged block{'s' if size > 1 else ''}",
+                shape="box",
+                fontname="Courier",
+                style="filled,dashed",
+                fillcolor=WHITE_COLOR,
+            )
+        )
+        for src in sorted(entering):
+            options = {"ltail": f"cluster_{src[:-4]}"} if src.endswith("_old") else {}
+            diff_graph.add_edge(
+                pydot.Edge(src, summary, color=GREY_COLOR, style="dashed", **options)
+            )
+        for dst in sorted(leaving):
+            options = {"lhead": f"cluster_{dst[:-4]}"} if dst.endswith("_old") else {}
+            diff_graph.add_edge(
+                pydot.Edge(summary, dst, color=GREY_COLOR, style="dashed", **options)
+            )
+
+    write_diffview(
+        diff_graph, kwargs.get("func_name") or "", kwargs.get("commit_hash") or ""
+    )
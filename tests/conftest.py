@@ -0,0 +1,173 @@
+import json
+import os
+import random
+import subprocess
+
+import pytest
+
+import src.graph.topology as topology
+from src.convert.targets import Target
+
+"""
+Shared fixtures: synthetic CFGs written as LLVM `opt -dot-cfg` DOT text
+(record labels, `<s0>T|<s1>F` branch ports), so tests go through the real
+parser.
+"""
+
+OPS = (
+    "%1 = load i32, ptr %2, align 4",
+    "store i32 0, ptr %1, align 4",
+    "%3 = add nsw i32 %1, 1",
+    "%4 = icmp eq i32 %1, 0",
+    "%5 = call i32 @foo(i32 1)",
+    "%6 = call i32 @bar()",
+    "call void @free(ptr %1)",
+    "%7 = getelementptr inbounds i8, ptr %1, i64 4",
+)
+
+
+class CFGSpec:
+    """
+    Blocks (name -> IR lines) and successor lists of a synthetic function.
+    """
+
+    def __init__(self, blocks: dict[str, list[str]], succs: dict[str, list[str]]):
+        self.blocks: dict[str, list[str]] = blocks
+        self.succs: dict[str, list[str]] = succs
+
+    def copy(self) -> "CFGSpec":
+        return CFGSpec(
+            {v: list(ir) for v, ir in self.blocks.items()},
+            {v: list(s) for v, s in self.succs.items()},
+        )
+
+    def dot(self, name: str = "f") -> str:
+        lines = [f"digraph \"CFG for '{name}' function\" {{"]
+        for ssa_id, (v, ir) in enumerate(self.blocks.items()):
+            succs = self.succs[v]
+            body = "\\l  ".join(ir + [terminator(len(succs))])
+            ports = ""
+            if len(succs) == 2:
+                ports = "|{<s0>T|<s1>F}"
+            elif len(succs) > 2:
+                ports = (
+                    "|{"
+                    + "|".join(
+                        f"<s{k}>{'def' if k == 0 else k - 1}" for k in range(len(succs))
+                    )
+                    + "}"
+                )
+            lines.append(
+                f'\t{v} [shape=record,label="{{{ssa_id}:\\l|  {body}\\l{ports}}}"];'
+            )
+            for k, dst in enumerate(succs):
+                port = f":s{k}" if len(succs) > 1 else ""
+                lines.append(f"\t{v}{port} -> {dst};")
+        lines.append("}")
+        return "\n".join(lines)
+
+    def graph(self):
+        return topology.parse_cfg(self.dot())
+
+
+def terminator(successors: int) -> str:
+    if successors == 0:
+        return "ret i32 0"
+    if successors == 1:
+        return "br label %9"
+    if successors == 2:
+        return "br i1 %4, label %9, label %10"
+    return "switch i32 %1, label %9 [\\l    i32 0, label %10\\l  ]"
+
+
+def block_name(i: int) -> str:
+    # Aligned, like real node addresses (`Vertex.addr` parses them).
+    return f"Node0x{0x1000 + 16 * i:x}"
+
+
+def random_spec(n: int, seed: int) -> CFGSpec:
+    """
+    A connected CFG of `n` blocks rooted at the first one, with two-way
+    branches and loops.
+    """
+    rnd = random.Random(seed)
+    names = [block_name(i) for i in range(n)]
+    blocks = {v: [rnd.choice(OPS) for _ in range(rnd.randint(0, 4))] for v in names}
+    succs = {v: [] for v in names}
+    for i in range(1, n):
+        parents = [v for v in names[:i] if len(succs[v]) < 2]
+        succs[rnd.choice(parents or names[:i])].append(names[i])
+    for v in names:
+        if len(succs[v]) == 1 and rnd.random() < 0.3:
+            dst = rnd.choice(names[1:])
+            if dst not in succs[v]:
+                succs[v].append(dst)
+    return CFGSpec(blocks, succs)
+
+
+def mutate_spec(spec: CFGSpec, seed: int, rate: float = 0.1) -> CFGSpec:
+    """
+    A patched version: some blocks get an extra instruction, and one edge
+    is split by a new block.
+    """
+    rnd = random.Random(seed)
+    new = spec.copy()
+    for v, ir in new.blocks.items():
+        if rnd.random() < rate:
+            ir.append(rnd.choice(OPS))
+
+    src = rnd.choice([v for v, s in new.succs.items() if s])
+    k = rnd.randrange(len(new.succs[src]))
+    inserted = block_name(len(new.blocks) + 1000)
+    new.blocks[inserted] = ["%8 = call i32 @check(ptr %1)"]
+    new.succs[inserted] = [new.succs[src][k]]
+    new.succs[src][k] = inserted
+    return new
+
+
+@pytest.fixture
+def cfg_pair():
+    """
+    (old, new) parsed graphs of a 40-block function and a patched version.
+    """
+    spec = random_spec(40, seed=1)
+    return spec.graph(), mutate_spec(spec, seed=2).graph()
+
+
+def write_version(target: Target, commit: str, fname: str, text: str):
+    os.makedirs(target.build_dir(commit), exist_ok=True)
+    with open(f"{target.build_dir(commit)}/{fname}.dot", "w") as f:
+        f.write(text)
+
+
+def git(repo, *args: str) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=repo, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """
+    A target "t" whose `compare/` and `build_output/` live in a temporary
+    working directory; `write(versions)` lays out {commit: {function: spec}}.
+    """
+    monkeypatch.chdir(tmp_path)
+    target = Target("t", "T_GIT_DIRECTORY", "t")
+
+    def write(versions: dict[str, dict[str, CFGSpec]]):
+        for commit, functions in versions.items():
+            for fname, spec in functions.items():
+                write_version(target, commit, fname, spec.dot(fname))
+        os.makedirs(f"compare/{target.name}", exist_ok=True)
+        with open(f"compare/{target.name}/compares_target.json", "w") as f:
+            json.dump(
+                [
+                    {"hash": commit, "symbol": sorted(functions)}
+                    for commit, functions in versions.items()
+                ],
+                f,
+            )
+        return target
+
+    return write
@@ -0,0 +1,67 @@
+from src.cfgmatch.evaluate import PatchDiff
+from src.convert.targets import PROJECTS
+from src.daemon.server import DiffService
+from conftest import mutate_spec, random_spec
+
+
+def test_daemon_reports_screened_commits_separately(workspace, monkeypatch):
+    monkeypatch.setitem(PROJECTS, "t", ("T_GIT_DIRECTORY", "t"))
+    spec = random_spec(40, seed=6)
+    workspace(
+        {
+            "fix": {"f": mutate_spec(spec, seed=7)},
+            "vul": {"f": spec},
+            "old": {"f": spec},
+            "other": {"f": random_spec(40, seed=12)},
+        }
+    )
+    req = {
+        "target": "t",
+        "patched": "fix",
+        "vulns": "vul",
+        "history": ["old", "other"],
+        "function": "f",
+    }
+    service = DiffService()
+
+    unscreened = service.evaluate(req)
+    assert set(unscreened) == {"old", "other"}
+
+    screened = service.evaluate({**req, "screen": True})
+    assert screened == {"old": unscreened["old"], "other": None}
+
+
+def test_daemon_evaluates_with_the_requested_solver(workspace, monkeypatch):
+    monkeypatch.setitem(PROJECTS, "t", ("T_GIT_DIRECTORY", "t"))
+    spec = random_spec(40, seed=6)
+    versions = {
+        "fix": mutate_spec(spec, seed=7),
+        "vul": spec,
+        "old": mutate_spec(spec, seed=8),
+    }
+    workspace({commit: {"f": s} for commit, s in versions.items()})
+    req = {
+        "target": "t",
+        "patched": "fix",
+        "vulns": "vul",
+        "history": ["old"],
+        "function": "f",
+    }
+    service = DiffService()
+
+    results = {}
+    for solver in ("exact", "greedy", "session"):
+        diff = PatchDiff.from_solver(
+            versions["vul"].graph(), versions["fix"].graph(), solver
+        )
+        expected = dict(diff.evaluate(versions["old"].graph(), verbose=False))
+        results[solver] = service.evaluate({**req, "solver": solver})
+        assert results[solver] == {"old": expected}
+
+    # The greedy matching differs here, so the request reached the solver.
+    assert results["greedy"] != results["exact"]
+
+    # One cached patch diff per solver.
+    assert service.stats({})["patches"]["misses"] == 3
+    assert service.evaluate(req) == service.evaluate({**req, "solver": "exact"})
+    assert service.stats({})["patches"]["misses"] == 3
@@ -0,0 +1,56 @@
+import pytest
+
+import src.graph.topology as topology
+from src.visual.diffview import focus_diff
+from conftest import OPS, CFGSpec, block_name
+
+
+def chain(n: int, changed: int | None = None) -> CFGSpec:
+    names = [block_name(i) for i in range(n)]
+    blocks = {v: [OPS[i % len(OPS)]] for i, v in enumerate(names)}
+    if changed is not None:
+        blocks[names[changed]].append(OPS[0])
+    succs = {v: names[i + 1 : i + 2] for i, v in enumerate(names)}
+    return CFGSpec(blocks, succs)
+
+
+@pytest.fixture
+def chain_diff():
+    """
+    `graph_isomorphism` of a 21-block chain whose middle block changed.
+    """
+    return topology.graph_isomorphism(chain(21).graph(), chain(21, 10).graph())
+
+
+def kept_blocks(pruned) -> list[int]:
+    index = {block_name(i): i for i in range(21)}
+    return sorted(index[vo.name] for vo, _ in pruned[0])
+
+
+def test_focus_diff_keeps_the_context_around_the_change(chain_diff):
+    assert [vo.name for vo, _ in chain_diff[1]] == [block_name(10)]
+
+    pruned, collapsed = focus_diff(*chain_diff, context=2)
+    assert pruned[1] == chain_diff[1]
+    assert kept_blocks(pruned) == [8, 9, 11, 12]
+    assert sorted(size for size, _, _ in collapsed) == [8, 8]
+
+    # Conserved edges into pruned blocks now enter or leave the summaries.
+    assert len(pruned[3]) == 4
+    assert sorted((len(into), len(out)) for _, into, out in collapsed) == [
+        (0, 1),
+        (1, 0),
+    ]
+
+
+def test_focus_diff_shrinks_the_context_to_fit(chain_diff):
+    # Changed pair (2) + 2 kept + 2 summaries at context 1.
+    pruned, collapsed = focus_diff(*chain_diff, context=3, max_nodes=6)
+    assert kept_blocks(pruned) == [9, 11]
+    assert sorted(size for size, _, _ in collapsed) == [9, 9]
+
+    # The changed blocks stay even when nothing else fits.
+    pruned, collapsed = focus_diff(*chain_diff, context=3, max_nodes=1)
+    assert kept_blocks(pruned) == []
+    assert pruned[1] == chain_diff[1]
+    assert sorted(size for size, _, _ in collapsed) == [10, 10]
@@ -0,0 +1,75 @@
+import os
+import stat
+
+import pytest
+
+import src.graph.topology as topology
+from src.graph import dotio
+from conftest import random_spec
+
+
+@pytest.fixture
+def dot_file(tmp_path):
+    path = tmp_path / "f.dot"
+    path.write_text(random_spec(30, seed=14).dot("f"))
+    os.utime(path, ns=(1, 1_000_000_000))
+    return str(path)
+
+
+@pytest.mark.parametrize("fmt", ["gz", "xz", "zst"])
+def test_recompress_round_trip(dot_file, fmt):
+    if fmt == "zst":
+        pytest.importorskip("zstandard")
+    text = dotio.read_dot(dot_file)
+    stem = dot_file[: -len(".dot")]
+
+    dotio.recompress_file(dot_file, fmt)
+    compressed = stem + dotio.COMPRESSED_SUFFIXES[fmt]
+    assert not os.path.exists(dot_file)
+    assert os.stat(compressed).st_mtime_ns == 1_000_000_000
+    assert dotio.resolve_dot(dot_file) == compressed
+    assert dotio.read_dot(dot_file) == text
+
+    dotio.recompress_file(compressed, "dot")
+    assert os.listdir(os.path.dirname(dot_file)) == ["f.dot"]
+    assert dotio.read_dot(dot_file) == text
+
+
+def test_compressed_graph_parses_the_same(dot_file):
+    expected = topology.build_cfg_from_dot(dot_file)
+    dotio.recompress_file(dot_file, "xz")
+    g = topology.build_cfg_from_dot(dot_file)
+
+    assert list(g.nodes) == list(expected.nodes)
+    assert list(g.edges(data=True)) == list(expected.edges(data=True))
+
+
+def test_recompress_tree(tmp_path):
+    for commit, fmt in (("aaa", "gz"), ("bbb", "dot")):
+        os.makedirs(tmp_path / commit)
+        for fname in ("f", "g"):
+            path = tmp_path / commit / f"{fname}.dot"
+            path.write_text(random_spec(10, seed=15).dot(fname))
+            dotio.recompress_file(str(path), fmt)
+    (tmp_path / "aaa" / "notes.txt").write_text("not a graph")
+
+    files, before, after = dotio.recompress_tree(str(tmp_path), "xz", workers=1)
+
+    assert files == 4 and before > 0 and after > 0
+    for commit in ("aaa", "bbb"):
+        assert dotio.dot_functions(str(tmp_path / commit)) == {"f", "g"}
+    assert sorted(os.listdir(tmp_path / "aaa")) == ["f.dot.xz", "g.dot.xz", "notes.txt"]
+
+
+def test_missing_dot_resolves_to_the_plain_path(tmp_path):
+    path = str(tmp_path / "missing.dot")
+    assert dotio.resolve_dot(path) == path
+    assert dotio.dot_name("f.dot.zst") == "f"
+    assert dotio.dot_name("f.txt") is None
+
+
+@pytest.mark.parametrize("mode", [0o644, 0o664, 0o600])
+def test_recompress_keeps_the_mode(dot_file, mode):
+    os.chmod(dot_file, mode)
+    dotio.recompress_file(dot_file, "gz")
+    assert stat.S_IMODE(os.stat(dotio.resolve_dot(dot_file)).st_mode) == mode
@@ -0,0 +1,67 @@
+from collections import Counter
+
+from src.cfgmatch.evaluate import PatchDiff
+from conftest import CFGSpec, block_name
+
+"""
+vulnerable: A -> B -> C     patched: A -> C
+B (`call @free`) and its edges are deleted; A -> C is a new edge.
+"""
+
+A, B, C = (block_name(i) for i in range(3))
+
+
+def spec(blocks: dict[str, list[str]], succs: dict[str, list[str]], offset=0):
+    # `offset` renames the blocks, as another build would.
+    name = {v: block_name((int(v[4:], 16) - 0x1000) // 16 + offset) for v in blocks}
+    return CFGSpec(
+        {name[v]: ir for v, ir in blocks.items()},
+        {name[v]: [name[s] for s in succs[v]] for v in blocks},
+    )
+
+
+def vulnerable(b_code: str = "call void @free(ptr %1)", offset: int = 0):
+    return spec(
+        {
+            A: ["%1 = load i32, ptr %2, align 4"],
+            B: [b_code],
+            C: ["%3 = add nsw i32 %1, 1"],
+        },
+        {A: [B], B: [C], C: []},
+        offset,
+    )
+
+
+def patched(offset: int = 0):
+    return spec(
+        {A: ["%1 = load i32, ptr %2, align 4"], C: ["%3 = add nsw i32 %1, 1"]},
+        {A: [C], C: []},
+        offset,
+    )
+
+
+def test_patch_diff():
+    diff = PatchDiff(vulnerable().graph(), patched().graph())
+    assert [v.name for v in diff.del_vert] == [B]
+    assert sorted(diff.del_edge) == [(A, B), (B, C)]
+    assert diff.new_edge == [(A, C)]
+
+
+def test_deleted_edge_needs_a_conserved_destination():
+    # B is still there but its code changed: A -> B is not the deleted edge.
+    diff = PatchDiff(vulnerable().graph(), patched().graph())
+    history = vulnerable("store i32 0, ptr %1, align 4", offset=100).graph()
+    assert diff.evaluate(history, verbose=False) == Counter(fn=3, tn=1)
+
+
+def test_deleted_edges_found_in_a_vulnerable_version():
+    diff = PatchDiff(vulnerable().graph(), patched().graph())
+    history = vulnerable(offset=100).graph()
+    assert diff.evaluate(history, verbose=False) == Counter(tp=3, tn=1)
+
+
+def test_new_edge_found_in_a_patched_version():
+    # Renamed blocks: the history graph is looked up by its own names.
+    diff = PatchDiff(vulnerable().graph(), patched().graph())
+    history = patched(offset=100).graph()
+    assert diff.evaluate(history, verbose=False) == Counter(fn=3, fp=1)
@@ -0,0 +1,45 @@
+import pytest
+
+from src.convert.gitrepo import GitRepository
+from conftest import git
+
+
+@pytest.fixture
+def merged_repo(tmp_path):
+    """
+    main: c1 -> c2 -> merge of `side`, whose only commit changes `f`.
+    """
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git(repo, "init", "-q", "-b", "main")
+    git(repo, "config", "user.email", "t@example.com")
+    git(repo, "config", "user.name", "t")
+
+    (repo / "f").write_text("1\n")
+    git(repo, "add", "f")
+    git(repo, "commit", "-qm", "c1")
+    git(repo, "checkout", "-qb", "side")
+    (repo / "f").write_text("2\n")
+    git(repo, "commit", "-qam", "side")
+    git(repo, "checkout", "-q", "main")
+    (repo / "g").write_text("x\n")
+    git(repo, "add", "g")
+    git(repo, "commit", "-qm", "c2")
+    git(repo, "merge", "-q", "--no-ff", "side", "-m", "merge")
+    return repo
+
+
+def test_file_history_includes_merges(merged_repo):
+    merge, side, c1 = (
+        git(merged_repo, "rev-parse", rev) for rev in ("HEAD", "side", "HEAD~1~1")
+    )
+    with GitRepository(str(merged_repo)) as repo:
+        assert repo.file_history("f") == [merge, side, c1]
+        assert repo.file_history("g") == [git(merged_repo, "rev-parse", "HEAD~1")]
+
+
+def test_export_tree(merged_repo, tmp_path):
+    with GitRepository(str(merged_repo)) as repo:
+        repo.export_tree("HEAD", str(tmp_path / "out"), ["f"])
+    assert (tmp_path / "out" / "f").read_text() == "2\n"
+    assert not (tmp_path / "out" / "g").exists()
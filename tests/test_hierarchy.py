@@ -0,0 +1,60 @@
+import numpy as np
+
+import src.graph.hierarchy as hierarchy
+import src.graph.topology as topology
+from conftest import mutate_spec, random_spec
+
+
+def regions(g):
+    max_level = max(g.nodes[v]["vertex"].level for v in g.nodes)
+    return [
+        hierarchy.Region(g, members, max_level)
+        for members in hierarchy.decompose_regions(g, max_region_size=16)
+    ]
+
+
+def test_region_distances_match_scalar(cfg_pair):
+    regions_old, regions_new = map(regions, cfg_pair)
+    expected = np.array(
+        [
+            [hierarchy.region_distance(ro, rn) for rn in regions_new]
+            for ro in regions_old
+        ],
+        dtype=np.float32,
+    )
+    np.testing.assert_allclose(
+        hierarchy.region_distances(regions_old, regions_new), expected, rtol=1e-6
+    )
+
+
+def test_subset_cost_matrix_matches_full(cfg_pair):
+    f_old, f_new = map(topology.VertexFeatures, cfg_pair)
+    rows, cols = f_old.nodes[5:20], f_new.nodes[::3]
+    sub_old, sub_new = f_old.subset(rows), f_new.subset(cols)
+
+    assert len(sub_old.signatures) == len(set(sub_old.signatures))
+    np.testing.assert_array_equal(
+        topology.cost_matrix(sub_old, sub_new),
+        topology.cost_matrix(f_old, f_new)[5:20, ::3],
+    )
+
+
+def test_hierarchical_solver():
+    spec = random_spec(200, seed=8)
+    g_old, g_new = spec.graph(), mutate_spec(spec, seed=9).graph()
+    result = topology.graph_isomorphism(g_old, g_new, "hierarchical")
+
+    assert "hierarchical" in topology.MATCHERS
+    assert result.report.total_cost >= result.report.lower_bound
+    assert [vn.name for vo, vn in result[1] if not vo.name] == [
+        v for v in g_new.nodes if v not in g_old.nodes
+    ]
+
+
+def test_hierarchical_identical_graph():
+    g = random_spec(200, seed=10).graph()
+    _, v_diff, v_addr, _, e_old, e_new = topology.graph_isomorphism(
+        g, g, "hierarchical"
+    )
+    assert v_diff == e_old == e_new == []
+    assert sorted(v_addr) == [(v, v) for v in sorted(g.nodes)]
@@ -0,0 +1,41 @@
+import shutil
+
+import pytest
+
+from src.convert.main import run_targets
+from src.convert.pool import GraphPool, merge_stats, summarize
+from conftest import mutate_spec, random_spec
+
+
+def test_merged_stats_sum_every_worker():
+    a, b = GraphPool(budget=1 << 20), GraphPool(budget=2 << 20)
+    a.hits, a.misses, b.hits, b.misses, b.evictions = 3, 2, 1, 4, 1
+
+    merged = merge_stats([a.stats(), b.stats()])
+    assert merged == {
+        "entries": 0,
+        "bytes": 0,
+        "budget": 3 << 20,
+        "hits": 4,
+        "misses": 6,
+        "evictions": 1,
+    }
+    assert summarize(merged).startswith("graph pool: 4/10 hits, 6 parsed, 1 evicted")
+
+
+@pytest.mark.skipif(shutil.which("dot") is None, reason="renders with Graphviz")
+def test_run_targets_prints_the_worker_pool_stats(workspace, capsys):
+    spec = random_spec(20, seed=3)
+    target = workspace(
+        {
+            "aaa": {"f": spec, "g": spec},
+            "bbb": {"f": mutate_spec(spec, seed=4), "g": spec},
+        }
+    )
+    jobs = [(target, "aaa", "bbb", f) for f in ("f", "g")]
+
+    run_targets(jobs, workers=2)
+
+    summary = capsys.readouterr().out.splitlines()[-1]
+    # Each job gets its two graphs from its worker's pool.
+    assert summary.startswith("graph pool: 0/4 hits, 4 parsed, 0 evicted, 4 graphs")
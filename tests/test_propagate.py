@@ -0,0 +1,88 @@
+import src.graph.propagate as propagate
+import src.graph.topology as topology
+from conftest import CFGSpec, mutate_spec, random_spec
+
+
+def diamond() -> CFGSpec:
+    # Both arms have the same code, so neither is a unique anchor.
+    return CFGSpec(
+        {
+            "Node0x1000": ["%4 = icmp eq i32 %1, 0"],
+            "Node0x1010": ["store i32 0, ptr %1, align 4"],
+            "Node0x1020": ["store i32 0, ptr %1, align 4"],
+            "Node0x1030": ["%1 = load i32, ptr %2, align 4"],
+        },
+        {
+            "Node0x1000": ["Node0x1010", "Node0x1020"],
+            "Node0x1010": ["Node0x1030"],
+            "Node0x1020": ["Node0x1030"],
+            "Node0x1030": [],
+        },
+    )
+
+
+def test_parsed_two_way_branch_has_distinct_labels():
+    g = diamond().graph()
+    assert topology.branch_label(g, "Node0x1000", "Node0x1010") == "T"
+    assert topology.branch_label(g, "Node0x1000", "Node0x1020") == "F"
+    assert topology.branch_label(g, "Node0x1010", "Node0x1030") == "next"
+
+
+def test_parsed_switch_labels():
+    spec = CFGSpec(
+        {"Node0x1000": [], "Node0x1010": [], "Node0x1020": [], "Node0x1030": []},
+        {
+            "Node0x1000": ["Node0x1010", "Node0x1020", "Node0x1030"],
+            "Node0x1010": [],
+            "Node0x1020": [],
+            "Node0x1030": [],
+        },
+    )
+    g = spec.graph()
+    labels = [
+        topology.branch_label(g, "Node0x1000", v) for v in g.successors("Node0x1000")
+    ]
+    assert sorted(labels) == ["0", "1", "def"]
+
+
+def test_every_parsed_branch_has_distinct_labels():
+    g = random_spec(60, seed=3).graph()
+    for v in g.nodes:
+        labels = [topology.branch_label(g, v, succ) for succ in g.successors(v)]
+        assert len(labels) == len(set(labels))
+
+
+def test_propagation_extends_over_branch_labels(monkeypatch):
+    residue = []
+
+    def assign_vertices(f_old, f_new, *args):
+        residue.append((len(f_old), len(f_new)))
+        return topology.assign_vertices(f_old, f_new, *args)
+
+    monkeypatch.setattr(propagate, "assign_vertices", assign_vertices)
+    g = diamond().graph()
+    _, v_diff, v_addr, _, e_old, e_new = propagate.propagation_graph_isomorphism(g, g)
+
+    assert residue == [(0, 0)]
+    assert sorted(v_addr) == [(v, v) for v in sorted(g.nodes)]
+    assert v_diff == e_old == e_new == []
+
+
+def test_propagate_solver(cfg_pair):
+    g_old, g_new = cfg_pair
+    result = topology.graph_isomorphism(g_old, g_new, "propagate")
+    expected = propagate.propagation_graph_isomorphism(g_old, g_new)
+
+    assert "propagate" in topology.MATCHERS
+    assert result[2] == expected[2]
+    # The inserted block is the only change on the new side.
+    assert [vn.name for vo, vn in result[1] if not vo.name] == [
+        v for v in g_new.nodes if v not in g_old.nodes
+    ]
+
+
+def test_propagate_identical_graph():
+    g = mutate_spec(random_spec(50, seed=4), seed=5).graph()
+    _, v_diff, v_addr, _, e_old, e_new = topology.graph_isomorphism(g, g, "propagate")
+    assert v_diff == e_old == e_new == []
+    assert sorted(v_addr) == [(v, v) for v in sorted(g.nodes)]
@@ -0,0 +1,88 @@
+from collections import Counter
+
+import pytest
+
+import src.graph.topology as topology
+from src.convert.results import ResultStore, diff_record
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultStore(str(tmp_path / "results.db")) as store:
+        yield store
+
+
+def record(old: str, new: str, edges: list[tuple], fname: str = "f") -> dict:
+    return {
+        "target": "t",
+        "function": fname,
+        "old": old,
+        "new": new,
+        "solver": "exact",
+        "total_cost": None,
+        "changed": True,
+        "vertices": [],
+        "edges": edges,
+    }
+
+
+def test_stored_diff_edges(store, cfg_pair):
+    g_old, g_new = cfg_pair
+    result = topology.graph_isomorphism(g_old, g_new)
+    store.add_diff(diff_record("t", "f", "aaa", "bbb", g_old, g_new, result))
+
+    _, _, _, conserved, deleted, added = result
+    edges = store.diff_edges("t", "f", "aaa", "bbb")
+    assert sorted((src, dst) for kind, src, dst, _ in edges if kind == "deleted") == (
+        sorted(deleted)
+    )
+    assert sorted((src, dst) for kind, src, dst, _ in edges if kind == "added") == (
+        sorted(added)
+    )
+    assert sum(kind == "conserved" for kind, *_ in edges) == 2 * len(conserved)
+
+    (_, src, dst, sig), *_ = store.diff_edges("t", "f", "aaa", "bbb", "added")
+    assert ("t", "bbb", "f") in store.commits_with_edge(sig)
+    assert store.commits_with_edge(sig, target="other") == []
+
+
+def test_re_adding_a_diff_replaces_it(store):
+    store.add_diff(record("aaa", "bbb", [("aaa", "deleted", "a", "b", "s")]))
+    store.add_diff(record("aaa", "bbb", [("bbb", "added", "a", "c", "s2")]))
+
+    assert store.diff_edges("t", "f", "aaa", "bbb") == [("added", "a", "c", "s2")]
+    assert store.commits_with_edge("s") == []
+
+
+def test_patch_presence_of_a_large_patch(store):
+    # More deleted edges than SQLite accepts bound variables (at most 250000
+    # in common builds).
+    signatures = [f"sig{k}" for k in range(250001)]
+    store.add_diff(
+        record("vul", "fix", [("vul", "deleted", "a", "b", s) for s in signatures])
+    )
+    store.add_diff(
+        record(
+            "old",
+            "vul",
+            [("old", "conserved", "a", "b", s) for s in signatures[:100]]
+            + [("old", "conserved", "a", "c", "other")],
+        )
+    )
+    store.add_diff(record("vul", "fix", [], fname="g"))
+
+    assert store.patch_presence("t", "f", "vul", "fix") == {
+        "vul": (250001, 250001),
+        "old": (100, 250001),
+    }
+    assert store.patch_presence("t", "g", "vul", "fix") == {}
+
+
+def test_metrics_skip_screened_evaluations(store):
+    store.add_evaluation("t", "f", "fix", "vul", "h1", Counter(tp=2, fn=1))
+    store.add_evaluation("t", "g", "fix", "vul", "h1", Counter(tn=1))
+    store.add_evaluation("t", "f", "fix", "vul", "h2", Counter(), screened=True)
+    # Re-evaluating replaces the earlier counts.
+    store.add_evaluation("t", "g", "fix", "vul", "h1", Counter(fp=1))
+
+    assert store.metrics("t") == {"h1": Counter(tp=2, fp=1, fn=1, tn=0)}
@@ -0,0 +1,42 @@
+import pytest
+
+import src.graph.topology as topology
+from src.cfgmatch.evaluate import PatchDiff
+from src.graph.session import MatchingSession
+from conftest import mutate_spec, random_spec
+
+
+def versions(n: int = 6):
+    spec = random_spec(60, seed=20)
+    return spec.graph(), [
+        mutate_spec(spec, seed=21 + k, rate=0.05 * k).graph() for k in range(n)
+    ]
+
+
+@pytest.mark.parametrize("ref_side", ["old", "new"])
+def test_session_total_cost_matches_graph_isomorphism(ref_side):
+    g_ref, others = versions()
+    session = MatchingSession(g_ref, ref_side)
+    for g in others:
+        pair = (g, g_ref) if ref_side == "new" else (g_ref, g)
+        expected = topology.graph_isomorphism(*pair).report.total_cost
+
+        report = session.match(g).report
+        assert report.total_cost == pytest.approx(expected, abs=1e-4)
+        assert report.gap == 0
+
+
+def test_auction_session_bounds_its_gap():
+    g_ref, others = versions()
+    session = MatchingSession(g_ref, "new", "auction")
+    for g in others:
+        expected = topology.graph_isomorphism(g, g_ref).report.total_cost
+        report = session.match(g).report
+        assert report.lower_bound <= expected + 1e-4 <= report.total_cost + 2e-4
+
+
+def test_patch_diff_matches_history_exactly_by_default():
+    g_vuln, (g_patched, *history) = versions(4)
+    diff = PatchDiff(g_vuln, g_patched)
+    for g in history:
+        assert diff.match_vuln(g)[2] == topology.graph_isomorphism(g, g_vuln)[2]
@@ -0,0 +1,44 @@
+from collections import Counter
+
+from src.cfgmatch.evaluate import Metrics, PatchDiff
+from src.cfgmatch.signature import edge_signature
+from conftest import CFGSpec, mutate_spec, random_spec
+
+
+def test_edge_signature_includes_branch_label():
+    # Both arms start with the same code: only the T / F label differs.
+    spec = CFGSpec(
+        {
+            "Node0x1000": ["%4 = icmp eq i32 %1, 0"],
+            "Node0x1010": ["store i32 0, ptr %1, align 4"],
+            "Node0x1020": ["store i32 0, ptr %1, align 4"],
+        },
+        {
+            "Node0x1000": ["Node0x1010", "Node0x1020"],
+            "Node0x1010": [],
+            "Node0x1020": [],
+        },
+    )
+    g = spec.graph()
+    assert edge_signature(g, "Node0x1000", "Node0x1010") != edge_signature(
+        g, "Node0x1000", "Node0x1020"
+    )
+
+
+def test_screen_keeps_the_vulnerable_version():
+    spec = random_spec(40, seed=6)
+    vulns = spec.graph()
+    diff = PatchDiff(vulns, mutate_spec(spec, seed=7).graph())
+
+    assert not diff.unchanged()
+    assert diff.screen(vulns)
+
+
+def test_screened_commits_are_not_counted():
+    metrics = Metrics()
+    metrics.add("aaa", Counter(tp=2, fn=1))
+    metrics.screen_out("bbb")
+
+    assert metrics.overall() == Counter(tp=2, fn=1)
+    assert "bbb" not in metrics.per_commit
+    assert metrics.screened == Counter(bbb=1)
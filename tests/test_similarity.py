@@ -0,0 +1,29 @@
+import numpy as np
+
+from src.convert.similarity import METRICS, mirrored, similarity_matrix
+from conftest import mutate_spec, random_spec
+
+
+def test_mirrored_swaps_edge_deltas():
+    assert mirrored([1.5, 3, 4, 7]) == [1.5, 3, 7, 4]
+    assert METRICS[2:] == ("deleted_edges", "added_edges")
+
+
+def test_similarity_matrix_mirror(workspace):
+    base = random_spec(30, seed=11)
+    specs = [base, mutate_spec(base, seed=12), mutate_spec(base, seed=13, rate=0.3)]
+    target = workspace({f"c{k}": {"f": spec} for k, spec in enumerate(specs)})
+
+    matrix = similarity_matrix(target, ["c0", "c1", "c2"], "f", workers=1)
+
+    cost, changed, deleted, added = matrix
+    np.testing.assert_array_equal(cost, cost.T)
+    np.testing.assert_array_equal(changed, changed.T)
+    np.testing.assert_array_equal(deleted, added.T)
+    # [i, j] matches old j against new i; conserved edges pair up, so the
+    # edge deltas account for the difference in edge counts either way.
+    edges = [spec.graph().number_of_edges() for spec in specs]
+    for i in range(3):
+        for j in range(3):
+            assert deleted[i, j] - added[i, j] == edges[j] - edges[i]
+
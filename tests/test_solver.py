@@ -0,0 +1,32 @@
+import pytest
+
+import src.graph.topology as topology
+from src.graph.solver import SOLVERS, solve_assignment
+
+
+@pytest.fixture(
+    params=[(40, 41), (30, 41), (41, 25)], ids=lambda s: "x".join(map(str, s))
+)
+def cost(cfg_pair, request):
+    n, m = request.param
+    g_old, g_new = cfg_pair
+    f_old = topology.VertexFeatures(g_old)
+    f_new = topology.VertexFeatures(g_new)
+    return topology.cost_matrix(
+        f_old.subset(f_old.nodes[:n]), f_new.subset(f_new.nodes[:m])
+    )
+
+
+@pytest.mark.parametrize("solver", SOLVERS)
+def test_solver_totals_are_bounded_by_the_exact_optimum(cost, solver):
+    _, _, exact = solve_assignment(cost, "exact")
+    rows, cols, report = solve_assignment(cost, solver)
+
+    # A full matching of the smaller side, reported at its actual cost.
+    assert len(rows) == len(set(rows)) == min(cost.shape)
+    assert len(cols) == len(set(cols)) == min(cost.shape)
+    assert report.total_cost == pytest.approx(float(cost[rows, cols].sum()))
+
+    assert report.total_cost >= exact.total_cost - 1e-4
+    assert report.lower_bound <= exact.total_cost + 1e-4
+    assert report.total_cost - exact.total_cost <= report.gap + 1e-4
@@ -0,0 +1,82 @@
+import random
+import time
+
+import pytest
+
+from src.convert.stream import prefetch, stage
+
+
+def slow(f):
+    """
+    `f` after a random short delay, so that results finish out of order.
+    """
+    rnd = random.Random(0)
+    delays = [rnd.random() / 500 for _ in range(1000)]
+
+    def run(x):
+        time.sleep(delays[x])
+        return f(x)
+
+    return run
+
+
+def counted(n: int, pulled: list[int]):
+    for i in range(n):
+        pulled[0] = i + 1
+        yield i
+
+
+def test_prefetch_is_ordered_complete_and_bounded():
+    pulled = [0]
+    out = []
+    for k, (i, value) in enumerate(
+        prefetch(counted(50, pulled), slow(lambda x: x * x), depth=4, threads=3)
+    ):
+        assert pulled[0] <= k + 4
+        out.append((i, value))
+    assert out == [(i, i * i) for i in range(50)]
+
+
+def test_stage_is_ordered_complete_and_bounded():
+    calls = [0]
+
+    def square(x):
+        calls[0] += 1
+        return x * x
+
+    out = []
+    for k, value in enumerate(stage(range(50), slow(square), depth=3)):
+        # The queue, plus one item computed and waiting to be queued.
+        assert calls[0] <= k + 1 + 3 + 1
+        out.append(value)
+    assert out == [i * i for i in range(50)]
+
+
+def test_pipeline_matches_serial_order():
+    jobs = list(range(40))
+    piped = list(stage(prefetch(jobs, slow(str), depth=5), lambda p: p[1] + "!", 2))
+    assert piped == [f"{i}!" for i in jobs]
+
+
+def test_stage_reraises_after_the_earlier_results():
+    def parse(x):
+        if x == 5:
+            raise ValueError(x)
+        return x
+
+    out = []
+    with pytest.raises(ValueError):
+        for value in stage(range(10), parse):
+            out.append(value)
+    assert out == [0, 1, 2, 3, 4]
+
+
+def test_stage_stops_its_source_when_the_consumer_stops():
+    pulled = [0]
+    source = counted(1000, pulled)
+    results = stage(source, lambda x: x, depth=2)
+    assert next(results) == 0
+    results.close()
+
+    assert source.gi_frame is None
+    assert pulled[0] <= 1 + 2 + 2
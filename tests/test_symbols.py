@@ -0,0 +1,81 @@
+import sys
+
+import pytest
+
+import src.convert.symbols as symbols
+from src.convert.gitrepo import GitRepository
+from conftest import git
+
+# Stands in for ctags: one `fn_<size>` tag per file argument.
+FAKE_CTAGS = """
+import json, os, sys
+for path in sys.argv[1:]:
+    print(json.dumps({"path": path, "name": f"fn_{os.path.getsize(path)}"}))
+"""
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / "repo"
+    path.mkdir()
+    git(path, "init", "-q", "-b", "main")
+    git(path, "config", "user.email", "t@example.com")
+    git(path, "config", "user.name", "t")
+    for k, text in enumerate(["int f(void);\n", "int f(void);\nint g(void);\n"]):
+        (path / "a.c").write_text(text)
+        git(path, "add", "a.c")
+        git(path, "commit", "-qm", f"c{k}")
+    with GitRepository(str(path)) as repo:
+        yield repo
+
+
+@pytest.fixture
+def extractor(repo, tmp_path):
+    return symbols.SymbolExtractor(repo, symbols.SymbolCache(str(tmp_path / "cache")))
+
+
+def use_ctags(monkeypatch, code: str):
+    monkeypatch.setattr(symbols, "CTAGS_COMMAND", [sys.executable, "-c", code])
+
+
+def test_symbols_are_cached_by_blob(extractor, monkeypatch):
+    use_ctags(monkeypatch, FAKE_CTAGS)
+    first = extractor.symbols(["HEAD~1", "HEAD"], ["a.c"])
+    assert first == {"HEAD~1": ["fn_13"], "HEAD": ["fn_26"]}
+
+    # Cache hits do not run ctags at all.
+    use_ctags(monkeypatch, "import sys; sys.exit(1)")
+    assert extractor.symbols(["HEAD~1", "HEAD"], ["a.c"]) == first
+    assert extractor.symbols(["HEAD"], ["missing.c"]) == {"HEAD": []}
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import sys; sys.stderr.write('boom'); sys.exit(2)",
+        "print('not json')",
+        "import os, signal; os.kill(os.getpid(), signal.SIGKILL)",
+    ],
+)
+def test_failed_ctags_run_is_not_cached(extractor, monkeypatch, code):
+    use_ctags(monkeypatch, code)
+    with pytest.raises(RuntimeError):
+        extractor.symbols(["HEAD"], ["a.c"])
+    assert extractor.cache.get(extractor.repo.blob_hash("HEAD", "a.c")) is None
+
+    use_ctags(monkeypatch, FAKE_CTAGS)
+    assert extractor.symbols(["HEAD"], ["a.c"]) == {"HEAD": ["fn_26"]}
+
+
+def test_other_batches_are_cached_when_one_fails(extractor, monkeypatch):
+    # Batches of one file: only the newer blob (26 bytes) makes ctags fail.
+    extractor.batch_size = 1
+    use_ctags(
+        monkeypatch,
+        FAKE_CTAGS + "\nif os.path.getsize(sys.argv[1]) > 20: sys.exit(1)",
+    )
+    with pytest.raises(RuntimeError):
+        extractor.symbols(["HEAD~1", "HEAD"], ["a.c"])
+
+    assert extractor.cache.get(extractor.repo.blob_hash("HEAD~1", "a.c")) == ["fn_13"]
+    assert extractor.cache.get(extractor.repo.blob_hash("HEAD", "a.c")) is None
@@ -0,0 +1,124 @@
+import random
+
+import numpy as np
+import pytest
+import scipy.optimize
+
+import src.graph.topology as topology
+
+
+def test_pair_costs_match_cost_matrix(cfg_pair):
+    g_old, g_new = cfg_pair
+    f_old, f_new = topology.VertexFeatures(g_old), topology.VertexFeatures(g_new)
+    old_ids, new_ids = np.divmod(np.arange(len(f_old) * len(f_new)), len(f_new))
+
+    np.testing.assert_array_equal(
+        topology.pair_costs(f_old, old_ids, f_new, new_ids),
+        topology.cost_matrix(f_old, f_new).ravel(),
+    )
+
+
+def features(cfg_pair):
+    g_old, g_new = cfg_pair
+    return topology.VertexFeatures(g_old), topology.VertexFeatures(g_new)
+
+
+def test_cost_matrix_matches_vertex_edit_distance(cfg_pair):
+    g_old, g_new = cfg_pair
+    f_old, f_new = features(cfg_pair)
+    expected = np.array(
+        [
+            [topology.vertex_edit_distance(g_old, g_new, a, b) for b in f_new.nodes]
+            for a in f_old.nodes
+        ],
+        dtype=np.float32,
+    )
+    np.testing.assert_allclose(topology.cost_matrix(f_old, f_new), expected, rtol=1e-6)
+
+
+def test_threaded_cost_matrix_is_bit_identical(cfg_pair):
+    f_old, f_new = features(cfg_pair)
+    np.testing.assert_array_equal(
+        topology.cost_matrix(f_old, f_new, threads=3),
+        topology.cost_matrix(f_old, f_new),
+    )
+
+
+def test_blocked_cost_matrix_is_bit_identical(cfg_pair, tmp_path):
+    f_old, f_new = features(cfg_pair)
+    blocked = topology.blocked_cost_matrix(
+        f_old, f_new, str(tmp_path / "costs"), memory_budget=1 << 12, threads=2
+    )
+    np.testing.assert_array_equal(blocked, topology.cost_matrix(f_old, f_new))
+
+
+def test_signature_distances_match_scalar():
+    rnd = random.Random(0)
+    opcodes = ["load", "store", "add", "icmp", "br", "call @foo", "call @bar", "ret"]
+    sigs_old = [
+        tuple(rnd.choice(opcodes) for _ in range(n)) for n in (0, 1, 2, 5, 9, 70, 3)
+    ]
+    sigs_new = [tuple(rnd.choice(opcodes) for _ in range(n)) for n in (0, 4, 1, 33)]
+    sigs_new.append(("load", "store"))  # no calls: nan call distance
+
+    ir, call = topology.signature_distances(sigs_old, sigs_new, threads=2)
+    for i, a in enumerate(sigs_old):
+        for j, b in enumerate(sigs_new):
+            r_ir, r_call = topology.signature_distance(a, b)
+            assert ir[i, j] == r_ir
+            assert call[i, j] == r_call or np.isnan(call[i, j]) and np.isnan(r_call)
+
+
+def snapshot(g):
+    return (
+        list(g.nodes),
+        list(g.edges(data=True)),
+        [list(g.nodes[v]["vertex"].llvm_ir) for v in g.nodes],
+    )
+
+
+def test_graph_isomorphism_leaves_inputs_untouched(cfg_pair):
+    g_old, g_new = cfg_pair
+    assert g_old.number_of_nodes() != g_new.number_of_nodes()
+    before = snapshot(g_old), snapshot(g_new)
+
+    topology.graph_isomorphism(g_old, g_new)
+    topology.graph_isomorphism(g_new, g_old)
+    assert (snapshot(g_old), snapshot(g_new)) == before
+
+
+def padded_total(cost, indel_old, indel_new):
+    """
+    Optimum of the square problem with the smaller side padded with
+    nonexistent vertices, as graph_isomorphism solved it before.
+    """
+    n, m = cost.shape
+    square = np.zeros((max(n, m), max(n, m)))
+    square[:n, :m] = cost
+    square[:n, m:] = indel_old[:, None]
+    square[n:, :m] = indel_new[None, :]
+    rows, cols = scipy.optimize.linear_sum_assignment(square)
+    return square[rows, cols].sum()
+
+
+@pytest.mark.parametrize("keep", [30, 41])
+def test_indel_fold_matches_the_padded_square(cfg_pair, keep):
+    f_old, f_new = features(cfg_pair)
+    f_new = f_new.subset(f_new.nodes[:keep])
+    cost = topology.cost_matrix(f_old, f_new)
+    indel_old, indel_new = topology.indel_cost(f_old), topology.indel_cost(f_new)
+
+    pairs, deleted, inserted, report = topology.assign_costs(
+        cost, indel_old, indel_new, f_old.nodes, f_new.nodes
+    )
+    old_ids = {v: i for i, v in enumerate(f_old.nodes)}
+    new_ids = {v: j for j, v in enumerate(f_new.nodes)}
+    total = (
+        sum(cost[old_ids[a], new_ids[b]] for a, b in pairs)
+        + sum(indel_old[old_ids[a]] for a in deleted)
+        + sum(indel_new[new_ids[b]] for b in inserted)
+    )
+
+    assert len(pairs) == min(len(f_old), len(f_new))
+    assert report.total_cost == pytest.approx(total, rel=1e-5)
+    assert total == pytest.approx(padded_total(cost, indel_old, indel_new), rel=1e-5)
@@ -0,0 +1,61 @@
+import collections
+
+from src.convert.triage import CFGProfile, change_score, rank_jobs
+from conftest import mutate_spec, random_spec
+
+
+def test_profile_matches_the_parsed_graph():
+    spec = random_spec(40, seed=1)
+    g = spec.graph()
+    profile = CFGProfile.from_dot(spec.dot())
+
+    assert profile.blocks == g.number_of_nodes()
+    assert profile.edges == g.number_of_edges()
+    assert profile.opcodes == collections.Counter(
+        op for v in g.nodes for op in g.nodes[v]["vertex"].llvm_ir_optype
+    )
+
+
+def test_change_score_grows_with_the_change():
+    spec = random_spec(40, seed=1)
+    base = CFGProfile.from_dot(spec.dot())
+    small = CFGProfile.from_dot(mutate_spec(spec, seed=2, rate=0.05).dot())
+    large = CFGProfile.from_dot(mutate_spec(spec, seed=2, rate=0.5).dot())
+
+    assert change_score(base, base) == 0
+    assert change_score(base, small) == change_score(small, base)
+    assert 0 < change_score(base, small) < change_score(base, large) <= 3
+
+
+def test_rank_jobs_orders_and_cuts(workspace):
+    spec = random_spec(40, seed=1)
+    target = workspace(
+        {
+            "aaa": {"same": spec, "small": spec, "large": spec, "also_same": spec},
+            "bbb": {
+                "same": spec,
+                "small": mutate_spec(spec, seed=2, rate=0.05),
+                "large": mutate_spec(spec, seed=2, rate=0.5),
+                "also_same": spec,
+            },
+        }
+    )
+    jobs = [(target, "bbb", "aaa", f) for f in ("same", "small", "large", "also_same")]
+
+    ranked, scored, _ = rank_jobs(jobs)
+    assert scored == 4
+    # Descending; ties keep job order.
+    assert [job[3] for _, job in ranked] == ["large", "small", "same", "also_same"]
+    assert [score for score, _ in ranked] == sorted(
+        (score for score, _ in ranked), reverse=True
+    )
+
+    top, scored, _ = rank_jobs(jobs, top=2)
+    assert scored == 4
+    assert top == ranked[:2]
+
+    changed, _, _ = rank_jobs(jobs, min_score=1e-9)
+    assert [job[3] for _, job in changed] == ["large", "small"]
+
+    both, _, _ = rank_jobs(jobs, top=1, min_score=1e-9)
+    assert both == ranked[:1]
@@ -0,0 +1,27 @@
+from collections import Counter
+
+import src.graph.topology as topology
+from src.cfgmatch.evaluate import PatchDiff
+from src.cfgmatch.tuning import collect, find_cases, grid_search
+from conftest import mutate_spec, random_spec
+
+
+def test_grid_search_scores_default_weights_like_cfgmatch(workspace):
+    spec = random_spec(40, seed=6)
+    versions = {
+        "fix": {"f": mutate_spec(spec, seed=7)},
+        "vul": {"f": spec},
+        "old": {"f": spec},
+        "other": {"f": random_spec(40, seed=12)},
+    }
+    target = workspace(versions)
+    collect(target, "store", find_cases(target, []), workers=1)
+
+    [(weights, counts)] = grid_search("store", [topology.DEFAULT_WEIGHTS], workers=1)
+
+    graphs = {h: functions["f"].graph() for h, functions in versions.items()}
+    diff = PatchDiff(graphs["vul"], graphs["fix"])
+    assert weights == topology.DEFAULT_WEIGHTS
+    assert counts == sum(
+        (diff.evaluate(graphs[h], verbose=False) for h in ("old", "other")), Counter()
+    )
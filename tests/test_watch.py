@@ -0,0 +1,26 @@
+import json
+import os
+
+from src.convert.watch import WatchState
+
+
+def test_watch_state_resumes_from_the_journal(tmp_path):
+    path = str(tmp_path / "watch_state.json")
+    state = WatchState(path)
+    state.mark("bbb", "f")
+    state.mark("bbb", "g")
+    state.mark("ccc", "f")
+    state.journal.close()
+
+    # Marks only append; the snapshot is written on compaction.
+    assert not os.path.exists(path)
+
+    resumed = WatchState(path)
+    assert resumed.processed == {"bbb": ["f", "g"], "ccc": ["f"]}
+    assert resumed.pending("bbb", {"f", "g", "h"}) == ["h"]
+
+    resumed.mark("ccc", "g")
+    resumed.compact()
+    assert not os.path.exists(path + ".journal")
+    with open(path) as f:
+        assert json.load(f) == {"bbb": ["f", "g"], "ccc": ["f", "g"]}
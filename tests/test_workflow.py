@@ -0,0 +1,46 @@
+import json
+import os
+
+from src.pipeline.runner import PipelineState, Task
+from src.pipeline.workflow import build_dir, plan_tasks
+from conftest import random_spec, write_version
+
+
+def test_plan_task_reruns_when_a_build_gains_a_function(workspace):
+    spec = random_spec(10, seed=11)
+    target = workspace({"aaa": {"f": spec}, "bbb": {"f": spec}})
+    plan = {t.id: t for t in plan_tasks(target.name, target.prefix)}["plan:aaa:bbb"]
+
+    assert plan.inputs == [
+        build_dir(target.name, target.prefix, "aaa"),
+        build_dir(target.name, target.prefix, "bbb"),
+    ]
+
+    os.utime(plan.inputs[1], ns=(0, 0))
+    before = plan.fingerprint()
+    write_version(target, "bbb", "g", spec.dot("g"))
+    assert plan.fingerprint() != before
+
+
+def test_pipeline_state_resumes_from_the_journal(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = PipelineState(path)
+    for i in range(3):
+        state.complete(Task(f"t{i}", "m:f"), f"fp{i}", [])
+    state.journal.close()
+
+    # Completions only append; the snapshot is written on compaction.
+    assert not os.path.exists(path)
+    with open(path + ".journal", "a") as f:
+        f.write('{"id": "t3", "sta')
+
+    resumed = PipelineState(path)
+    assert resumed.tasks == {
+        f"t{i}": {"fingerprint": f"fp{i}", "expanded": []} for i in range(3)
+    }
+    assert os.path.exists(path) and not os.path.exists(path + ".journal")
+
+    resumed.complete(Task("t3", "m:f"), "fp3", [])
+    resumed.compact()
+    with open(path) as f:
+        assert json.load(f)["t3"]["fingerprint"] == "fp3"